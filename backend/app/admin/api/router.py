@@ -4,7 +4,7 @@ from fastapi import APIRouter
 
 from backend.app.admin.api.v1.auth import router as auth_router
 from backend.app.admin.api.v1.log import router as log_router
-from backend.app.admin.api.v1.monitor import router as monitor_router
+from backend.app.admin.api.v1.monitor.pool import router as pool_router
 from backend.app.admin.api.v1.oauth2 import router as oauth2_router
 from backend.app.admin.api.v1.sys import router as sys_router
 from backend.app.admin.api.v1.common import router as common_router
@@ -17,7 +17,7 @@ v1.include_router(auth_router)
 # v1.include_router(oauth2_router)
 v1.include_router(sys_router)
 v1.include_router(log_router)
-# v1.include_router(monitor_router)
+v1.include_router(pool_router, prefix='/monitors/pool', tags=['连接池监控'])
 v1.include_router(common_router)
 v1.include_router(store_router)
 
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from backend.app.admin.schema.login_log import GetLoginLogDetail
+from backend.app.admin.service.login_log_service import login_log_service
+from backend.common.enums import PageCountType
+from backend.common.pagination import (
+    CursorPageData,
+    DependsCursorPagination,
+    DependsPagination,
+    PageData,
+    cursor_paging_data,
+    paging_data,
+)
+from backend.common.response.response_schema import ResponseModel, ResponseSchemaModel, response_base
+from backend.common.security.jwt import DependsJwtAuth
+from backend.common.security.permission import RequestPermission
+from backend.common.security.rbac import DependsRBAC
+from backend.database.db import CurrentSession
+from backend.utils.stream_export import ExportFormat, stream_export
+
+router = APIRouter()
+
+
+@router.get(
+    '',
+    summary='（模糊条件）分页获取登录日志',
+    dependencies=[
+        DependsJwtAuth,
+        DependsPagination,
+    ],
+
+)
+async def get_pagination_login_logs(
+    db: CurrentSession,
+    username: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    ip: Annotated[str | None, Query()] = None,
+) -> ResponseSchemaModel[PageData[GetLoginLogDetail]]:
+    log_select = await login_log_service.get_select(username=username, status=status, ip=ip)
+    page_data = await paging_data(db, log_select, PageCountType.estimated)
+    return response_base.success(data=page_data)
+
+
+@router.get(
+    '/cursor',
+    summary='（模糊条件）游标分页获取登录日志',
+    dependencies=[
+        DependsJwtAuth,
+        DependsCursorPagination,
+    ],
+)
+async def get_cursor_login_logs(
+    db: CurrentSession,
+    username: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    ip: Annotated[str | None, Query()] = None,
+) -> ResponseSchemaModel[CursorPageData[GetLoginLogDetail]]:
+    log_select = await login_log_service.get_select(username=username, status=status, ip=ip)
+    page_data = await cursor_paging_data(db, log_select)
+    return response_base.success(data=page_data)
+
+
+@router.get(
+    '/export',
+    summary='（模糊条件）导出登录日志',
+    description='流式导出全部符合条件的日志，支持 CSV 及 NDJSON，可选 gzip 压缩',
+    dependencies=[
+        Depends(RequestPermission('log:login:export')),
+        DependsRBAC,
+    ],
+)
+async def export_login_logs(
+    username: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    ip: Annotated[str | None, Query()] = None,
+    fmt: Annotated[ExportFormat, Query(description='文件格式')] = 'csv',
+    gzip: Annotated[bool, Query(description='是否 gzip 压缩')] = False,
+) -> StreamingResponse:
+    log_select = await login_log_service.get_export_select(username=username, status=status, ip=ip)
+    columns = [column.key for column in log_select.selected_columns]
+    return stream_export(log_select, columns, 'login_log', fmt, gzip)
+
+
+@router.delete(
+    '',
+    summary='（批量）删除登录日志',
+    dependencies=[
+        Depends(RequestPermission('log:login:del')),
+        DependsRBAC,
+    ],
+)
+async def delete_login_log(pk: Annotated[list[int], Query(...)]) -> ResponseModel:
+    count = await login_log_service.delete(pk=pk)
+    if count > 0:
+        return response_base.success()
+    return response_base.fail()
+
+
+@router.delete(
+    '/all',
+    summary='清空登录日志',
+    dependencies=[
+        Depends(RequestPermission('log:login:empty')),
+        DependsRBAC,
+    ],
+)
+async def delete_all_login_logs() -> ResponseModel:
+    count = await login_log_service.delete_all()
+    if count > 0:
+        return response_base.success()
+    return response_base.fail()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from backend.app.admin.schema.opera_log import GetOperaLogDetail
+from backend.app.admin.service.opera_log_service import opera_log_service
+from backend.common.enums import PageCountType
+from backend.common.pagination import (
+    CursorPageData,
+    DependsCursorPagination,
+    DependsPagination,
+    PageData,
+    cursor_paging_data,
+    paging_data,
+)
+from backend.common.response.response_schema import ResponseModel, ResponseSchemaModel, response_base
+from backend.common.security.jwt import DependsJwtAuth
+from backend.common.security.permission import RequestPermission
+from backend.common.security.rbac import DependsRBAC
+from backend.database.db import CurrentSession
+from backend.utils.stream_export import ExportFormat, stream_export
+
+router = APIRouter()
+
+
+@router.get(
+    '',
+    summary='（模糊条件）分页获取操作日志',
+    dependencies=[
+        DependsJwtAuth,
+        DependsPagination,
+    ],
+)
+async def get_pagination_opera_logs(
+    db: CurrentSession,
+    username: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    ip: Annotated[str | None, Query()] = None,
+) -> ResponseSchemaModel[PageData[GetOperaLogDetail]]:
+    log_select = await opera_log_service.get_select(username=username, status=status, ip=ip)
+    page_data = await paging_data(db, log_select, PageCountType.estimated)
+    return response_base.success(data=page_data)
+
+
+@router.get(
+    '/cursor',
+    summary='（模糊条件）游标分页获取操作日志',
+    dependencies=[
+        DependsJwtAuth,
+        DependsCursorPagination,
+    ],
+)
+async def get_cursor_opera_logs(
+    db: CurrentSession,
+    username: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    ip: Annotated[str | None, Query()] = None,
+) -> ResponseSchemaModel[CursorPageData[GetOperaLogDetail]]:
+    log_select = await opera_log_service.get_select(username=username, status=status, ip=ip)
+    page_data = await cursor_paging_data(db, log_select)
+    return response_base.success(data=page_data)
+
+
+@router.get(
+    '/export',
+    summary='（模糊条件）导出操作日志',
+    description='流式导出全部符合条件的日志，支持 CSV 及 NDJSON，可选 gzip 压缩',
+    dependencies=[
+        Depends(RequestPermission('log:opera:export')),
+        DependsRBAC,
+    ],
+)
+async def export_opera_logs(
+    username: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    ip: Annotated[str | None, Query()] = None,
+    fmt: Annotated[ExportFormat, Query(description='文件格式')] = 'csv',
+    gzip: Annotated[bool, Query(description='是否 gzip 压缩')] = False,
+) -> StreamingResponse:
+    log_select = await opera_log_service.get_export_select(username=username, status=status, ip=ip)
+    columns = [column.key for column in log_select.selected_columns]
+    return stream_export(log_select, columns, 'opera_log', fmt, gzip)
+
+
+@router.delete(
+    '',
+    summary='（批量）删除操作日志',
+    dependencies=[
+        Depends(RequestPermission('log:opera:del')),
+        DependsRBAC,
+    ],
+)
+async def delete_opera_log(pk: Annotated[list[int], Query(...)]) -> ResponseModel:
+    count = await opera_log_service.delete(pk=pk)
+    if count > 0:
+        return response_base.success()
+    return response_base.fail()
+
+
+@router.delete(
+    '/all',
+    summary='清空操作日志',
+    dependencies=[
+        Depends(RequestPermission('log:opera:empty')),
+        DependsRBAC,
+    ],
+)
+async def delete_all_opera_logs() -> ResponseModel:
+    count = await opera_log_service.delete_all()
+    if count > 0:
+        return response_base.success()
+    return response_base.fail()
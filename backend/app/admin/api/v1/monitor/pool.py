@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from fastapi import APIRouter, Depends
+
+from backend.common.response.response_schema import ResponseModel, response_base
+from backend.common.security.permission import RequestPermission
+from backend.common.security.rbac import DependsRBAC
+from backend.common.security.user_cache import user_cache
+from backend.database.db import async_engine
+from backend.database.pool import get_db_pool_stats, get_redis_pool_stats
+from backend.database.redis import redis_client
+from backend.database.replica import replica_router
+
+router = APIRouter()
+
+
+@router.get(
+    '',
+    summary='连接池与缓存监控',
+    description='指标仅统计处理当前请求的 worker 进程',
+    dependencies=[
+        Depends(RequestPermission('sys:monitor:pool')),
+        DependsRBAC,
+    ],
+)
+async def get_pool_info() -> ResponseModel:
+    data = {
+        'database': get_db_pool_stats(async_engine),
+        'database_replicas': [get_db_pool_stats(engine) for engine in replica_router.replicas],
+        'database_routing': replica_router.stats(),
+        'redis': get_redis_pool_stats(redis_client.connection_pool),
+        'user_cache': user_cache.stats(),
+    }
+    return response_base.success(data=data)
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import Annotated, Any
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, Path, Query, Request
+from fastapi import APIRouter, Depends, Path, Query, Request, Response
 
 from backend.app.admin.schema.dept import CreateDeptParam, GetDeptDetail, UpdateDeptParam
 from backend.app.admin.schema.user import GetCurrentUserInfoDetail
@@ -35,10 +35,10 @@ async def get_all_depts_tree(
         phone: Annotated[str | None, Query()] = None,
         status: Annotated[int | None, Query()] = None,
 
-) -> ResponseSchemaModel[list[dict[str, Any]]]:
+) -> Response:
     store_id = request.user.store_id
     dept = await dept_service.get_dept_tree(name=name, leader=leader, phone=phone, status=status, store_id=store_id)
-    return response_base.success(data=dept)
+    return response_base.fast_success(data=dept)
 
 
 @router.post(
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import Annotated, Any
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, Path, Query, Request
+from fastapi import APIRouter, Depends, Path, Query, Request, Response
 
 from backend.app.admin.schema.menu import CreateMenuParam, GetMenuDetail, UpdateMenuParam
 from backend.app.admin.service.menu_service import menu_service
@@ -16,9 +16,9 @@ router = APIRouter()
 
 
 @router.get('/sidebar', summary='获取用户菜单展示树', dependencies=[DependsJwtAuth])
-async def get_user_sidebar_tree(request: Request) -> ResponseSchemaModel[list[dict[str, Any]]]:
+async def get_user_sidebar_tree(request: Request) -> Response:
     menu = await menu_service.get_user_menu_tree(request=request)
-    return response_base.success(data=menu)
+    return response_base.fast_success(data=menu)
 
 
 @router.get('/{pk}', summary='获取菜单详情', dependencies=[DependsJwtAuth])
@@ -31,9 +31,9 @@ async def get_menu(pk: Annotated[int, Path(...)]) -> ResponseSchemaModel[GetMenu
 @router.get('', summary='获取所有菜单展示树', dependencies=[DependsJwtAuth])
 async def get_all_menus(
     title: Annotated[str | None, Query()] = None, status: Annotated[int | None, Query()] = None
-) -> ResponseSchemaModel[list[dict[str, Any]]]:
+) -> Response:
     menu = await menu_service.get_menu_tree(title=title, status=status)
-    return response_base.success(data=menu)
+    return response_base.fast_success(data=menu)
 
 
 @router.post(
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, Path, Query, Request
+from fastapi import APIRouter, Depends, Path, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.sql.functions import current_user
 
 from backend.app.admin.schema.user import (
@@ -16,7 +17,14 @@ from backend.app.admin.schema.user import (
     UpdateUserRoleParam,
 )
 from backend.app.admin.service.user_service import user_service
-from backend.common.pagination import DependsPagination, paging_data, PageData
+from backend.common.pagination import (
+    CursorPageData,
+    DependsCursorPagination,
+    DependsPagination,
+    PageData,
+    cursor_paging_data,
+    paging_data,
+)
 from backend.common.response.response_schema import ResponseModel, ResponseSchemaModel, response_base
 from backend.common.security.jwt import DependsJwtAuth
 from backend.common.security.permission import RequestPermission
@@ -51,10 +59,69 @@ async def password_reset(request: Request, obj: ResetPasswordParam) -> ResponseM
 
 @router.get('/me', summary='获取当前用户信息', dependencies=[DependsJwtAuth], response_model_exclude={'password'})
 async def get_current_user(request: Request) -> ResponseSchemaModel[GetCurrentUserInfoDetail]:
-    data = GetCurrentUserInfoDetail(**request.user.model_dump())
+    data = GetCurrentUserInfoDetail(**request.user.as_dict())
+    return response_base.success(data=data)
+
+
+@router.get(
+    '/cursor',
+    summary='（模糊条件）游标分页获取所有用户',
+    dependencies=[
+        DependsJwtAuth,
+        DependsCursorPagination,
+    ],
+)
+async def get_cursor_users(
+    db: CurrentSession,
+    dept: Annotated[int | None, Query()] = None,
+    username: Annotated[str | None, Query()] = None,
+    phone: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    user_id: Annotated[int | None, Query()] = None,
+) -> ResponseSchemaModel[CursorPageData[GetUserInfoDetail]]:
+    user_select = await user_service.get_select(
+        dept=dept, username=username, phone=phone, status=status, user_id=user_id
+    )
+    page_data = await cursor_paging_data(db, user_select)
+    return response_base.success(data=page_data)
+
+
+@router.post(
+    '/import',
+    summary='批量导入用户',
+    description='上传 csv 或 xlsx 文件，表头：phone, password, dept_id, roles（逗号分隔的角色 ID）, username, '
+    'nickname, email；按批次校验及写入，校验失败的行不导入并在结果中返回',
+    dependencies=[DependsRBAC],
+)
+async def import_users(request: Request, file: UploadFile) -> ResponseModel:
+    data = await user_service.import_users(request=request, file=file)
     return response_base.success(data=data)
 
 
+@router.get(
+    '/export',
+    summary='（模糊条件）导出用户',
+    dependencies=[
+        Depends(RequestPermission('sys:user:export')),
+        DependsRBAC,
+    ],
+)
+async def export_users(
+    dept: Annotated[int | None, Query()] = None,
+    username: Annotated[str | None, Query()] = None,
+    phone: Annotated[str | None, Query()] = None,
+    status: Annotated[int | None, Query()] = None,
+    fmt: Annotated[Literal['csv', 'xlsx'], Query(description='文件格式')] = 'csv',
+) -> StreamingResponse:
+    stream = await user_service.export_users(fmt=fmt, dept=dept, username=username, phone=phone, status=status)
+    media_type = 'text/csv' if fmt == 'csv' else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename=users.{fmt}'},
+    )
+
+
 @router.get('/{phone}', summary='查看用户信息', dependencies=[DependsJwtAuth])
 async def get_user(phone: Annotated[str, Path(...)]) -> ResponseSchemaModel[GetUserInfoDetail]:
     current_user = await user_service.get_userinfo(phone=phone)
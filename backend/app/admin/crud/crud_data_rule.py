@@ -9,6 +9,7 @@ from sqlalchemy_crud_plus import CRUDPlus
 
 from backend.app.admin.model import DataRule
 from backend.app.admin.schema.data_rule import CreateDataRuleParam, UpdateDataRuleParam
+from backend.common.crud import select_models_by_ids
 
 
 class CRUDDataRule(CRUDPlus[DataRule]):
@@ -22,6 +23,16 @@ class CRUDDataRule(CRUDPlus[DataRule]):
         """
         return await self.select_model(db, pk)
 
+    async def get_many(self, db: AsyncSession, pks: Sequence[int]) -> tuple[list[DataRule], list[int]]:
+        """
+        批量获取数据权限规则
+
+        :param db:
+        :param pks:
+        :return: 按传入顺序排列的数据权限规则，不存在的数据权限规则 ID
+        """
+        return await select_models_by_ids(db, self.model, pks)
+
     async def get_list(self, name: str = None) -> Select:
         """
         获取数据权限规则列表
@@ -9,6 +9,7 @@ from sqlalchemy_crud_plus import CRUDPlus
 
 from backend.app.admin.model import Dept, User
 from backend.app.admin.schema.dept import CreateDeptParam, UpdateDeptParam
+from backend.common.crud import select_models_by_ids
 
 
 class CRUDDept(CRUDPlus[Dept]):
@@ -23,6 +24,16 @@ class CRUDDept(CRUDPlus[Dept]):
         """
         return await self.select_model_by_column(db, id=dept_id, del_flag=0, store_id=store_id)
 
+    async def get_many(self, db: AsyncSession, dept_ids: Sequence[int]) -> tuple[list[Dept], list[int]]:
+        """
+        批量获取部门
+
+        :param db:
+        :param dept_ids:
+        :return: 按传入顺序排列的部门，不存在的部门 ID
+        """
+        return await select_models_by_ids(db, self.model, dept_ids)
+
     async def get_by_name(self, db: AsyncSession, name: str, store_id: int) -> Dept | None:
         """
         通过 name 获取 API
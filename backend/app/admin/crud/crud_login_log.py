@@ -27,6 +27,20 @@ class CRUDLoginLog(CRUDPlus[LoginLog]):
             filters.update(ip__like=f'%{ip}%')
         return await self.select_order('created_time', 'desc', **filters)
 
+    async def get_export_list(
+        self, username: str | None = None, status: int | None = None, ip: str | None = None
+    ) -> Select:
+        """
+        获取登录日志导出查询，与列表筛选条件一致，仅查询列以避免构造 ORM 实例
+
+        :param username:
+        :param status:
+        :param ip:
+        :return:
+        """
+        stmt = await self.get_list(username=username, status=status, ip=ip)
+        return stmt.with_only_columns(*self.model.__table__.columns)
+
     async def create(self, db: AsyncSession, obj_in: CreateLoginLogParam) -> None:
         """
         创建登录日志
@@ -3,11 +3,13 @@
 from typing import Sequence
 
 from sqlalchemy import and_, asc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy_crud_plus import CRUDPlus
 
 from backend.app.admin.model import Menu
 from backend.app.admin.schema.menu import CreateMenuParam, UpdateMenuParam
+from backend.common.crud import select_models_by_ids
 
 
 class CRUDMenu(CRUDPlus[Menu]):
@@ -21,6 +23,16 @@ class CRUDMenu(CRUDPlus[Menu]):
         """
         return await self.select_model(db, menu_id)
 
+    async def get_many(self, db: AsyncSession, menu_ids: Sequence[int]) -> tuple[list[Menu], list[int]]:
+        """
+        批量获取菜单
+
+        :param db:
+        :param menu_ids:
+        :return: 按传入顺序排列的菜单，不存在的菜单 ID
+        """
+        return await select_models_by_ids(db, self.model, menu_ids)
+
     async def get_by_title(self, db, title: str) -> Menu | None:
         """
         通过 title 获取菜单
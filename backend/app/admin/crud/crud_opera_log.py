@@ -27,6 +27,20 @@ class CRUDOperaLogDao(CRUDPlus[OperaLog]):
             filters.update(ip=f'%{ip}%')
         return await self.select_order('created_time', 'desc', **filters)
 
+    async def get_export_list(
+        self, username: str | None = None, status: int | None = None, ip: str | None = None
+    ) -> Select:
+        """
+        获取操作日志导出查询，与列表筛选条件一致，仅查询列以避免构造 ORM 实例
+
+        :param username:
+        :param status:
+        :param ip:
+        :return:
+        """
+        stmt = await self.get_list(username=username, status=status, ip=ip)
+        return stmt.with_only_columns(*self.model.__table__.columns)
+
     async def create(self, db: AsyncSession, obj_in: CreateOperaLogParam) -> None:
         """
         创建操作日志
@@ -37,6 +51,16 @@ class CRUDOperaLogDao(CRUDPlus[OperaLog]):
         """
         await self.create_model(db, obj_in)
 
+    async def bulk_create(self, db: AsyncSession, obj_in: list[CreateOperaLogParam]) -> None:
+        """
+        批量创建操作日志
+
+        :param db:
+        :param obj_in:
+        :return:
+        """
+        await self.create_models(db, obj_in)
+
     async def delete(self, db: AsyncSession, pk: list[int]) -> int:
         """
         删除操作日志
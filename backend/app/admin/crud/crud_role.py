@@ -3,16 +3,13 @@
 from typing import Sequence
 
 from sqlalchemy import Select, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import noload, selectinload
 from sqlalchemy_crud_plus import CRUDPlus
 
 from backend.app.admin.model import DataRule, Menu, Role, User
-from backend.app.admin.schema.role import (
-    CreateRoleParam,
-    UpdateRoleMenuParam,
-    UpdateRoleParam,
-    UpdateRoleRuleParam,
-)
+from backend.app.admin.schema.role import CreateRoleParam, UpdateRoleParam
+from backend.common.crud import select_models_by_ids
 
 
 class CRUDRole(CRUDPlus[Role]):
@@ -26,6 +23,16 @@ class CRUDRole(CRUDPlus[Role]):
         """
         return await self.select_model(db, role_id)
 
+    async def get_many(self, db: AsyncSession, role_ids: Sequence[int]) -> tuple[list[Role], list[int]]:
+        """
+        批量获取角色
+
+        :param db:
+        :param role_ids:
+        :return: 按传入顺序排列的角色，不存在的角色 ID
+        """
+        return await select_models_by_ids(db, self.model, role_ids)
+
     async def get_with_relation(self, db, role_id: int) -> Role | None:
         """
         获取角色和菜单
@@ -120,36 +127,32 @@ class CRUDRole(CRUDPlus[Role]):
         """
         return await self.update_model(db, role_id, obj_in)
 
-    async def update_menus(self, db, role_id: int, menu_ids: UpdateRoleMenuParam) -> int:
+    async def update_menus(self, db, role_id: int, menus: Sequence[Menu]) -> int:
         """
         更新角色菜单
 
         :param db:
         :param role_id:
-        :param menu_ids:
+        :param menus:
         :return:
         """
         current_role = await self.get_with_relation(db, role_id)
         # 更新菜单
-        stmt = select(Menu).where(Menu.id.in_(menu_ids.menus))
-        menus = await db.execute(stmt)
-        current_role.menus = menus.scalars().all()
+        current_role.menus = list(menus)
         return len(current_role.menus)
 
-    async def update_rules(self, db, role_id: int, rule_ids: UpdateRoleRuleParam) -> int:
+    async def update_rules(self, db, role_id: int, rules: Sequence[DataRule]) -> int:
         """
         更新角色数据权限
 
         :param db:
         :param role_id:
-        :param rule_ids:
+        :param rules:
         :return:
         """
         current_role = await self.get_with_relation(db, role_id)
         # 更新数据权限
-        stmt = select(DataRule).where(DataRule.id.in_(rule_ids.rules))
-        rules = await db.execute(stmt)
-        current_role.rules = rules.scalars().all()
+        current_role.rules = list(rules)
         return len(current_role.rules)
 
     async def delete(self, db, role_id: list[int], store_id: int) -> int:
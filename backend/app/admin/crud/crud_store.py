@@ -1,4 +1,3 @@
-import bcrypt
 from sqlalchemy import Select, select, desc, and_, alias
 from sqlalchemy_crud_plus import CRUDPlus
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,7 +7,7 @@ from backend.app.admin.model.role import Role
 from backend.app.admin.model.store import Store
 from backend.app.admin.model.user import User
 from backend.app.admin.schema.store import CreateStoreParam, ReviewStoreParam, UpdateStoreParam
-from backend.common.security.jwt import get_hash_password
+from backend.common.security.jwt import get_hash_password, get_password_salt
 
 
 class CRUDStore(CRUDPlus[Store]):
@@ -105,8 +104,8 @@ class CRUDStore(CRUDPlus[Store]):
         创建商户用户
         """
 
-        salt = bcrypt.gensalt()
-        hashed_password = get_hash_password(password, salt)
+        salt = get_password_salt()
+        hashed_password = await get_hash_password(password, salt)
 
         user_dict = {
             'username': username,
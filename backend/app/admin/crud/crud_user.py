@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import bcrypt
+from typing import Any, Iterable, Sequence
 
-from sqlalchemy import and_, desc, select
+from sqlalchemy import and_, desc, insert, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import noload, selectinload, load_only
 from sqlalchemy.sql import Select
@@ -14,9 +14,8 @@ from backend.app.admin.schema.user import (
     AvatarParam,
     RegisterUserParam,
     UpdateUserParam,
-    UpdateUserRoleParam,
 )
-from backend.common.security.jwt import get_hash_password
+from backend.common.security.jwt import get_hash_password, get_password_salt
 from backend.utils.timezone import timezone
 
 
@@ -71,8 +70,8 @@ class CRUDUser(CRUDPlus[User]):
         :return:
         """
         if not social:
-            salt = bcrypt.gensalt()
-            obj.password = get_hash_password(obj.password, salt)
+            salt = get_password_salt()
+            obj.password = await get_hash_password(obj.password, salt)
             dict_obj = obj.model_dump()
             dict_obj.update({'is_staff': True, 'salt': salt})
             dict_obj.update({'store_id': 0, 'user_type': '00'})
@@ -83,23 +82,21 @@ class CRUDUser(CRUDPlus[User]):
         new_user = self.model(**dict_obj)
         db.add(new_user)
 
-    async def add(self, db: AsyncSession, obj: AddUserParam) -> None:
+    async def add(self, db: AsyncSession, obj: AddUserParam, roles: Sequence[Role]) -> None:
         """
         后台添加用户
 
         :param db:
         :param obj:
+        :param roles: 用户角色
         :return:
         """
-        salt = bcrypt.gensalt()
-        obj.password = get_hash_password(obj.password, salt)
+        salt = get_password_salt()
+        obj.password = await get_hash_password(obj.password, salt)
         dict_obj = obj.model_dump(exclude={'roles'})
         dict_obj.update({'salt': salt})
         new_user = self.model(**dict_obj)
-        role_list = []
-        for role_id in obj.roles:
-            role_list.append(await db.get(Role, role_id))
-        new_user.roles.extend(role_list)
+        new_user.roles.extend(roles)
         db.add(new_user)
 
     async def update_userinfo(self, db: AsyncSession, input_user: int, obj: UpdateUserParam) -> int:
@@ -114,23 +111,16 @@ class CRUDUser(CRUDPlus[User]):
         return await self.update_model(db, input_user, obj)
 
     @staticmethod
-    async def update_role(db: AsyncSession, input_user: User, obj: UpdateUserRoleParam) -> None:
+    async def update_role(db: AsyncSession, input_user: User, roles: Sequence[Role]) -> None:
         """
         更新用户角色
 
         :param db:
         :param input_user:
-        :param obj:
+        :param roles: 用户角色
         :return:
         """
-        # 删除用户所有角色
-        for i in list(input_user.roles):
-            input_user.roles.remove(i)
-        # 添加用户角色
-        role_list = []
-        for role_id in obj.roles:
-            role_list.append(await db.get(Role, role_id))
-        input_user.roles.extend(role_list)
+        input_user.roles = list(roles)
 
     async def update_avatar(self, db: AsyncSession, input_user: int, avatar: AvatarParam) -> int:
         """
@@ -163,16 +153,59 @@ class CRUDUser(CRUDPlus[User]):
         """
         return await self.select_model_by_column(db, phone=phone)
 
-    async def reset_password(self, db: AsyncSession, pk: int, new_pwd: str) -> int:
+    async def get_existing_values(self, db: AsyncSession, column: str, values: Iterable[str]) -> set[str]:
+        """
+        批量检查列值是否已存在
+
+        :param db:
+        :param column: 列名
+        :param values:
+        :return: 已存在的值
+        """
+        values = list(set(values))
+        if not values:
+            return set()
+        model_column = getattr(self.model, column)
+        result = await db.execute(select(model_column).where(model_column.in_(values)))
+        return set(result.scalars())
+
+    async def bulk_add(self, db: AsyncSession, users: Sequence[dict[str, Any]], roles: dict[str, list[int]]) -> int:
+        """
+        批量添加用户及用户角色，用户与用户角色各批量插入一次
+
+        :param db:
+        :param users: 用户字段，需包含已哈希的密码及盐
+        :param roles: 手机号与角色 ID 列表的映射
+        :return:
+        """
+        if not users:
+            return 0
+        columns = [column.key for column in inspect(self.model).column_attrs]
+        rows = []
+        for dict_obj in users:
+            # 通过模型构造以应用字段默认值
+            new_user = self.model(**dict_obj)
+            rows.append({key: value for key in columns if (value := getattr(new_user, key)) is not None})
+        await db.execute(insert(self.model), rows)
+        result = await db.execute(select(self.model.id, self.model.phone).where(self.model.phone.in_(list(roles))))
+        user_roles = [
+            {'user_id': user_id, 'role_id': role_id} for user_id, phone in result for role_id in roles.get(phone, ())
+        ]
+        if user_roles:
+            await db.execute(insert(self.model.roles.property.secondary), user_roles)
+        return len(rows)
+
+    async def reset_password(self, db: AsyncSession, pk: int, new_pwd: str, salt: bytes) -> int:
         """
         重置用户密码
 
         :param db:
         :param pk:
         :param new_pwd:
+        :param salt: 新密码使用的盐
         :return:
         """
-        return await self.update_model(db, pk, {'password': new_pwd})
+        return await self.update_model(db, pk, {'password': new_pwd, 'salt': salt})
 
     async def get_list(self, dept: int = None, username: str = None, phone: str = None, status: int = None, user_id: int = None) -> Select:
         """
@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import Any, Optional
 
-from pydantic import ConfigDict, EmailStr, Field, HttpUrl, model_validator
+from pydantic import ConfigDict, EmailStr, Field, HttpUrl, PrivateAttr, model_validator
 from typing_extensions import Self
 
 from backend.app.admin.schema.dept import GetDeptDetail
@@ -35,6 +35,23 @@ class AddUserParam(AuthSchemaBase):
     email: EmailStr = Field(None, examples=['user@example.com'])
 
 
+class ImportUserParam(AddUserParam):
+    """批量导入用户，角色以逗号分隔"""
+
+    password: str
+
+    @model_validator(mode='before')
+    @classmethod
+    def parse_row(cls, data: Any) -> Any:
+        """空单元格视为未填写，角色 ID 由逗号分隔的字符串解析"""
+        if isinstance(data, dict):
+            data = {k: v for k, v in data.items() if v is not None and v != ''}
+            roles = data.get('roles')
+            if isinstance(roles, (str, int)):
+                data['roles'] = [r for r in str(roles).replace('，', ',').split(',') if r.strip()]
+        return data
+
+
 class UserInfoSchemaBase(SchemaBase):
     dept_id: int | None = None
     username: str
@@ -101,6 +118,39 @@ class GetCurrentUserInfoDetail(GetUserInfoDetail):
 class CurrentUserIns(GetUserInfoDetail):
     model_config = ConfigDict(from_attributes=True)
 
+    _perms: frozenset[str] = PrivateAttr(default=frozenset())
+    _has_enabled_role: bool = PrivateAttr(default=False)
+    _has_menu: bool = PrivateAttr(default=False)
+
+    @model_validator(mode='after')
+    def build_permissions(self) -> Self:
+        """预计算权限标识集合及角色摘要，用户缓存期间仅计算一次"""
+        perms = set()
+        for role in self.roles:
+            for menu in role.menus:
+                if menu and menu.perms and menu.status == StatusType.enable:
+                    perms.update(perm.strip() for perm in menu.perms.split(','))
+        perms.discard('')
+        self._perms = frozenset(perms)
+        self._has_enabled_role = any(role.status == StatusType.enable for role in self.roles)
+        self._has_menu = any(len(role.menus) > 0 for role in self.roles)
+        return self
+
+    @property
+    def perms(self) -> frozenset[str]:
+        """已分配的菜单权限标识"""
+        return self._perms
+
+    @property
+    def has_enabled_role(self) -> bool:
+        """是否存在启用的角色"""
+        return self._has_enabled_role
+
+    @property
+    def has_menu(self) -> bool:
+        """所属角色是否分配了菜单"""
+        return self._has_menu
+
 
 class ResetPasswordParam(SchemaBase):
     old_password: str
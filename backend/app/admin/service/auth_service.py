@@ -21,9 +21,14 @@ from backend.common.security.jwt import (
     create_new_token,
     create_refresh_token,
     get_token,
+    get_token_payload,
     jwt_decode,
-    password_verify,
+    password_verify_and_update,
+    remove_sessions,
+    revoke_access_tokens,
+    revoke_refresh_tokens,
 )
+from backend.common.security.user_cache import user_cache
 from backend.core.conf import settings
 from backend.database.db import async_db_session, uuid4_str
 from backend.database.redis import redis_client
@@ -36,10 +41,15 @@ class AuthService:
         user = await user_dao.get_by_phone(db, phone)
         if not user:
             raise errors.NotFoundError(msg='用户名或密码有误')
-        elif not password_verify(password, user.password):
+        verified, new_password = await password_verify_and_update(password, user.password)
+        if not verified:
             raise errors.AuthorizationError(msg='用户名或密码有误')
         elif not user.status:
             raise errors.AuthorizationError(msg='用户已被锁定, 请联系统管理员')
+        if new_password:
+            # 哈希计算参数已变更，使用新参数重新哈希，随登录事务一同提交
+            user.password = new_password
+            user.salt = new_password[:29].encode()
         return user
 
     async def swagger_login(self, *, obj: HTTPBasicCredentials) -> tuple[str, User]:
@@ -76,20 +86,23 @@ class AuthService:
                     await redis_client.delete(f'{admin_settings.CAPTCHA_LOGIN_REDIS_PREFIX}:{request.state.ip}')
                 await user_dao.update_login_time(db, obj.phone)
                 await db.refresh(user)
-                a_token = await create_access_token(
-                    str(user.id),
-                    user.is_multi_login,
-                    user.user_type,
-                    # extra info
-                    username=user.username,
-                    nickname=user.nickname,
-                    last_login_time=timezone.t_str(user.last_login_time),
-                    ip=request.state.ip,
-                    os=request.state.os,
-                    browser=request.state.browser,
-                    device=request.state.device,
-                )
-                r_token = await create_refresh_token(str(user.id), user.is_multi_login, user.user_type)
+                # access token 与 refresh token 的写入在一次往返中提交
+                async with redis_client.transaction() as pipe:
+                    a_token = await create_access_token(
+                        str(user.id),
+                        user.is_multi_login,
+                        user.user_type,
+                        pipe=pipe,
+                        # extra info
+                        username=user.username,
+                        nickname=user.nickname,
+                        last_login_time=timezone.t_str(user.last_login_time),
+                        ip=request.state.ip,
+                        os=request.state.os,
+                        browser=request.state.browser,
+                        device=request.state.device,
+                    )
+                    r_token = await create_refresh_token(str(user.id), user.is_multi_login, user.user_type, pipe=pipe)
                 response.set_cookie(
                     key=settings.COOKIE_REFRESH_TOKEN_KEY,
                     value=r_token.refresh_token,
@@ -182,22 +195,24 @@ class AuthService:
 
     @staticmethod
     async def logout(*, request: Request, response: Response) -> None:
-        token = get_token(request)
-        token_payload = jwt_decode(token)
+        token_payload = get_token_payload(request)
         user_id = token_payload.id
         refresh_token = request.cookies.get(settings.COOKIE_REFRESH_TOKEN_KEY)
         response.delete_cookie(settings.COOKIE_REFRESH_TOKEN_KEY)
-        if request.user.is_multi_login:
-            await redis_client.delete(f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{token_payload.session_uuid}')
-            if refresh_token:
-                await redis_client.delete(f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}:{refresh_token}')
-        else:
-            key_prefix = [
-                f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:',
-                f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}:',
-            ]
-            for prefix in key_prefix:
-                await redis_client.delete_prefix(prefix)
+        async with redis_client.transaction() as pipe:
+            if request.user.is_multi_login:
+                token_key = f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{token_payload.session_uuid}'
+                pipe.delete(token_key)
+                pipe.zrem(f'{settings.TOKEN_INDEX_REDIS_PREFIX}:{user_id}', token_key)
+                if refresh_token:
+                    refresh_token_key = f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}:{refresh_token}'
+                    pipe.delete(refresh_token_key)
+                    pipe.zrem(f'{settings.TOKEN_REFRESH_INDEX_REDIS_PREFIX}:{user_id}', refresh_token_key)
+                await remove_sessions(user_id, token_payload.session_uuid, pipe=pipe)
+                await user_cache.evict_sessions(user_id, token_payload.session_uuid, pipe=pipe)
+            else:
+                await revoke_access_tokens(user_id, pipe=pipe)
+                await revoke_refresh_tokens(user_id, pipe=pipe)
 
 
 auth_service: AuthService = AuthService()
@@ -10,10 +10,10 @@ from backend.app.admin.crud.crud_role import role_dao
 from backend.app.admin.model import DataRule
 from backend.app.admin.schema.data_rule import CreateDataRuleParam, UpdateDataRuleParam
 from backend.common.exception import errors
+from backend.common.security.permission import get_data_permission_columns, validate_data_rule
+from backend.common.security.user_cache import user_cache
 from backend.core.conf import settings
 from backend.database.db import async_db_session
-from backend.database.redis import redis_client
-from backend.utils.import_parse import dynamic_import_data_model
 
 
 class DataRuleService:
@@ -40,16 +40,7 @@ class DataRuleService:
 
     @staticmethod
     async def get_columns(model: str) -> list[str]:
-        if model not in settings.DATA_PERMISSION_MODELS:
-            raise errors.NotFoundError(msg='数据模型不存在')
-        try:
-            model_ins = dynamic_import_data_model(settings.DATA_PERMISSION_MODELS[model])
-        except (ImportError, AttributeError):
-            raise errors.ServerError(msg=f'数据模型 {model} 动态导入失败，请联系系统超级管理员')
-        model_columns = [
-            key for key in model_ins.__table__.columns.keys() if key not in settings.DATA_PERMISSION_COLUMN_EXCLUDE
-        ]
-        return model_columns
+        return get_data_permission_columns(model)
 
     @staticmethod
     async def get_select(*, name: str = None) -> Select:
@@ -67,6 +58,7 @@ class DataRuleService:
             data_rule = await data_rule_dao.get_by_name(db, obj.name)
             if data_rule:
                 raise errors.ForbiddenError(msg='数据权限规则已存在')
+            validate_data_rule(obj.model, obj.column)
             await data_rule_dao.create(db, obj)
 
     @staticmethod
@@ -75,15 +67,17 @@ class DataRuleService:
             data_rule = await data_rule_dao.get(db, pk)
             if not data_rule:
                 raise errors.NotFoundError(msg='数据权限规则不存在')
+            validate_data_rule(obj.model, obj.column)
             count = await data_rule_dao.update(db, pk, obj)
-            return count
+        await user_cache.invalidate_rules(pk)
+        return count
 
     @staticmethod
     async def delete(*, request: Request, pk: list[int]) -> int:
         async with async_db_session.begin() as db:
             count = await data_rule_dao.delete(db, pk)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-            return count
+        await user_cache.invalidate_rules(*pk)
+        return count
 
 
 data_rule_service: DataRuleService = DataRuleService()
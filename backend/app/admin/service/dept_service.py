@@ -8,10 +8,10 @@ from backend.app.admin.crud.crud_dept import dept_dao
 from backend.app.admin.model import Dept
 from backend.app.admin.schema.dept import CreateDeptParam, UpdateDeptParam
 from backend.common.exception import errors
-from backend.core.conf import settings
+from backend.common.security.user_cache import user_cache
 from backend.database.db import async_db_session
-from backend.database.redis import redis_client
 from backend.utils.build_tree import get_tree_data
+from backend.utils.tree_cache import dept_tree_cache
 
 
 class DeptService:
@@ -29,11 +29,14 @@ class DeptService:
             phone: str | None = None, status: int | None = None,
             store_id: int
     ) -> list[dict[str, Any]]:
-        async with async_db_session() as db:
-            dept_select = await dept_dao.get_all(db=db, name=name, leader=leader,
-                                                 phone=phone, status=status, store_id=store_id)
-            tree_data = get_tree_data(dept_select)
-            return tree_data
+        async def build() -> list[dict[str, Any]]:
+            # 缓存在写入后立即重建，读取主库避免缓存副本延迟期间的旧数据
+            async with async_db_session.primary() as db:
+                dept_select = await dept_dao.get_all(db=db, name=name, leader=leader,
+                                                     phone=phone, status=status, store_id=store_id)
+                return get_tree_data(dept_select)
+
+        return await dept_tree_cache.get_or_build((name, leader, phone, status, store_id), build)
 
     @staticmethod
     async def create(*, obj: CreateDeptParam) -> None:
@@ -46,6 +49,7 @@ class DeptService:
                 if not parent_dept:
                     raise errors.NotFoundError(msg='父级部门不存在')
             await dept_dao.create(db, obj)
+        await dept_tree_cache.invalidate()
 
     @staticmethod
     async def update(*, pk: int, obj: UpdateDeptParam) -> int:
@@ -63,7 +67,9 @@ class DeptService:
             if obj.parent_id == dept.id:
                 raise errors.ForbiddenError(msg='禁止关联自身为父级')
             count = await dept_dao.update(db, pk, obj)
-            return count
+        await dept_tree_cache.invalidate()
+        await user_cache.invalidate_depts(pk)
+        return count
 
     @staticmethod
     async def delete(*, request: Request, pk: int) -> int:
@@ -75,8 +81,9 @@ class DeptService:
             if children:
                 raise errors.ForbiddenError(msg='部门下存在子部门，无法删除')
             count = await dept_dao.delete(db, pk)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-            return count
+        await dept_tree_cache.invalidate()
+        await user_cache.invalidate_depts(pk)
+        return count
 
 
 dept_service: DeptService = DeptService()
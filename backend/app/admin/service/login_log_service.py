@@ -17,6 +17,12 @@ class LoginLogService:
     async def get_select(*, username: str, status: int, ip: str) -> Select:
         return await login_log_dao.get_list(username=username, status=status, ip=ip)
 
+    @staticmethod
+    async def get_export_select(
+        *, username: str | None = None, status: int | None = None, ip: str | None = None
+    ) -> Select:
+        return await login_log_dao.get_export_list(username=username, status=status, ip=ip)
+
     @staticmethod
     async def create(
         *,
@@ -9,10 +9,10 @@ from backend.app.admin.crud.crud_role import role_dao
 from backend.app.admin.model import Menu
 from backend.app.admin.schema.menu import CreateMenuParam, UpdateMenuParam
 from backend.common.exception import errors
-from backend.core.conf import settings
+from backend.common.security.user_cache import user_cache
 from backend.database.db import async_db_session
-from backend.database.redis import redis_client
 from backend.utils.build_tree import get_tree_data
+from backend.utils.tree_cache import menu_tree_cache
 
 
 class MenuService:
@@ -26,10 +26,13 @@ class MenuService:
 
     @staticmethod
     async def get_menu_tree(*, title: str | None = None, status: int | None = None) -> list[dict[str, Any]]:
-        async with async_db_session() as db:
-            menu_select = await menu_dao.get_all(db, title=title, status=status)
-            menu_tree = get_tree_data(menu_select)
-            return menu_tree
+        async def build() -> list[dict[str, Any]]:
+            # 缓存在写入后立即重建，读取主库避免缓存副本延迟期间的旧数据
+            async with async_db_session.primary() as db:
+                menu_select = await menu_dao.get_all(db, title=title, status=status)
+                return get_tree_data(menu_select)
+
+        return await menu_tree_cache.get_or_build(('all', title, status), build)
 
     @staticmethod
     async def get_role_menu_tree(*, pk: int) -> list[dict[str, Any]]:
@@ -44,16 +47,20 @@ class MenuService:
 
     @staticmethod
     async def get_user_menu_tree(*, request: Request) -> list[dict[str, Any]]:
-        async with async_db_session() as db:
-            roles = request.user.roles
-            menu_ids = []
-            menu_tree = []
-            if roles:
-                for role in roles:
-                    menu_ids.extend([menu.id for menu in role.menus])
-                menu_select = await menu_dao.get_role_menus(db, request.user.is_superuser, menu_ids)
-                menu_tree = get_tree_data(menu_select)
-            return menu_tree
+        roles = request.user.roles
+        if not roles:
+            return []
+        superuser = request.user.is_superuser
+        menu_ids = frozenset(menu.id for role in roles for menu in role.menus)
+
+        async def build() -> list[dict[str, Any]]:
+            # 缓存在写入后立即重建，读取主库避免缓存副本延迟期间的旧数据
+            async with async_db_session.primary() as db:
+                menu_select = await menu_dao.get_role_menus(db, superuser, list(menu_ids))
+                return get_tree_data(menu_select)
+
+        # 超级管理员不按菜单过滤，共用同一缓存
+        return await menu_tree_cache.get_or_build(('user', superuser, None if superuser else menu_ids), build)
 
     @staticmethod
     async def create(*, obj: CreateMenuParam) -> None:
@@ -66,6 +73,7 @@ class MenuService:
                 if not parent_menu:
                     raise errors.NotFoundError(msg='父级菜单不存在')
             await menu_dao.create(db, obj)
+        await menu_tree_cache.invalidate()
 
     @staticmethod
     async def update(*, pk: int, obj: UpdateMenuParam) -> int:
@@ -83,7 +91,9 @@ class MenuService:
             if obj.parent_id == menu.id:
                 raise errors.ForbiddenError(msg='禁止关联自身为父级')
             count = await menu_dao.update(db, pk, obj)
-            return count
+        await menu_tree_cache.invalidate()
+        await user_cache.invalidate_menus(pk)
+        return count
 
     @staticmethod
     async def delete(*, request: Request, pk: int) -> int:
@@ -92,8 +102,9 @@ class MenuService:
             if children:
                 raise errors.ForbiddenError(msg='菜单下存在子菜单，无法删除')
             count = await menu_dao.delete(db, pk)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-            return count
+        await menu_tree_cache.invalidate()
+        await user_cache.invalidate_menus(pk)
+        return count
 
 
 menu_service: MenuService = MenuService()
@@ -63,20 +63,24 @@ class OAuth2Service:
                 new_user_social = CreateUserSocialParam(source=social.value, uid=str(social_id), user_id=sys_user_id)
                 await user_social_dao.create(db, new_user_social)
             # 创建 token
-            access_token = await jwt.create_access_token(
-                str(sys_user_id),
-                sys_user.is_multi_login,
-                sys_user.user_type,
-                # extra info
-                username=sys_user.username,
-                nickname=sys_user.nickname,
-                last_login_time=timezone.t_str(timezone.now()),
-                ip=request.state.ip,
-                os=request.state.os,
-                browser=request.state.browser,
-                device=request.state.device,
-            )
-            refresh_token = await jwt.create_refresh_token(str(sys_user_id), multi_login=sys_user.is_multi_login, user_type=sys_user.user_type)
+            async with redis_client.transaction() as pipe:
+                access_token = await jwt.create_access_token(
+                    str(sys_user_id),
+                    sys_user.is_multi_login,
+                    sys_user.user_type,
+                    pipe=pipe,
+                    # extra info
+                    username=sys_user.username,
+                    nickname=sys_user.nickname,
+                    last_login_time=timezone.t_str(timezone.now()),
+                    ip=request.state.ip,
+                    os=request.state.os,
+                    browser=request.state.browser,
+                    device=request.state.device,
+                )
+                refresh_token = await jwt.create_refresh_token(
+                    str(sys_user_id), multi_login=sys_user.is_multi_login, user_type=sys_user.user_type, pipe=pipe
+                )
             await user_dao.update_login_time(db, sys_user.phone)
             await db.refresh(sys_user)
             login_log = dict(
@@ -12,11 +12,22 @@ class OperaLogService:
     async def get_select(*, username: str | None = None, status: int | None = None, ip: str | None = None) -> Select:
         return await opera_log_dao.get_list(username=username, status=status, ip=ip)
 
+    @staticmethod
+    async def get_export_select(
+        *, username: str | None = None, status: int | None = None, ip: str | None = None
+    ) -> Select:
+        return await opera_log_dao.get_export_list(username=username, status=status, ip=ip)
+
     @staticmethod
     async def create(*, obj_in: CreateOperaLogParam):
         async with async_db_session.begin() as db:
             await opera_log_dao.create(db, obj_in)
 
+    @staticmethod
+    async def bulk_create(*, obj_in: list[CreateOperaLogParam]):
+        async with async_db_session.begin() as db:
+            await opera_log_dao.bulk_create(db, obj_in)
+
     @staticmethod
     async def delete(*, pk: list[int]) -> int:
         async with async_db_session.begin() as db:
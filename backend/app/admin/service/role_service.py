@@ -16,9 +16,8 @@ from backend.app.admin.schema.role import (
     UpdateRoleRuleParam,
 )
 from backend.common.exception import errors
-from backend.core.conf import settings
+from backend.common.security.user_cache import user_cache
 from backend.database.db import async_db_session
-from backend.database.redis import redis_client
 
 
 class RoleService:
@@ -65,7 +64,8 @@ class RoleService:
                 if role:
                     raise errors.ForbiddenError(msg='角色已存在')
             count = await role_dao.update(db, pk, obj)
-            return count
+        await user_cache.invalidate_roles(pk)
+        return count
 
     @staticmethod
     async def update_role_menu(*, request: Request, pk: int, menu_ids: UpdateRoleMenuParam, store_id: int) -> int:
@@ -73,14 +73,12 @@ class RoleService:
             role = await role_dao.get(db, pk)
             if not role or role.store_id != store_id:
                 raise errors.NotFoundError(msg='角色不存在')
-            for menu_id in menu_ids.menus:
-                menu = await menu_dao.get(db, menu_id)
-                if not menu:
-                    raise errors.NotFoundError(msg='菜单不存在')
-            count = await role_dao.update_menus(db, pk, menu_ids)
-            if pk in [role.id for role in request.user.roles]:
-                await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-            return count
+            menus, missing = await menu_dao.get_many(db, menu_ids.menus)
+            if missing:
+                raise errors.NotFoundError(msg=f'菜单不存在：{missing}')
+            count = await role_dao.update_menus(db, pk, menus)
+        await user_cache.invalidate_roles(pk)
+        return count
 
     @staticmethod
     async def update_role_rule(*, request: Request, pk: int, rule_ids: UpdateRoleRuleParam, store_id: int) -> int:
@@ -88,21 +86,19 @@ class RoleService:
             role = await role_dao.get(db, pk)
             if not role or role.store_id != store_id:
                 raise errors.NotFoundError(msg='角色不存在')
-            for rule_id in rule_ids.rules:
-                rule = await data_rule_dao.get(db, rule_id)
-                if not rule:
-                    raise errors.NotFoundError(msg='数据权限不存在')
-            count = await role_dao.update_rules(db, pk, rule_ids)
-            if pk in [role.id for role in request.user.roles]:
-                await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-            return count
+            rules, missing = await data_rule_dao.get_many(db, rule_ids.rules)
+            if missing:
+                raise errors.NotFoundError(msg=f'数据权限不存在：{missing}')
+            count = await role_dao.update_rules(db, pk, rules)
+        await user_cache.invalidate_roles(pk)
+        return count
 
     @staticmethod
     async def delete(*, request: Request, pk: list[int], store_id: int) -> int:
         async with async_db_session.begin() as db:
             count = await role_dao.delete(db, pk, store_id)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-            return count
+        await user_cache.invalidate_roles(*pk)
+        return count
 
 
 role_service: RoleService = RoleService()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+import time
+
+from datetime import datetime
+
+from fastapi import Request
+
+from backend.app.admin.schema.token import GetTokenDetail
+from backend.common.enums import StatusType
+from backend.common.security.jwt import remove_sessions, superuser_verify
+from backend.common.security.user_cache import user_cache
+from backend.core.conf import settings
+from backend.database.redis import redis_client
+from backend.utils.timezone import timezone
+
+
+class TokenService:
+    @staticmethod
+    async def _load_sessions(members: list[str]) -> tuple[list[dict], list[str]]:
+        """
+        批量获取会话附加信息，一次往返完成
+
+        :param members: 会话登记成员，格式：user_id:session_uuid
+        :return: 有效会话附加信息，已失效的会话登记成员
+        """
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.mget([f'{settings.TOKEN_EXTRA_INFO_REDIS_PREFIX}:{m.split(":", 1)[1]}' for m in members])
+            for member in members:
+                pipe.exists(f'{settings.TOKEN_REDIS_PREFIX}:{member}')
+            extra_infos, *exists = await pipe.execute()
+        sessions = []
+        expired = []
+        for member, extra_info, alive in zip(members, extra_infos, exists):
+            if not alive or not extra_info:
+                expired.append(member)
+                continue
+            sessions.append(json.loads(extra_info))
+        return sessions, expired
+
+    @staticmethod
+    async def _to_details(sessions: list[dict]) -> list[GetTokenDetail]:
+        """
+        会话附加信息转令牌详情
+
+        :param sessions:
+        :return:
+        """
+        if not sessions:
+            return []
+        online = await redis_client.smismember(
+            settings.TOKEN_ONLINE_REDIS_PREFIX, [session['session_uuid'] for session in sessions]
+        )
+        return [
+            GetTokenDetail(
+                id=session['id'],
+                session_uuid=session['session_uuid'],
+                username=session.get('username') or '未知',
+                nickname=session.get('nickname') or '未知',
+                ip=session.get('ip') or '未知',
+                os=session.get('os') or '未知',
+                browser=session.get('browser') or '未知',
+                device=session.get('device') or '未知',
+                status=StatusType.enable.value if is_online else StatusType.disable.value,
+                last_login_time=session.get('last_login_time') or '未知',
+                expire_time=datetime.fromtimestamp(session['expire_time'], timezone.tz_info),
+            )
+            for session, is_online in zip(sessions, online)
+        ]
+
+    async def get_list(
+        self, *, limit: int, offset: int, username: str | None = None
+    ) -> tuple[list[GetTokenDetail], int]:
+        """
+        分页获取在线会话，按过期时间倒序
+
+        :param limit:
+        :param offset:
+        :param username: 用户名，精确匹配
+        :return:
+        """
+        if username:
+            key = f'{settings.TOKEN_SESSION_USERNAME_REDIS_PREFIX}:{username}'
+        else:
+            key = settings.TOKEN_SESSION_REDIS_PREFIX
+        while True:
+            # 先清理已过期的会话，再统计总数并读取当前页，一次往返完成
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(key, '-inf', time.time())
+                pipe.zcard(key)
+                pipe.zrevrange(key, offset, offset + limit - 1)
+                _, total, members = await pipe.execute()
+            if not members:
+                return [], total
+            sessions, expired = await self._load_sessions(members)
+            if not expired:
+                return await self._to_details(sessions), total
+            # 已被撤销但未移除登记的会话，移除后重新统计并读取当前页，保证每页均为有效会话
+            await redis_client.zrem(key, *expired)
+
+    @staticmethod
+    async def kick_out(*, request: Request, pk: int, session_uuid: str) -> None:
+        superuser_verify(request)
+        token_key = f'{settings.TOKEN_REDIS_PREFIX}:{pk}:{session_uuid}'
+        async with redis_client.transaction() as pipe:
+            pipe.delete(token_key)
+            pipe.zrem(f'{settings.TOKEN_INDEX_REDIS_PREFIX}:{pk}', token_key)
+            await remove_sessions(pk, session_uuid, pipe=pipe)
+            await user_cache.evict_sessions(pk, session_uuid, pipe=pipe)
+
+
+token_service: TokenService = TokenService()
@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import asyncio
 import random
 
-from fastapi import Request
+from datetime import datetime
+from itertools import islice
+from typing import Any, AsyncIterator
+
+from fastapi import Request, UploadFile
+from pydantic import ValidationError
 from sqlalchemy import Select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 
 from backend.app.admin.crud.crud_dept import dept_dao
 from backend.app.admin.crud.crud_role import role_dao
@@ -12,16 +20,29 @@ from backend.app.admin.model import User
 from backend.app.admin.schema.user import (
     AddUserParam,
     AvatarParam,
+    ImportUserParam,
     RegisterUserParam,
     ResetPasswordParam,
     UpdateUserParam,
     UpdateUserRoleParam,
 )
 from backend.common.exception import errors
-from backend.common.security.jwt import get_hash_password, get_token, jwt_decode, password_verify, superuser_verify
+from backend.common.log import log
+from backend.common.security.jwt import (
+    get_hash_password,
+    get_password_salt,
+    get_token_payload,
+    password_import_executor,
+    password_verify,
+    revoke_access_tokens,
+    revoke_refresh_tokens,
+    superuser_verify,
+)
+from backend.common.security.user_cache import user_cache
 from backend.core.conf import settings
-from backend.database.db import async_db_session
+from backend.database.db import async_db_read_session, async_db_session
 from backend.database.redis import redis_client
+from backend.utils.spreadsheet import check_file_format, get_file_format, iter_rows, stream_csv, stream_xlsx
 
 
 class UserService:
@@ -58,31 +79,29 @@ class UserService:
             dept = await dept_dao.get(db, obj.dept_id)
             if not dept:
                 raise errors.NotFoundError(msg='部门不存在')
-            for role_id in obj.roles:
-                role = await role_dao.get(db, role_id)
-                if not role:
-                    raise errors.NotFoundError(msg='角色不存在')
-            await user_dao.add(db, obj)
+            roles, missing = await role_dao.get_many(db, obj.roles)
+            if missing:
+                raise errors.NotFoundError(msg=f'角色不存在：{missing}')
+            await user_dao.add(db, obj, roles)
 
     @staticmethod
     async def pwd_reset(*, request: Request, obj: ResetPasswordParam) -> int:
         async with async_db_session.begin() as db:
             user = await user_dao.get(db, request.user.id)
-            if not password_verify(obj.old_password, user.password):
+            if not await password_verify(obj.old_password, user.password):
                 raise errors.ForbiddenError(msg='原密码错误')
             np1 = obj.new_password
             np2 = obj.confirm_password
             if np1 != np2:
                 raise errors.ForbiddenError(msg='密码输入不一致')
-            new_pwd = get_hash_password(obj.new_password, user.salt)
-            count = await user_dao.reset_password(db, request.user.id, new_pwd)
-            key_prefix = [
-                f'{settings.TOKEN_REDIS_PREFIX}:{request.user.id}',
-                f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{request.user.id}',
-                f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}',
-            ]
-            for prefix in key_prefix:
-                await redis_client.delete_prefix(prefix)
+            # 使用当前配置的计算参数生成新盐，旧盐包含变更前的计算轮数
+            salt = get_password_salt()
+            new_pwd = await get_hash_password(obj.new_password, salt)
+            count = await user_dao.reset_password(db, request.user.id, new_pwd, salt)
+            async with redis_client.transaction() as pipe:
+                await revoke_access_tokens(request.user.id, pipe=pipe)
+                await revoke_refresh_tokens(request.user.id, pipe=pipe)
+                await user_cache.invalidate(request.user.id, pipe=pipe)
             return count
 
     @staticmethod
@@ -116,7 +135,7 @@ class UserService:
                 if email:
                     raise errors.ForbiddenError(msg='邮箱已注册')
             count = await user_dao.update_userinfo(db, input_user.id, obj)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
+            await user_cache.invalidate(request.user.id)
             return count
 
     @staticmethod
@@ -128,12 +147,11 @@ class UserService:
             input_user = await user_dao.get_with_relation(db, username=username)
             if not input_user:
                 raise errors.NotFoundError(msg='用户不存在')
-            for role_id in obj.roles:
-                role = await role_dao.get(db, role_id)
-                if not role:
-                    raise errors.NotFoundError(msg='角色不存在')
-            await user_dao.update_role(db, input_user, obj)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{input_user.id}')
+            roles, missing = await role_dao.get_many(db, obj.roles)
+            if missing:
+                raise errors.NotFoundError(msg=f'角色不存在：{missing}')
+            await user_dao.update_role(db, input_user, roles)
+            await user_cache.invalidate(input_user.id)
 
     @staticmethod
     async def update_avatar(*, request: Request, phone: str, avatar: AvatarParam) -> int:
@@ -145,7 +163,7 @@ class UserService:
             if not input_user:
                 raise errors.NotFoundError(msg='用户不存在')
             count = await user_dao.update_avatar(db, input_user.id, avatar)
-            await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
+            await user_cache.invalidate(request.user.id)
             return count
 
     @staticmethod
@@ -153,6 +171,58 @@ class UserService:
                          user_id: int = None) -> Select:
         return await user_dao.get_list(dept=dept, username=username, phone=phone, status=status, user_id=user_id)
 
+    @staticmethod
+    async def import_users(*, request: Request, file: UploadFile) -> dict[str, Any]:
+        superuser_verify(request)
+        fmt = get_file_format(file.filename)
+        result = {'total': 0, 'created': 0, 'failed': 0, 'errors': []}
+        seen = {column: set() for column in _USER_UNIQUE_COLUMNS}
+        rows = enumerate(iter_rows(file.file, fmt), start=2)
+        while True:
+            # 文件解析在线程中进行，避免阻塞事件循环
+            batch = await run_in_threadpool(list, islice(rows, settings.USER_IMPORT_BATCH_SIZE))
+            if not batch:
+                break
+            if result['total'] + len(batch) > settings.USER_IMPORT_MAX_ROWS:
+                msg = f'超出单次导入的最大行数 {settings.USER_IMPORT_MAX_ROWS}，之后的行未导入'
+                _import_error(result, batch[0][0], msg)
+                break
+            result['total'] += len(batch)
+            await _import_batch(batch, seen, result, request.user.store_id)
+        result['errors'].sort(key=lambda error: error['row'])
+        return result
+
+    @staticmethod
+    async def export_users(
+        *, fmt: str, dept: int = None, username: str = None, phone: str = None, status: int = None
+    ) -> AsyncIterator[bytes]:
+        check_file_format(fmt)
+        stmt = await user_dao.get_list(dept=dept, username=username, phone=phone, status=status)
+
+        async def rows() -> AsyncIterator[list[Any]]:
+            async with async_db_read_session() as db:
+                users = await db.stream_scalars(stmt.execution_options(yield_per=settings.USER_EXPORT_BATCH_SIZE))
+                async for user in users:
+                    yield [
+                        user.id,
+                        user.uuid,
+                        user.username,
+                        user.nickname,
+                        user.phone,
+                        user.email,
+                        user.dept.name if user.dept else None,
+                        ','.join(role.name for role in user.roles),
+                        user.status,
+                        user.is_superuser,
+                        user.is_staff,
+                        user.is_multi_login,
+                        _format_time(user.join_time),
+                        _format_time(user.last_login_time),
+                    ]
+
+        stream = stream_csv if fmt == 'csv' else stream_xlsx
+        return stream(_USER_EXPORT_HEADERS, rows())
+
     @staticmethod
     async def update_permission(*, request: Request, pk: int) -> int:
         async with async_db_session.begin() as db:
@@ -164,7 +234,7 @@ class UserService:
                     raise errors.ForbiddenError(msg='非法操作')
                 super_status = await user_dao.get_super(db, pk)
                 count = await user_dao.set_super(db, pk, False if super_status else True)
-                await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{pk}')
+                await user_cache.invalidate(pk)
                 return count
 
     @staticmethod
@@ -178,7 +248,7 @@ class UserService:
                     raise errors.ForbiddenError(msg='非法操作')
                 staff_status = await user_dao.get_staff(db, pk)
                 count = await user_dao.set_staff(db, pk, False if staff_status else True)
-                await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{pk}')
+                await user_cache.invalidate(pk)
                 return count
 
     @staticmethod
@@ -192,7 +262,7 @@ class UserService:
                     raise errors.ForbiddenError(msg='非法操作')
                 status = await user_dao.get_status(db, pk)
                 count = await user_dao.set_status(db, pk, False if status else True)
-                await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{pk}')
+                await user_cache.invalidate(pk)
                 return count
 
     @staticmethod
@@ -205,30 +275,23 @@ class UserService:
                 user_id = request.user.id
                 multi_login = await user_dao.get_multi_login(db, pk) if pk != user_id else request.user.is_multi_login
                 count = await user_dao.set_multi_login(db, pk, False if multi_login else True)
-                await redis_client.delete(f'{settings.JWT_USER_REDIS_PREFIX}:{request.user.id}')
-                token = get_token(request)
-                token_payload = jwt_decode(token)
+                await user_cache.invalidate(request.user.id)
+                token_payload = get_token_payload(request)
                 latest_multi_login = await user_dao.get_multi_login(db, pk)
                 # 超级用户修改自身时，除当前token外，其他token失效
                 if pk == user_id:
                     if not latest_multi_login:
-                        key_prefix = f'{settings.TOKEN_REDIS_PREFIX}:{pk}'
-                        await redis_client.delete_prefix(
-                            key_prefix, exclude=f'{key_prefix}:{token_payload.session_uuid}'
-                        )
+                        await revoke_access_tokens(pk, exclude_session=token_payload.session_uuid)
                         refresh_token = request.cookies.get(settings.COOKIE_REFRESH_TOKEN_KEY)
                         if refresh_token:
-                            key_prefix = f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{pk}'
-                            await redis_client.delete_prefix(key_prefix, exclude=f'{key_prefix}:{refresh_token}')
+                            await revoke_refresh_tokens(pk, exclude_token=refresh_token)
                 # 超级用户修改他人时，其他token将全部失效
                 else:
                     if not latest_multi_login:
-                        key_prefix = [f'{settings.TOKEN_REDIS_PREFIX}:{pk}']
+                        await revoke_access_tokens(pk)
                         refresh_token = request.cookies.get(settings.COOKIE_REFRESH_TOKEN_KEY)
                         if refresh_token:
-                            key_prefix.append(f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{pk}')
-                        for prefix in key_prefix:
-                            await redis_client.delete_prefix(prefix)
+                            await revoke_refresh_tokens(pk)
                 return count
 
     @staticmethod
@@ -238,13 +301,126 @@ class UserService:
             if not input_user:
                 raise errors.NotFoundError(msg='用户不存在')
             count = await user_dao.delete(db, input_user.id)
-            key_prefix = [
-                f'{settings.TOKEN_REDIS_PREFIX}:{input_user.id}',
-                f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{input_user.id}',
-            ]
-            for key in key_prefix:
-                await redis_client.delete_prefix(key)
+            async with redis_client.transaction() as pipe:
+                await revoke_access_tokens(input_user.id, pipe=pipe)
+                await revoke_refresh_tokens(input_user.id, pipe=pipe)
+                await user_cache.invalidate(input_user.id, pipe=pipe)
             return count
 
 
+# 导入时需校验唯一性的字段
+_USER_UNIQUE_COLUMNS = ('phone', 'username', 'nickname', 'email')
+_USER_EXPORT_HEADERS = (
+    'id',
+    'uuid',
+    'username',
+    'nickname',
+    'phone',
+    'email',
+    'dept',
+    'roles',
+    'status',
+    'is_superuser',
+    'is_staff',
+    'is_multi_login',
+    'join_time',
+    'last_login_time',
+)
+
+
+def _format_time(value: datetime | None) -> str | None:
+    return value.strftime(settings.DATETIME_FORMAT) if value else None
+
+
+def _import_error(result: dict[str, Any], line: int, msg: str) -> None:
+    result['failed'] += 1
+    if len(result['errors']) < settings.USER_IMPORT_ERROR_LIMIT:
+        result['errors'].append({'row': line, 'msg': msg})
+
+
+async def _import_batch(
+    batch: list[tuple[int, dict[str, str | None]]], seen: dict[str, set[str]], result: dict[str, Any], store_id: int
+) -> None:
+    """
+    校验并写入一批导入行，唯一性、部门及角色均按批次集合查询
+
+    :param batch: 行号及行数据
+    :param seen: 已导入行的唯一字段值，用于检查文件内重复
+    :param result: 导入结果
+    :param store_id: 导入用户所属门店，部门须属于该门店
+    :return:
+    """
+    valid: list[tuple[int, ImportUserParam]] = []
+    for line, row in batch:
+        try:
+            obj = ImportUserParam.model_validate(row)
+        except ValidationError as e:
+            error = e.errors()[0]
+            _import_error(result, line, f'{".".join(map(str, error["loc"]))}: {error["msg"]}')
+            continue
+        obj.username = obj.username or obj.phone
+        obj.nickname = obj.nickname or obj.username
+        duplicate = next((c for c in _USER_UNIQUE_COLUMNS if getattr(obj, c) and getattr(obj, c) in seen[c]), None)
+        if duplicate:
+            _import_error(result, line, f'{duplicate} 在文件中重复')
+            continue
+        for column in _USER_UNIQUE_COLUMNS:
+            if getattr(obj, column):
+                seen[column].add(getattr(obj, column))
+        valid.append((line, obj))
+    if not valid:
+        return
+
+    # 写入前在主库校验，避免副本延迟导致漏检
+    async with async_db_session.primary() as db:
+        existing = {
+            column: await user_dao.get_existing_values(
+                db, column, [getattr(obj, column) for _, obj in valid if getattr(obj, column)]
+            )
+            for column in _USER_UNIQUE_COLUMNS
+        }
+        depts, _ = await dept_dao.get_many(db, [obj.dept_id for _, obj in valid])
+        dept_ids = {dept.id for dept in depts if not dept.del_flag and dept.store_id == store_id}
+        roles, _ = await role_dao.get_many(db, [role_id for _, obj in valid for role_id in obj.roles])
+        role_ids = {role.id for role in roles}
+
+    checked: list[tuple[int, ImportUserParam]] = []
+    for line, obj in valid:
+        exists = next((c for c in _USER_UNIQUE_COLUMNS if getattr(obj, c) in existing[c]), None)
+        if exists:
+            _import_error(result, line, f'{exists} 已存在')
+        elif obj.dept_id not in dept_ids:
+            _import_error(result, line, '部门不存在')
+        elif missing := [role_id for role_id in obj.roles if role_id not in role_ids]:
+            _import_error(result, line, f'角色不存在：{missing}')
+        else:
+            checked.append((line, obj))
+    if not checked:
+        return
+
+    salts = [get_password_salt() for _ in checked]
+    passwords = []
+    # 按线程数分段提交，避免单次导入占满等待队列导致其他导入被拒绝
+    chunk_size = password_import_executor.max_workers
+    for start in range(0, len(checked), chunk_size):
+        passwords.extend(
+            await asyncio.gather(*[
+                get_hash_password(obj.password, salt, executor=password_import_executor)
+                for (_, obj), salt in zip(checked[start : start + chunk_size], salts[start : start + chunk_size])
+            ])
+        )
+    users = []
+    for (_, obj), password, salt in zip(checked, passwords, salts):
+        dict_obj = obj.model_dump(exclude={'roles'})
+        dict_obj.update({'password': password, 'salt': salt, 'store_id': store_id})
+        users.append(dict_obj)
+    try:
+        async with async_db_session.begin() as db:
+            result['created'] += await user_dao.bulk_add(db, users, {obj.phone: obj.roles for _, obj in checked})
+    except IntegrityError as e:
+        log.error(f'批量导入用户写入失败：{e}')
+        for line, _ in checked:
+            _import_error(result, line, '数据已被修改，写入冲突，请重新导入')
+
+
 user_service: UserService = UserService()
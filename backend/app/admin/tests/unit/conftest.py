@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return 'asyncio'
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any
+
+from backend.utils.build_tree import recursive_to_tree, traversal_to_tree
+
+
+def node(id: int, parent_id: int | None) -> dict[str, Any]:
+    return {'id': id, 'parent_id': parent_id}
+
+
+def ids(tree: list[dict[str, Any]]) -> list:
+    return [(n['id'], ids(n['children'])) if 'children' in n else n['id'] for n in tree]
+
+
+def test_traversal() -> None:
+    nodes = [node(1, None), node(2, 1), node(3, 2), node(4, None), node(5, 1)]
+    assert ids(traversal_to_tree(nodes)) == [(1, [(2, [3]), 5]), 4]
+
+
+def test_traversal_child_before_parent() -> None:
+    nodes = [node(3, 2), node(2, 1), node(1, None)]
+    assert ids(traversal_to_tree(nodes)) == [(1, [(2, [3])])]
+
+
+def test_traversal_orphan_nodes_become_roots() -> None:
+    # 父节点不存在（已删除或被过滤）的节点作为根节点，其子节点保持挂载
+    nodes = [node(1, None), node(2, 99), node(3, 2), node(4, 98)]
+    assert ids(traversal_to_tree(nodes)) == [1, (2, [3]), 4]
+
+
+def test_traversal_deduplicates_nodes() -> None:
+    nodes = [node(1, None), node(2, 1), node(2, 1)]
+    assert ids(traversal_to_tree(nodes)) == [(1, [2])]
+
+
+def test_recursive() -> None:
+    nodes = [node(1, None), node(2, 1), node(3, 2), node(4, None), node(5, 1)]
+    assert ids(recursive_to_tree(nodes)) == [(1, [(2, [3]), 5]), 4]
+
+
+def test_recursive_orphan_nodes_are_skipped() -> None:
+    nodes = [node(1, None), node(2, 99), node(3, 2)]
+    assert ids(recursive_to_tree(nodes)) == [1]
+
+
+def test_recursive_from_parent() -> None:
+    nodes = [node(1, None), node(2, 1), node(3, 2), node(4, None)]
+    assert ids(recursive_to_tree(nodes, parent_id=1)) == [(2, [3])]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+from backend.utils import cache
+from backend.utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_get_before_expire(clock: list[float]) -> None:
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set('a', 1)
+    clock[0] += 4.9
+    assert c.get('a') == 1
+    assert 'a' in c
+
+
+def test_expire_removes_entry(clock: list[float]) -> None:
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set('a', 1)
+    clock[0] += 5
+    assert c.get('a') is None
+    assert len(c) == 0
+
+
+def test_per_key_ttl(clock: list[float]) -> None:
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set('a', 1, ttl=1)
+    c.set('b', 2)
+    clock[0] += 2
+    assert 'a' not in c
+    assert c.get('b') == 2
+
+
+def test_evict_least_recently_used(clock: list[float]) -> None:
+    c = TTLCache(maxsize=2, ttl=5)
+    c.set('a', 1)
+    c.set('b', 2)
+    # 访问 a 后 b 成为最久未使用的条目
+    assert c.get('a') == 1
+    c.set('c', 3)
+    assert len(c) == 2
+    assert 'b' not in c
+    assert c.get('a') == 1
+    assert c.get('c') == 3
+
+
+def test_zero_maxsize_disables_cache(clock: list[float]) -> None:
+    c = TTLCache(maxsize=0, ttl=5)
+    c.set('a', 1)
+    assert len(c) == 0
+
+
+def test_pop_and_pop_where(clock: list[float]) -> None:
+    c = TTLCache(maxsize=10, ttl=5)
+    for key in ('user:1', 'user:2', 'dept:1'):
+        c.set(key, key)
+    assert c.pop('dept:1') == 'dept:1'
+    assert c.pop('dept:1') is None
+    assert c.pop_where(lambda key: key.startswith('user:')) == 2
+    assert len(c) == 0
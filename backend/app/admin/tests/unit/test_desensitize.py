@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from backend.common.enums import OperaLogCipherType
+from backend.utils.desensitize import Desensitizer
+from backend.utils.encrypt import Md5Cipher
+
+SECRET_KEY = 'd77b25790a804c2b4a339dd0207941e4cefa5751935a33735bc73bb7071a005b'
+
+
+def test_nested_dict_and_list() -> None:
+    desensitizer = Desensitizer(99, ['password'], SECRET_KEY)
+    args = {
+        'username': 'admin',
+        'password': '123456',
+        'user': {'password': 'abc', 'profile': {'password': 'def'}},
+        'users': [{'password': 'ghi'}, [{'password': 'jkl'}], 'password'],
+    }
+    assert desensitizer.desensitize(args) == {
+        'username': 'admin',
+        'password': '******',
+        'user': {'password': '******', 'profile': {'password': '******'}},
+        'users': [{'password': '******'}, [{'password': '******'}], 'password'],
+    }
+
+
+def test_md5() -> None:
+    desensitizer = Desensitizer(OperaLogCipherType.md5, ['password'], SECRET_KEY)
+    args = desensitizer.desensitize({'items': [{'password': '123456'}]})
+    assert args['items'][0]['password'] == Md5Cipher.encrypt('123456')
+
+
+def test_plan_keeps_values() -> None:
+    desensitizer = Desensitizer(OperaLogCipherType.plan, ['password'], SECRET_KEY)
+    assert desensitizer.desensitize({'password': '123456'}) == {'password': '123456'}
+
+
+def test_empty_args() -> None:
+    desensitizer = Desensitizer(99, ['password'], SECRET_KEY)
+    assert desensitizer.desensitize({}) is None
+    assert desensitizer.desensitize(None) is None
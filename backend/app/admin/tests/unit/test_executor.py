@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+import pytest
+
+from backend.common.exception.errors import HTTPError
+from backend.utils.executor import BoundedExecutor
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_run() -> None:
+    executor = BoundedExecutor('test', max_workers=2, max_pending=2)
+    try:
+        assert await executor.run(pow, 2, 10) == 1024
+        assert await executor.run(int, '10', base=2) == 2
+        assert executor.stats()['completed'] == 2
+    finally:
+        executor.shutdown()
+
+
+async def test_reject_when_pending_exceeds_limit() -> None:
+    executor = BoundedExecutor('test', max_workers=1, max_pending=2)
+    release = threading.Event()
+    try:
+        tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert executor.pending == 2
+        with pytest.raises(HTTPError) as exc_info:
+            await executor.run(release.wait)
+        assert exc_info.value.status_code == 503
+        release.set()
+        await asyncio.gather(*tasks)
+        stats = executor.stats()
+        assert (stats['pending'], stats['completed'], stats['rejected']) == (0, 2, 1)
+        # 等待中的任务完成后可再次提交
+        assert await executor.run(release.wait) is True
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+async def test_reuse_after_shutdown() -> None:
+    executor = BoundedExecutor('test', max_workers=1, max_pending=1)
+    await executor.run(sum, [1, 2])
+    executor.shutdown()
+    assert await executor.run(sum, [1, 2]) == 3
+    executor.shutdown()
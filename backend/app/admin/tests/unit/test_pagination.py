@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import enum
+import uuid
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from sqlalchemy import Column, Date, DateTime, Enum, Float, Integer, Numeric, String, Uuid
+
+from backend.common.exception.errors import RequestError
+from backend.common.pagination import _decode_cursor, _encode_cursor
+
+
+class Level(enum.Enum):
+    low = 'low'
+    high = 'high'
+
+
+@pytest.mark.parametrize(
+    ['column', 'sort_value'],
+    [
+        (Column('id', Integer), 42),
+        (Column('name', String(20)), 'admin'),
+        (Column('created_time', DateTime), datetime(2024, 1, 2, 3, 4, 5, 678)),
+        (Column('join_date', Date), date(2024, 1, 2)),
+        (Column('created_time', DateTime), None),
+        (Column('amount', Numeric(10, 2)), Decimal('12.30')),
+        (Column('score', Float), 1.5),
+        (Column('uuid', Uuid), uuid.UUID('4c4ad8a4-1d3e-4a36-9f0b-2c7f3f3b8a11')),
+        (Column('level', Enum(Level)), Level.high),
+    ],
+)
+def test_cursor_round_trip(column: Column, sort_value: object) -> None:
+    cursor = _encode_cursor(sort_value, 7)
+    assert '=' not in cursor
+    assert _decode_cursor(cursor, column) == (sort_value, 7)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', _encode_cursor(1, 2)[:-2]])
+def test_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(RequestError):
+        _decode_cursor(cursor, Column('id', Integer))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import msgspec
+
+from backend.app.admin.schema.user import CurrentUserIns
+from backend.common.security.principal import (
+    PRINCIPAL_SCHEMA_VERSION,
+    Principal,
+    decode_principal,
+    encode_principal,
+)
+
+
+def build_user() -> CurrentUserIns:
+    now = datetime(2024, 1, 2, 3, 4, 5)
+    menus = [
+        {
+            'id': 1,
+            'title': '用户管理',
+            'name': 'SysUser',
+            'parent_id': None,
+            'sort': 1,
+            'path': '/sys/user',
+            'menu_type': 1,
+            'component': '/views/sys/user.vue',
+            'perms': 'sys:user:add,sys:user:edit',
+            'status': 1,
+            'created_time': now,
+        },
+        {
+            'id': 2,
+            'title': '删除用户',
+            'name': 'SysUserDel',
+            'parent_id': 1,
+            'sort': 2,
+            'path': None,
+            'menu_type': 2,
+            'component': None,
+            'perms': 'sys:user:del',
+            'status': 0,
+            'created_time': now,
+        },
+    ]
+    rules = [
+        {
+            'id': 1,
+            'name': '本部门',
+            'model': 'User',
+            'column': 'dept_id',
+            'operator': 0,
+            'expression': 0,
+            'value': '1',
+            'created_time': now,
+            'updated_time': None,
+        }
+    ]
+    return CurrentUserIns(
+        id=1,
+        uuid='uuid',
+        dept_id=1,
+        username='admin',
+        nickname='admin',
+        phone='13800000000',
+        user_type='0',
+        is_superuser=False,
+        is_staff=True,
+        is_multi_login=False,
+        join_time=now,
+        dept={'id': 1, 'name': '总部', 'parent_id': None, 'status': 1, 'del_flag': False, 'created_time': now},
+        roles=[{'id': 1, 'name': 'admin', 'status': 1, 'created_time': now, 'menus': menus, 'rules': rules}],
+    )
+
+
+def test_round_trip() -> None:
+    user = build_user()
+    principal = Principal.from_user(user)
+    decoded = decode_principal(encode_principal(principal))
+    assert decoded == principal
+    assert decoded.perms == user.perms
+    assert decoded.has_enabled_role is user.has_enabled_role
+    assert decoded.has_menu is user.has_menu
+    assert decoded.dept.name == '总部'
+    assert decoded.roles[0].rules[0].created_time == datetime(2024, 1, 2, 3, 4, 5)
+
+
+def test_decode_bytes() -> None:
+    principal = Principal.from_user(build_user())
+    assert decode_principal(encode_principal(principal).encode()) == principal
+
+
+def test_legacy_pydantic_blob_falls_back() -> None:
+    # 改写前缓存的是 model_dump_json 结果，解码失败时返回 None 并由调用方从数据库重新加载
+    assert decode_principal(build_user().model_dump_json()) is None
+
+
+def test_other_schema_version_falls_back() -> None:
+    data = msgspec.json.decode(encode_principal(Principal.from_user(build_user())))
+    assert data[0] == PRINCIPAL_SCHEMA_VERSION
+    data[0] = PRINCIPAL_SCHEMA_VERSION + 1
+    assert decode_principal(msgspec.json.encode(data)) is None
+
+
+def test_invalid_blob_falls_back() -> None:
+    assert decode_principal('') is None
+    assert decode_principal('not json') is None
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+from backend.database.query_stats import fingerprint
+
+
+@pytest.mark.parametrize(
+    ['statement', 'expected'],
+    [
+        ('SELECT * FROM sys_user WHERE id = 1', 'SELECT * FROM sys_user WHERE id = ?'),
+        ("SELECT * FROM sys_user WHERE name = 'it''s'", 'SELECT * FROM sys_user WHERE name = ?'),
+        ('SELECT * FROM sys_user LIMIT 10 OFFSET 20.5', 'SELECT * FROM sys_user LIMIT ? OFFSET ?'),
+        ('SELECT id_1, t2.id FROM sys_user AS t2', 'SELECT id_1, t2.id FROM sys_user AS t2'),
+        ('SELECT *\n  FROM sys_user\n WHERE id = %s', 'SELECT * FROM sys_user WHERE id = %s'),
+    ],
+)
+def test_fingerprint(statement: str, expected: str) -> None:
+    assert fingerprint(statement) == expected
+
+
+@pytest.mark.parametrize(
+    'statements',
+    [
+        ['SELECT * FROM sys_role WHERE id IN (1)', 'SELECT * FROM sys_role WHERE id IN (1, 2, 3)'],
+        ['SELECT * FROM sys_role WHERE id IN (%s)', 'SELECT * FROM sys_role WHERE id IN (%s, %s)'],
+        ['SELECT * FROM sys_role WHERE id IN (?)', 'SELECT * FROM sys_role WHERE id IN (?,?,?)'],
+        ['SELECT * FROM sys_role WHERE id IN ($1)', 'SELECT * FROM sys_role WHERE id IN ($1, $2)'],
+        [
+            'SELECT * FROM sys_role WHERE id IN (%(id_1_1)s)',
+            'SELECT * FROM sys_role WHERE id IN (%(id_1_1)s, %(id_1_2)s)',
+        ],
+    ],
+)
+def test_fingerprint_collapses_in_list(statements: list[str]) -> None:
+    assert {fingerprint(statement) for statement in statements} == {'SELECT * FROM sys_role WHERE id IN (...)'}
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from backend.utils.singleflight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_coalesce_concurrent_calls() -> None:
+    flight: SingleFlight[int, str] = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def load() -> str:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 'user'
+
+    tasks = [asyncio.create_task(flight.do(1, load)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert flight.stats() == {'executed': 1, 'coalesced': 4, 'inflight': 1}
+    release.set()
+    assert await asyncio.gather(*tasks) == ['user'] * 5
+    assert calls == 1
+    assert flight.stats()['inflight'] == 0
+
+
+async def test_different_keys_are_not_coalesced() -> None:
+    flight: SingleFlight[int, int] = SingleFlight()
+
+    async def load(value: int) -> int:
+        await asyncio.sleep(0)
+        return value
+
+    assert await asyncio.gather(flight.do(1, lambda: load(1)), flight.do(2, lambda: load(2))) == [1, 2]
+    assert flight.stats()['executed'] == 2
+
+
+async def test_error_propagates_to_all_waiters() -> None:
+    flight: SingleFlight[int, str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def load() -> str:
+        await release.wait()
+        raise ValueError('load failed')
+
+    tasks = [asyncio.create_task(flight.do(1, load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    # 失败的调用不会被缓存，之后的调用重新执行
+    assert await flight.do(1, lambda: asyncio.sleep(0, result='user')) == 'user'
+    assert flight.stats()['executed'] == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_load() -> None:
+    flight: SingleFlight[int, str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def load() -> str:
+        await release.wait()
+        return 'user'
+
+    first = asyncio.create_task(flight.do(1, load))
+    second = asyncio.create_task(flight.do(1, load))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == 'user'
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_forget_starts_new_call() -> None:
+    flight: SingleFlight[int, int] = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def load() -> int:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    first = asyncio.create_task(flight.do(1, load))
+    await asyncio.sleep(0)
+    flight.forget(1)
+    second = asyncio.create_task(flight.do(1, load))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, second)
+    assert calls == 2
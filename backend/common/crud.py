@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Iterable, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.common.model import MappedBase
+
+Model = TypeVar('Model', bound=MappedBase)
+
+
+async def select_models_by_ids(
+    db: AsyncSession, model: type[Model], pks: Iterable[int]
+) -> tuple[list[Model], list[int]]:
+    """
+    通过主键批量获取，单次 IN 查询
+
+    :param db:
+    :param model: SQLA 模型
+    :param pks: 主键列表，重复的主键仅返回一次
+    :return: 按传入顺序排列的实例，不存在的主键
+    """
+    pks = list(dict.fromkeys(pks))
+    if not pks:
+        return [], []
+    result = await db.execute(select(model).where(model.id.in_(pks)))
+    instances = {instance.id: instance for instance in result.scalars()}
+    return [instances[pk] for pk in pks if pk in instances], [pk for pk in pks if pk not in instances]
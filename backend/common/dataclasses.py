@@ -4,8 +4,6 @@ import dataclasses
 
 from datetime import datetime
 
-from fastapi import Response
-
 from backend.common.enums import StatusType
 
 
@@ -31,7 +29,14 @@ class RequestCallNext:
     msg: str
     status: StatusType
     err: Exception | None
-    response: Response
+
+
+@dataclasses.dataclass(frozen=True)
+class OperaLogArgsPolicy:
+    enabled: bool
+    capture_body: bool
+    capture_form: bool = False
+    include_keys: frozenset[str] | None = None
 
 
 @dataclasses.dataclass
@@ -59,3 +64,4 @@ class TokenPayload:
     id: int
     session_uuid: str
     expire_time: datetime
+    user_type: str | None = None
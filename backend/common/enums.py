@@ -55,6 +55,14 @@ class RoleDataRuleExpressionType(IntEnum):
     not_in = 7
 
 
+class PageCountType(StrEnum):
+    """分页总数统计方式"""
+
+    exact = 'exact'
+    cached = 'cached'
+    estimated = 'estimated'
+
+
 class MethodType(StrEnum):
     """请求方法"""
 
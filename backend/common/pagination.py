@@ -2,18 +2,31 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import hashlib
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from math import ceil
-from typing import TYPE_CHECKING, Generic, Sequence, TypeVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Generic, Sequence, TypeVar
+
+import msgspec
 
 from fastapi import Depends, Query
-from fastapi_pagination import pagination_ctx
-from fastapi_pagination.bases import AbstractPage, AbstractParams, RawParams
-from fastapi_pagination.ext.sqlalchemy import paginate
+from fastapi_pagination import pagination_ctx, resolve_params
+from fastapi_pagination.bases import AbstractPage, AbstractParams, CursorRawParams, RawParams
+from fastapi_pagination.ext.sqlalchemy import create_count_query, paginate
 from fastapi_pagination.links.bases import create_links
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+from sqlalchemy import Table, and_, inspect, or_, text
+from sqlalchemy.orm.exc import UnmappedColumnError
+from sqlalchemy.sql import operators
+
+from backend.common.enums import PageCountType
+from backend.common.exception import errors
+from backend.core.conf import settings
+from backend.database.redis import redis_client
 
 if TYPE_CHECKING:
-    from sqlalchemy import Select
+    from sqlalchemy import ColumnElement, Select
     from sqlalchemy.ext.asyncio import AsyncSession
 
 T = TypeVar('T')
@@ -24,10 +37,25 @@ class _CustomPageParams(BaseModel, AbstractParams):
     page: int = Query(1, ge=1, description='Page number')
     size: int = Query(20, gt=0, le=100, description='Page size')  # 默认 20 条记录
 
+    # 总数已由其他方式获取时，分页查询不再执行 count
+    _include_total: bool = PrivateAttr(default=True)
+
     def to_raw_params(self) -> RawParams:
         return RawParams(
             limit=self.size,
             offset=self.size * (self.page - 1),
+            include_total=self._include_total,
+        )
+
+
+class _CursorPageParams(BaseModel, AbstractParams):
+    cursor: str | None = Query(None, description='Page cursor')
+    size: int = Query(20, gt=0, le=100, description='Page size')  # 默认 20 条记录
+
+    def to_raw_params(self) -> CursorRawParams:
+        return CursorRawParams(
+            cursor=self.cursor,
+            size=self.size,
         )
 
 
@@ -45,6 +73,7 @@ class _PageDetails(BaseModel):
     page: int = Field(..., description='当前页')
     size: int = Field(..., description='每页数量')
     total_pages: int = Field(..., description='总页数')
+    is_estimate: bool = Field(False, description='总条数是否为估算值')
     links: _Links
 
 
@@ -55,9 +84,15 @@ class _CustomPage(_PageDetails, AbstractPage[T], Generic[T]):
     def create(
         cls,
         items: list,
-        total: int,
+        total: int | None,
         params: _CustomPageParams,
+        *,
+        resolved_total: int | None = None,
+        is_estimate: bool = False,
+        **kwargs: Any,
     ) -> _CustomPage[T]:
+        if total is None:
+            total = resolved_total or 0
         page = params.page
         size = params.size
         total_pages = ceil(total / params.size)
@@ -74,10 +109,36 @@ class _CustomPage(_PageDetails, AbstractPage[T], Generic[T]):
             page=params.page,
             size=params.size,
             total_pages=total_pages,
+            is_estimate=is_estimate,
             links=links,  # type: ignore
         )
 
 
+class _CursorPageDetails(BaseModel):
+    items: list = Field([], description='当前页数据')
+    size: int = Field(..., description='每页数量')
+    next_cursor: str | None = Field(None, description='下一页游标，为空时表示没有更多数据')
+
+
+class _CustomCursorPage(_CursorPageDetails, AbstractPage[T], Generic[T]):
+    __params_type__ = _CursorPageParams
+
+    @classmethod
+    def create(
+        cls,
+        items: list,
+        params: _CursorPageParams,
+        *,
+        next_cursor: str | None = None,
+        **kwargs: Any,
+    ) -> _CustomCursorPage[T]:
+        return cls(
+            items=items,
+            size=params.size,
+            next_cursor=next_cursor,
+        )
+
+
 class PageData(_PageDetails, Generic[SchemaT]):
     """
     包含 data schema 的统一返回模型，适用于分页接口
@@ -103,18 +164,214 @@ class PageData(_PageDetails, Generic[SchemaT]):
     items: Sequence[SchemaT]
 
 
-async def paging_data(db: AsyncSession, select: Select) -> dict:
+class CursorPageData(_CursorPageDetails, Generic[SchemaT]):
+    """包含 data schema 的统一返回模型，适用于游标分页接口"""
+
+    items: Sequence[SchemaT]
+
+
+async def _cached_count(db: AsyncSession, select: Select) -> int:
+    """
+    获取缓存的精确总数，以规范化 SQL 及其参数为缓存键
+
+    :param db:
+    :param select:
+    :return:
+    """
+    count_query = create_count_query(select)
+    compiled = count_query.compile(dialect=db.bind.dialect)
+    digest = hashlib.sha1(f'{compiled}|{sorted(compiled.params.items())!r}'.encode('utf-8')).hexdigest()
+    key = f'{settings.PAGINATION_COUNT_REDIS_PREFIX}:{digest}'
+    cached = await redis_client.get(key)
+    if cached is not None:
+        return int(cached)
+    total = await db.scalar(count_query)
+    await redis_client.set(key, total, ex=settings.PAGINATION_COUNT_EXPIRE_SECONDS)
+    return total
+
+
+async def _estimated_count(db: AsyncSession, select: Select) -> int | None:
+    """
+    获取数据库统计信息中的估算总数，仅适用于无过滤条件的单表查询
+
+    :param db:
+    :param select:
+    :return: 无法估算时返回 None
+    """
+    if select.whereclause is not None or select._having_criteria or select._group_by_clauses or select._distinct:
+        return None
+    froms = select.get_final_froms()
+    if len(froms) != 1 or not isinstance(froms[0], Table):
+        return None
+    table = froms[0]
+    if settings.DATABASE_TYPE == 'mysql':
+        stmt = text(
+            'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name'
+        ).bindparams(name=table.name)
+    else:
+        stmt = text('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)').bindparams(
+            name=table.fullname
+        )
+    estimated = await db.scalar(stmt)
+    if estimated is None or estimated < settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+        # 小表或未收集统计信息时，估算值不可靠
+        return None
+    return int(estimated)
+
+
+async def paging_data(db: AsyncSession, select: Select, count_type: PageCountType | None = None) -> dict:
     """
     基于 SQLAlchemy 创建分页数据
 
     :param db:
     :param select:
+    :param count_type: 总数统计方式，默认使用 settings.PAGINATION_COUNT_TYPE；
+        estimated 仅对无过滤条件的单表查询生效，否则退化为 cached
     :return:
     """
-    paginated_data: _CustomPage = await paginate(db, select)
+    count_type = count_type or settings.PAGINATION_COUNT_TYPE
+    if count_type == PageCountType.exact:
+        paginated_data: _CustomPage = await paginate(db, select)
+        return paginated_data.model_dump()
+
+    total, is_estimate = None, False
+    if count_type == PageCountType.estimated:
+        total = await _estimated_count(db, select)
+        is_estimate = total is not None
+    if total is None:
+        total = await _cached_count(db, select)
+    params: _CustomPageParams = resolve_params().model_copy()
+    params._include_total = False
+    paginated_data: _CustomPage = await paginate(
+        db, select, params=params, additional_data={'resolved_total': total, 'is_estimate': is_estimate}
+    )
     page_data = paginated_data.model_dump()
     return page_data
 
 
+async def paging_fetch_data(fetch: Callable[[int, int], Awaitable[tuple[Sequence, int]]]) -> dict:
+    """
+    基于自定义数据源创建分页数据，适用于非 SQLAlchemy 数据源（例如 Redis）
+
+    :param fetch: 接收 limit 和 offset，返回当前页数据和总条数的异步函数
+    :return:
+    """
+    params: _CustomPageParams = resolve_params()
+    raw_params = params.to_raw_params()
+    items, total = await fetch(raw_params.limit, raw_params.offset)
+    page_data = _CustomPage.create(items=list(items), total=total, params=params).model_dump()
+    return page_data
+
+
+def _get_keyset_columns(select: Select) -> tuple[ColumnElement, str, ColumnElement, str, bool]:
+    """
+    获取 keyset 分页列：查询的首个排序列和主键列，列对应的模型属性名通过 mapper 解析
+
+    :param select:
+    :return: 排序列，排序列属性名，主键列，主键属性名，是否倒序
+    """
+    mapper = inspect(select.column_descriptions[0]['entity'])
+    pk_column = mapper.primary_key[0]
+    pk_key = mapper.get_property_by_column(pk_column).key
+    order_by_clauses = select._order_by_clauses
+    if not order_by_clauses:
+        return pk_column, pk_key, pk_column, pk_key, False
+    clause = order_by_clauses[0]
+    descending = False
+    if getattr(clause, 'modifier', None) in (operators.desc_op, operators.asc_op):
+        clause, descending = clause.element, clause.modifier is operators.desc_op
+    try:
+        sort_key = mapper.get_property_by_column(clause).key
+    except UnmappedColumnError:
+        raise errors.ServerError(msg='游标分页的排序列必须为模型映射列')
+    return clause, sort_key, pk_column, pk_key, descending
+
+
+def _encode_cursor(sort_value: Any, pk_value: Any) -> str:
+    """
+    编码分页游标
+
+    :param sort_value: 排序列值
+    :param pk_value: 主键值
+    :return:
+    """
+    # 日期、Decimal、UUID 等编码为字符串，枚举编码为枚举值，解码时按排序列类型还原
+    raw = msgspec.json.encode([sort_value, pk_value])
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str, sort_column: ColumnElement) -> tuple[Any, Any]:
+    """
+    解码分页游标
+
+    :param cursor: 分页游标
+    :param sort_column: 排序列
+    :return:
+    """
+    try:
+        python_type = sort_column.type.python_type
+    except NotImplementedError:
+        python_type = None
+    try:
+        sort_value, pk_value = msgspec.json.decode(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if sort_value is not None and python_type is not None:
+            sort_value = msgspec.convert(sort_value, python_type, strict=False)
+    except Exception:
+        raise errors.RequestError(msg='分页游标无效')
+    return sort_value, pk_value
+
+
+async def cursor_paging_data(db: AsyncSession, select: Select) -> dict:
+    """
+    基于 SQLAlchemy 创建游标分页数据，按查询的首个排序列和主键进行 keyset 分页，不执行 count 查询
+
+    排序列可为空时，空值始终排在最后
+
+    :param db:
+    :param select:
+    :return:
+    """
+    params: _CursorPageParams = resolve_params()
+    sort_column, sort_key, pk_column, pk_key, descending = _get_keyset_columns(select)
+    compare = operators.lt if descending else operators.gt
+    nullable = sort_column is not pk_column and getattr(sort_column, 'nullable', True)
+    if sort_column is pk_column:
+        order = [pk_column.desc() if descending else pk_column.asc()]
+    elif descending:
+        order = [sort_column.desc(), pk_column.desc()]
+    else:
+        order = [sort_column.asc(), pk_column.asc()]
+    if nullable:
+        # 不使用 NULLS LAST 语法，MySQL 不支持
+        order.insert(0, sort_column.is_(None).asc())
+    stmt = select.order_by(None).order_by(*order)
+    if params.cursor:
+        sort_value, pk_value = _decode_cursor(params.cursor, sort_column)
+        if sort_column is pk_column:
+            stmt = stmt.where(compare(pk_column, pk_value))
+        elif sort_value is None:
+            # 游标位于空值区间，之后仅有同为空值的行
+            stmt = stmt.where(and_(sort_column.is_(None), compare(pk_column, pk_value)))
+        else:
+            conditions = [
+                compare(sort_column, sort_value),
+                and_(sort_column == sort_value, compare(pk_column, pk_value)),
+            ]
+            if nullable:
+                conditions.append(sort_column.is_(None))
+            stmt = stmt.where(or_(*conditions))
+    # 多查询一条，用于判断是否存在下一页
+    rows = (await db.scalars(stmt.limit(params.size + 1))).all()
+    items = list(rows[: params.size])
+    next_cursor = None
+    if len(rows) > params.size:
+        last = items[-1]
+        next_cursor = _encode_cursor(getattr(last, sort_key), getattr(last, pk_key))
+    page_data = _CustomCursorPage.create(items=items, params=params, next_cursor=next_cursor).model_dump()
+    return page_data
+
+
 # 分页依赖注入
 DependsPagination = Depends(pagination_ctx(_CustomPage))
+# 游标分页依赖注入
+DependsCursorPagination = Depends(pagination_ctx(_CustomCursorPage))
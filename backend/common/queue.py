@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+from typing import TypeVar
+
+T = TypeVar('T')
+
+
+async def batch_dequeue(queue: asyncio.Queue[T], max_items: int, timeout: float) -> list[T]:
+    """
+    从队列中批量获取元素，阻塞等待第一个元素，之后直到达到数量上限或超时返回
+
+    :param queue: 异步队列
+    :param max_items: 单批最大元素数
+    :param timeout: 获取到第一个元素后的最长等待时间，单位：秒
+    :return:
+    """
+    items = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while len(items) < max_items:
+        try:
+            items.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            items.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return items
@@ -1,47 +1,84 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import asyncio
 import json
+import time
 
 from datetime import timedelta
 from uuid import uuid4
 
+import bcrypt
+
 from fastapi import Depends, Request
 from fastapi.security import HTTPBearer
 from fastapi.security.utils import get_authorization_scheme_param
 from jose import ExpiredSignatureError, JWTError, jwt
 from pwdlib import PasswordHash
 from pwdlib.hashers.bcrypt import BcryptHasher
-from pydantic_core import from_json
+from redis.asyncio.client import Pipeline
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.app.admin.model import User
 from backend.app.admin.schema.user import CurrentUserIns
 from backend.common.dataclasses import AccessToken, NewToken, RefreshToken, TokenPayload
 from backend.common.exception.errors import AuthorizationError, TokenError
+from backend.common.security.principal import Principal, decode_principal
+from backend.common.security.user_cache import user_cache
 from backend.core.conf import settings
 from backend.database.db import async_db_session
 from backend.database.redis import redis_client
+from backend.utils.cache import TTLCache
+from backend.utils.executor import BoundedExecutor
 from backend.utils.serializers import select_as_dict
 from backend.utils.timezone import timezone
 
 # JWT authorizes dependency injection
 DependsJwtAuth = Depends(HTTPBearer())
 
-password_hash = PasswordHash((BcryptHasher(),))
+# 已校验 token 的声明缓存，同一 token 的重复请求跳过签名校验与解析
+_token_payload_cache: TTLCache[str, TokenPayload] = TTLCache(
+    maxsize=settings.TOKEN_PAYLOAD_CACHE_MAXSIZE,
+    ttl=settings.TOKEN_PAYLOAD_CACHE_EXPIRE_SECONDS,
+)
+
+password_hash = PasswordHash((BcryptHasher(rounds=settings.PASSWORD_HASH_BCRYPT_ROUNDS),))
+
+# 密码哈希线程池，bcrypt 计算期间释放 GIL，避免阻塞事件循环
+password_executor: BoundedExecutor = BoundedExecutor(
+    'password_hash',
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+# 批量导入用户的密码哈希线程池，与登录使用的线程池相互独立，避免批量导入影响登录
+password_import_executor: BoundedExecutor = BoundedExecutor(
+    'password_import_hash',
+    max_workers=settings.USER_IMPORT_HASH_MAX_WORKERS,
+    max_pending=settings.USER_IMPORT_HASH_MAX_PENDING,
+)
+
+
+def get_password_salt() -> bytes:
+    """
+    Generate a password salt with the configured cost
+
+    :return:
+    """
+    return bcrypt.gensalt(settings.PASSWORD_HASH_BCRYPT_ROUNDS)
 
 
-def get_hash_password(password: str, salt: bytes | None) -> str:
+async def get_hash_password(password: str, salt: bytes | None, *, executor: BoundedExecutor | None = None) -> str:
     """
     Encrypt passwords using the hash algorithm
 
     :param password:
     :param salt:
+    :param executor: The thread pool to hash in, defaults to the password hash pool
     :return:
     """
-    return password_hash.hash(password, salt=salt)
+    return await (executor or password_executor).run(password_hash.hash, password, salt=salt)
 
 
-def password_verify(plain_password: str, hashed_password: str) -> bool:
+async def password_verify(plain_password: str, hashed_password: str) -> bool:
     """
     Password verification
 
@@ -49,19 +86,45 @@ def password_verify(plain_password: str, hashed_password: str) -> bool:
     :param hashed_password: The hash ciphers to compare
     :return:
     """
-    return password_hash.verify(plain_password, hashed_password)
+    return await password_executor.run(password_hash.verify, plain_password, hashed_password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    if not password_hash.verify(plain_password, hashed_password):
+        return False, None
+    if not password_hash.current_hasher.check_needs_rehash(hashed_password):
+        return True, None
+    return True, password_hash.hash(plain_password, salt=get_password_salt())
+
+
+async def password_verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Password verification, rehash when the cost parameters have changed
+
+    :param plain_password: The password to verify
+    :param hashed_password: The hash ciphers to compare
+    :return: verified, new hash or None
+    """
+    return await password_executor.run(_verify_and_update, plain_password, hashed_password)
 
 
-async def create_access_token(user_id: str, multi_login: bool, user_type: str, **kwargs) -> AccessToken:
+async def create_access_token(
+    user_id: str, multi_login: bool, user_type: str, *, pipe: Pipeline | None = None, **kwargs
+) -> AccessToken:
     """
     Generate encryption token
 
     :param user_id: The user id of the JWT
     :param multi_login: Multipoint login for user
-    :param kwargs: Token extra information
     :param user_type
+    :param pipe: Redis transaction pipeline, all writes are committed in one round trip
+    :param kwargs: Token extra information
     :return:
     """
+    if pipe is None:
+        async with redis_client.transaction() as pipe:
+            return await create_access_token(user_id, multi_login, user_type, pipe=pipe, **kwargs)
+
     expire = timezone.now() + timedelta(seconds=settings.TOKEN_EXPIRE_SECONDS)
     session_uuid = str(uuid4())
     access_token = jwt.encode(
@@ -71,34 +134,45 @@ async def create_access_token(user_id: str, multi_login: bool, user_type: str, *
     )
 
     if multi_login is False:
-        await redis_client.delete_prefix(f'{settings.TOKEN_REDIS_PREFIX}:{user_id}')
-
-    await redis_client.setex(
-        f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{session_uuid}',
+        await revoke_access_tokens(user_id, pipe=pipe)
+
+    # 登记 token 与会话，swagger 调试会话不展示
+    token_key = f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{session_uuid}'
+    indexes = {f'{settings.TOKEN_INDEX_REDIS_PREFIX}:{user_id}': token_key}
+    if kwargs.get('login_type') != 'swagger':
+        member = f'{user_id}:{session_uuid}'
+        indexes[settings.TOKEN_SESSION_REDIS_PREFIX] = member
+        if username := kwargs.get('username'):
+            indexes[f'{settings.TOKEN_SESSION_USERNAME_REDIS_PREFIX}:{username}'] = member
+    await redis_client.setex_indexed(token_key, settings.TOKEN_EXPIRE_SECONDS, access_token, indexes, pipe=pipe)
+
+    # Token 附加信息单独存储，附带会话列表所需的 token 声明，避免再次解码 token
+    extra_info = {'id': int(user_id), 'session_uuid': session_uuid, 'expire_time': int(expire.timestamp()), **kwargs}
+    pipe.setex(
+        f'{settings.TOKEN_EXTRA_INFO_REDIS_PREFIX}:{session_uuid}',
         settings.TOKEN_EXPIRE_SECONDS,
-        access_token,
+        json.dumps(extra_info, ensure_ascii=False),
     )
 
-    # Token 附加信息单独存储
-    if kwargs:
-        await redis_client.setex(
-            f'{settings.TOKEN_EXTRA_INFO_REDIS_PREFIX}:{session_uuid}',
-            settings.TOKEN_EXPIRE_SECONDS,
-            json.dumps(kwargs, ensure_ascii=False),
-        )
-
     return AccessToken(access_token=access_token, access_token_expire_time=expire, session_uuid=session_uuid)
 
 
-async def create_refresh_token(user_id: str, multi_login: bool, user_type: str) -> RefreshToken:
+async def create_refresh_token(
+    user_id: str, multi_login: bool, user_type: str, *, pipe: Pipeline | None = None
+) -> RefreshToken:
     """
     Generate encryption refresh token, only used to create a new token
 
     :param user_id: The user id of the JWT
     :param multi_login: multipoint login for user
     :param user_type
+    :param pipe: Redis transaction pipeline, all writes are committed in one round trip
     :return:
     """
+    if pipe is None:
+        async with redis_client.transaction() as pipe:
+            return await create_refresh_token(user_id, multi_login, user_type, pipe=pipe)
+
     expire = timezone.now() + timedelta(seconds=settings.TOKEN_REFRESH_EXPIRE_SECONDS)
     refresh_token = jwt.encode(
         {'exp': expire, 'sub': user_id, 'user_type': user_type},
@@ -107,13 +181,15 @@ async def create_refresh_token(user_id: str, multi_login: bool, user_type: str)
     )
 
     if multi_login is False:
-        key_prefix = f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}'
-        await redis_client.delete_prefix(key_prefix)
+        await revoke_refresh_tokens(user_id, pipe=pipe)
 
-    await redis_client.setex(
-        f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}:{refresh_token}',
+    refresh_token_key = f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}:{refresh_token}'
+    await redis_client.setex_indexed(
+        refresh_token_key,
         settings.TOKEN_REFRESH_EXPIRE_SECONDS,
         refresh_token,
+        {f'{settings.TOKEN_REFRESH_INDEX_REDIS_PREFIX}:{user_id}': refresh_token_key},
+        pipe=pipe,
     )
     return RefreshToken(refresh_token=refresh_token, refresh_token_expire_time=expire)
 
@@ -140,6 +216,70 @@ async def create_new_token(user_id: str, refresh_token: str, multi_login: bool,
     )
 
 
+async def revoke_access_tokens(
+    user_id: int | str, *, exclude_session: str | None = None, pipe: Pipeline | None = None
+) -> None:
+    """
+    Revoke all access tokens of the user through the token index
+
+    :param user_id:
+    :param exclude_session: The session uuid to keep
+    :param pipe: Redis transaction pipeline, commands are only queued and committed by the caller
+    :return:
+    """
+    if pipe is None:
+        async with redis_client.transaction() as pipe:
+            return await revoke_access_tokens(user_id, exclude_session=exclude_session, pipe=pipe)
+
+    exclude = f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{exclude_session}' if exclude_session else None
+    token_keys = await redis_client.delete_indexed(
+        f'{settings.TOKEN_INDEX_REDIS_PREFIX}:{user_id}', exclude=exclude, pipe=pipe
+    )
+    await remove_sessions(user_id, *[key.rsplit(':', 1)[1] for key in token_keys], pipe=pipe)
+    await user_cache.evict_sessions(int(user_id), pipe=pipe)
+
+
+async def remove_sessions(user_id: int | str, *session_uuids: str, pipe: Pipeline) -> None:
+    """
+    Remove the extra information and registry entries of the sessions
+
+    :param user_id:
+    :param session_uuids:
+    :param pipe: Redis transaction pipeline, commands are only queued and committed by the caller
+    :return:
+    """
+    if not session_uuids:
+        return
+    extra_info_keys = [f'{settings.TOKEN_EXTRA_INFO_REDIS_PREFIX}:{session_uuid}' for session_uuid in session_uuids]
+    members = [f'{user_id}:{session_uuid}' for session_uuid in session_uuids]
+    # 附加信息中记录了登记会话时的用户名
+    usernames = {
+        json.loads(extra_info).get('username') for extra_info in await redis_client.mget(extra_info_keys) if extra_info
+    }
+    pipe.delete(*extra_info_keys)
+    pipe.zrem(settings.TOKEN_SESSION_REDIS_PREFIX, *members)
+    for username in usernames:
+        if username:
+            pipe.zrem(f'{settings.TOKEN_SESSION_USERNAME_REDIS_PREFIX}:{username}', *members)
+
+
+async def revoke_refresh_tokens(
+    user_id: int | str, *, exclude_token: str | None = None, pipe: Pipeline | None = None
+) -> None:
+    """
+    Revoke all refresh tokens of the user through the refresh token index
+
+    :param user_id:
+    :param exclude_token: The refresh token to keep
+    :param pipe: Redis pipeline, commands are only queued and committed by the caller
+    :return:
+    """
+    exclude = f'{settings.TOKEN_REFRESH_REDIS_PREFIX}:{user_id}:{exclude_token}' if exclude_token else None
+    await redis_client.delete_indexed(
+        f'{settings.TOKEN_REFRESH_INDEX_REDIS_PREFIX}:{user_id}', exclude=exclude, pipe=pipe
+    )
+
+
 def get_token(request: Request) -> str:
     """
     Get token for request header
@@ -153,6 +293,19 @@ def get_token(request: Request) -> str:
     return token
 
 
+def get_token_payload(request: Request) -> TokenPayload:
+    """
+    Get the verified token payload of the request, decoded once by the auth middleware
+
+    :param request:
+    :return:
+    """
+    payload = getattr(request.state, 'token_payload', None)
+    if payload is None:
+        payload = jwt_decode(get_token(request))
+    return payload
+
+
 def jwt_decode(token: str) -> TokenPayload:
     """
     Decode token
@@ -160,6 +313,10 @@ def jwt_decode(token: str) -> TokenPayload:
     :param token:
     :return:
     """
+    # 已校验的 token 直接返回声明，缓存不会超过 token 自身过期时间
+    token_payload = _token_payload_cache.get(token)
+    if token_payload is not None:
+        return token_payload
     try:
         payload = jwt.decode(token, settings.TOKEN_SECRET_KEY, algorithms=[settings.TOKEN_ALGORITHM])
         session_uuid = payload.get('session_uuid') or 'debug'
@@ -171,7 +328,13 @@ def jwt_decode(token: str) -> TokenPayload:
         raise TokenError(msg='Token 已过期')
     except (JWTError, Exception):
         raise TokenError(msg='Token 无效')
-    return TokenPayload(id=int(user_id), session_uuid=session_uuid, expire_time=expire_time)
+    token_payload = TokenPayload(
+        id=int(user_id), session_uuid=session_uuid, expire_time=expire_time, user_type=payload.get('user_type')
+    )
+    ttl = min(settings.TOKEN_PAYLOAD_CACHE_EXPIRE_SECONDS, expire_time - time.time()) if expire_time else 0
+    if ttl > 0:
+        _token_payload_cache.set(token, token_payload, ttl)
+    return token_payload
 
 
 async def get_current_user(db: AsyncSession, pk: int) -> User:
@@ -214,30 +377,70 @@ def superuser_verify(request: Request) -> bool:
     return superuser
 
 
-async def jwt_authentication(token: str) -> CurrentUserIns:
+async def load_current_user(user_id: int) -> Principal:
+    """
+    从 Redis 缓存加载用户，未命中时查询数据库并写入缓存
+
+    多个 worker 同时未命中时，仅获取到加载锁的 worker 查询数据库，其余等待其写入缓存
+
+    :param user_id:
+    :return:
+    """
+    cache_key = f'{settings.JWT_USER_REDIS_PREFIX}:{user_id}'
+    # 代数需在查询数据库前读取，加载期间发生失效时不写回缓存
+    cache_user, generation = await redis_client.mget(cache_key, user_cache.generation_key(user_id))
+    principal = decode_principal(cache_user) if cache_user else None
+    if principal:
+        user_cache.redis_hit_count += 1
+        return principal
+    user_cache.redis_miss_count += 1
+
+    lock_key = f'{settings.JWT_USER_LOAD_LOCK_REDIS_PREFIX}:{user_id}'
+    lock_token = uuid4().hex
+    locked = await redis_client.acquire_lock(lock_key, lock_token, settings.JWT_USER_LOAD_LOCK_EXPIRE_SECONDS)
+    if not locked:
+        user_cache.lock_wait_count += 1
+        deadline = time.monotonic() + settings.JWT_USER_LOAD_WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.JWT_USER_LOAD_WAIT_INTERVAL)
+            cache_user = await redis_client.get(cache_key)
+            principal = decode_principal(cache_user) if cache_user else None
+            if principal:
+                user_cache.lock_wait_hit_count += 1
+                return principal
+        # 等待超时，自行加载
+
+    try:
+        started = time.monotonic()
+        # 缓存在失效后立即重建，读取主库避免缓存副本延迟期间的旧数据
+        async with async_db_session.primary() as db:
+            current_user = await get_current_user(db, user_id)
+            principal = Principal.from_user(CurrentUserIns(**select_as_dict(current_user)))
+        await user_cache.store(principal, generation or '0', started)
+    finally:
+        if locked:
+            await redis_client.release_lock(lock_key, lock_token)
+    return principal
+
+
+async def jwt_authentication(token: str, token_payload: TokenPayload | None = None) -> Principal:
     """
     JWT authentication
 
     :param token:
+    :param token_payload: 已校验的 token 声明，为空时解码 token
     :return:
     """
-    token_payload = jwt_decode(token)
+    if token_payload is None:
+        token_payload = jwt_decode(token)
     user_id = token_payload.id
-    redis_token = await redis_client.get(f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{token_payload.session_uuid}')
+    session_uuid = token_payload.session_uuid
+    user = user_cache.get_local(user_id, session_uuid, token)
+    if user:
+        return user
+    redis_token = await redis_client.get(f'{settings.TOKEN_REDIS_PREFIX}:{user_id}:{session_uuid}')
     if not redis_token or token != redis_token:
         raise TokenError(msg='Token 已过期')
-    cache_user = await redis_client.get(f'{settings.JWT_USER_REDIS_PREFIX}:{user_id}')
-    if not cache_user:
-        async with async_db_session() as db:
-            current_user = await get_current_user(db, user_id)
-            user = CurrentUserIns(**select_as_dict(current_user))
-            await redis_client.setex(
-                f'{settings.JWT_USER_REDIS_PREFIX}:{user_id}',
-                settings.JWT_USER_REDIS_EXPIRE_SECONDS,
-                user.model_dump_json(),
-            )
-    else:
-        # TODO: 在恰当的时机，应替换为使用 model_validate_json
-        # https://docs.pydantic.dev/latest/concepts/json/#partial-json-parsing
-        user = CurrentUserIns.model_validate(from_json(cache_user, allow_partial=True))
+    user = await user_cache.loader.do(user_id, lambda: load_current_user(user_id))
+    user_cache.set_local(user_id, session_uuid, token, user)
     return user
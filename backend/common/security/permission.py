@@ -1,19 +1,19 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import TYPE_CHECKING
+from functools import lru_cache
+from typing import Any, Iterable
 
 from fastapi import Request
-from sqlalchemy import ColumnElement, and_, or_
+from sqlalchemy import ColumnElement, and_, or_, true
 
 from backend.common.enums import RoleDataRuleExpressionType, RoleDataRuleOperatorType
 from backend.common.exception import errors
 from backend.common.exception.errors import ServerError
+from backend.common.security.principal import PrincipalDataRule
 from backend.core.conf import settings
+from backend.utils.cache import TTLCache
 from backend.utils.import_parse import dynamic_import_data_model
 
-if TYPE_CHECKING:
-    from backend.app.admin.schema.data_rule import GetDataRuleDetail
-
 
 class RequestPermission:
     """
@@ -35,67 +35,101 @@ class RequestPermission:
             request.state.permission = self.value
 
 
-def filter_data_permission(request: Request) -> ColumnElement[bool]:
+# 已编译的数据权限过滤条件，以 (角色 id, 规则版本) 为键，相同角色组合的用户共享
+_data_permission_cache: TTLCache[tuple, ColumnElement[bool]] = TTLCache(
+    maxsize=settings.DATA_PERMISSION_CACHE_MAXSIZE,
+    ttl=settings.DATA_PERMISSION_CACHE_EXPIRE_SECONDS,
+)
+
+
+def get_data_permission_columns(model: str) -> list[str]:
     """
-    过滤数据权限
+    获取数据模型允许进行数据过滤的列
 
-    使用场景：用户登录前台后，控制其能看到哪些数据
+    :param model: 数据规则模型名称
+    :return:
+    """
+    return list(_get_data_permission_model(model)[1])
 
-    :param request:
+
+@lru_cache(maxsize=128)
+def _get_data_permission_model(model: str) -> tuple[Any, tuple[str, ...]]:
+    """
+    导入数据模型并获取可过滤列，异常不会被缓存
+
+    :param model: 数据规则模型名称
     :return:
     """
-    data_rules = []
-    for role in request.user.roles:
-        data_rules.extend(role.rules)
-    user_data_rules: list[GetDataRuleDetail] = list(dict.fromkeys(data_rules))
+    if model not in settings.DATA_PERMISSION_MODELS:
+        raise errors.NotFoundError(msg='数据规则模型不存在')
+    try:
+        model_ins = dynamic_import_data_model(settings.DATA_PERMISSION_MODELS[model])
+    except (ImportError, AttributeError):
+        raise errors.ServerError(msg=f'数据模型 {model} 动态导入失败，请联系系统超级管理员')
+    model_columns = tuple(
+        key for key in model_ins.__table__.columns.keys() if key not in settings.DATA_PERMISSION_COLUMN_EXCLUDE
+    )
+    return model_ins, model_columns
+
+
+def validate_data_rule(model: str, column: str) -> None:
+    """
+    校验数据规则模型及列，应在规则创建和更新时调用
+
+    :param model: 数据规则模型名称
+    :param column: 数据规则模型列
+    :return:
+    """
+    _, model_columns = _get_data_permission_model(model)
+    if column not in model_columns:
+        raise errors.NotFoundError(msg='数据规则模型列不存在')
 
-    # 超级管理员和无规则用户不做过滤
-    if request.user.is_superuser or not user_data_rules:
-        return or_(1 == 1)
 
+def _build_condition(rule: PrincipalDataRule) -> ColumnElement[bool] | None:
+    """
+    构建单条数据规则的过滤条件，规则值以绑定参数传入
+
+    :param rule:
+    :return:
+    """
+    validate_data_rule(rule.model, rule.column)
+    model_ins, _ = _get_data_permission_model(rule.model)
+    column_obj = getattr(model_ins, rule.column)
+    rule_expression = rule.expression
+
+    if rule_expression == RoleDataRuleExpressionType.eq:
+        return column_obj == rule.value
+    elif rule_expression == RoleDataRuleExpressionType.ne:
+        return column_obj != rule.value
+    elif rule_expression == RoleDataRuleExpressionType.gt:
+        return column_obj > rule.value
+    elif rule_expression == RoleDataRuleExpressionType.ge:
+        return column_obj >= rule.value
+    elif rule_expression == RoleDataRuleExpressionType.lt:
+        return column_obj < rule.value
+    elif rule_expression == RoleDataRuleExpressionType.le:
+        return column_obj <= rule.value
+    elif rule_expression == RoleDataRuleExpressionType.in_:
+        values = rule.value.split(',') if isinstance(rule.value, str) else rule.value
+        return column_obj.in_(values)
+    elif rule_expression == RoleDataRuleExpressionType.not_in:
+        values = rule.value.split(',') if isinstance(rule.value, str) else rule.value
+        return ~column_obj.in_(values)
+    return None
+
+
+def compile_data_permission(data_rules: Iterable[PrincipalDataRule]) -> ColumnElement[bool]:
+    """
+    编译数据规则为过滤条件
+
+    :param data_rules:
+    :return:
+    """
     where_and_list = []
     where_or_list = []
 
-    for rule in user_data_rules:
-        rule_model = rule.model
-        if rule_model not in settings.DATA_PERMISSION_MODELS:
-            raise errors.NotFoundError(msg='数据规则模型不存在')
-        try:
-            model_ins = dynamic_import_data_model(settings.DATA_PERMISSION_MODELS[rule_model])
-        except (ImportError, AttributeError):
-            raise errors.ServerError(msg=f'数据模型 {rule_model} 动态导入失败，请联系系统超级管理员')
-        model_columns = [
-            key for key in model_ins.__table__.columns.keys() if key not in settings.DATA_PERMISSION_COLUMN_EXCLUDE
-        ]
-        column = rule.column
-        if column not in model_columns:
-            raise errors.NotFoundError(msg='数据规则模型列不存在')
-
-        # 获取模型的列对象
-        column_obj = getattr(model_ins, column)
-        rule_expression = rule.expression
-
-        # 根据表达式类型构建条件
-        condition = None
-        if rule_expression == RoleDataRuleExpressionType.eq:
-            condition = column_obj == rule.value
-        elif rule_expression == RoleDataRuleExpressionType.ne:
-            condition = column_obj != rule.value
-        elif rule_expression == RoleDataRuleExpressionType.gt:
-            condition = column_obj > rule.value
-        elif rule_expression == RoleDataRuleExpressionType.ge:
-            condition = column_obj >= rule.value
-        elif rule_expression == RoleDataRuleExpressionType.lt:
-            condition = column_obj < rule.value
-        elif rule_expression == RoleDataRuleExpressionType.le:
-            condition = column_obj <= rule.value
-        elif rule_expression == RoleDataRuleExpressionType.in_:
-            values = rule.value.split(',') if isinstance(rule.value, str) else rule.value
-            condition = column_obj.in_(values)
-        elif rule.expression == RoleDataRuleExpressionType.not_in:
-            values = rule.value.split(',') if isinstance(rule.value, str) else rule.value
-            condition = ~column_obj.in_(values)
-
+    for rule in data_rules:
+        condition = _build_condition(rule)
         if condition is not None:
             rule_operator = rule.operator
             if rule_operator == RoleDataRuleOperatorType.AND:
@@ -110,4 +144,32 @@ def filter_data_permission(request: Request) -> ColumnElement[bool]:
     if where_or_list:
         where_list.append(or_(*where_or_list))
 
-    return or_(*where_list) if where_list else or_(1 == 1)
+    return or_(*where_list) if where_list else or_(true())
+
+
+def filter_data_permission(request: Request) -> ColumnElement[bool]:
+    """
+    过滤数据权限
+
+    使用场景：用户登录前台后，控制其能看到哪些数据
+
+    :param request:
+    :return:
+    """
+    user_roles = request.user.roles
+    data_rules: list[PrincipalDataRule] = list(dict.fromkeys(rule for role in user_roles for rule in role.rules))
+
+    # 超级管理员和无规则用户不做过滤
+    if request.user.is_superuser or not data_rules:
+        return or_(true())
+
+    # 规则更新后版本随之变化，旧的编译结果不再命中
+    key = (
+        tuple(sorted(role.id for role in user_roles)),
+        tuple(sorted((rule.id, (rule.updated_time or rule.created_time).timestamp()) for rule in data_rules)),
+    )
+    where = _data_permission_cache.get(key)
+    if where is None:
+        where = compile_data_permission(data_rules)
+        _data_permission_cache.set(key, where)
+    return where
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from typing import Any
+
+import msgspec
+
+from backend.app.admin.schema.user import CurrentUserIns
+from backend.common.log import log
+
+# 缓存结构版本，结构变更时递增，旧版本缓存将解码失败并重新加载
+PRINCIPAL_SCHEMA_VERSION = 1
+
+
+class PrincipalMenu(msgspec.Struct, array_like=True):
+    id: int
+    parent_id: int | None
+    perms: str | None
+    status: int
+
+
+class PrincipalDataRule(msgspec.Struct, array_like=True, frozen=True):
+    id: int
+    name: str
+    model: str
+    column: str
+    operator: int
+    expression: int
+    value: str
+    created_time: datetime
+    updated_time: datetime | None
+
+
+class PrincipalRole(msgspec.Struct, array_like=True):
+    id: int
+    name: str
+    status: int
+    store_id: int | None
+    menus: list[PrincipalMenu]
+    rules: list[PrincipalDataRule]
+
+
+class PrincipalDept(msgspec.Struct, array_like=True):
+    id: int
+    name: str
+    parent_id: int | None
+    status: int
+    del_flag: bool
+    store_id: int | None
+
+
+class Principal(msgspec.Struct, array_like=True, tag=PRINCIPAL_SCHEMA_VERSION):
+    """
+    认证用户
+
+    缓存于 Redis 及进程内，以数组形式编码，解码时不经过 Pydantic 校验；
+    权限标识集合及角色摘要在构建时计算并随缓存保存
+    """
+
+    id: int
+    uuid: str
+    dept_id: int | None
+    username: str
+    nickname: str
+    email: str | None
+    phone: str
+    user_type: str
+    store_id: int | None
+    avatar: str | None
+    status: int
+    is_superuser: bool
+    is_staff: bool
+    is_multi_login: bool
+    join_time: datetime | None
+    last_login_time: datetime | None
+    dept: PrincipalDept | None
+    roles: list[PrincipalRole]
+    perms: frozenset[str]
+    has_enabled_role: bool
+    has_menu: bool
+
+    @classmethod
+    def from_user(cls, user: CurrentUserIns) -> 'Principal':
+        """
+        由已校验的用户构建
+
+        :param user:
+        :return:
+        """
+        data = user.model_dump(include=set(cls.__struct_fields__))
+        dept = data['dept']
+        data['dept'] = PrincipalDept(**{f: dept[f] for f in PrincipalDept.__struct_fields__}) if dept else None
+        data['roles'] = [
+            PrincipalRole(
+                id=role['id'],
+                name=role['name'],
+                status=role['status'],
+                store_id=role['store_id'],
+                menus=[PrincipalMenu(**{f: m[f] for f in PrincipalMenu.__struct_fields__}) for m in role['menus'] if m],
+                rules=[
+                    PrincipalDataRule(**{f: r[f] for f in PrincipalDataRule.__struct_fields__})
+                    for r in role['rules']
+                    if r
+                ],
+            )
+            for role in data['roles']
+        ]
+        data.update(perms=user.perms, has_enabled_role=user.has_enabled_role, has_menu=user.has_menu)
+        return cls(**data)
+
+    def as_dict(self) -> dict[str, Any]:
+        """转换为字典，包含部门及角色"""
+        data = msgspec.structs.asdict(self)
+        data['dept'] = msgspec.structs.asdict(self.dept) if self.dept else None
+        data['roles'] = [msgspec.structs.asdict(role) for role in self.roles]
+        return data
+
+
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(Principal)
+
+
+def encode_principal(principal: Principal) -> str:
+    """
+    编码认证用户
+
+    :param principal:
+    :return:
+    """
+    return _encoder.encode(principal).decode()
+
+
+def decode_principal(data: str | bytes) -> Principal | None:
+    """
+    解码认证用户，结构版本不一致或数据无效时返回 None
+
+    :param data:
+    :return:
+    """
+    try:
+        return _decoder.decode(data)
+    except msgspec.DecodeError as e:
+        log.warning(f'认证用户缓存解码失败：{e}')
+        return None
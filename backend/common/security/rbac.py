@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 from fastapi import Depends, Request
 
-from backend.common.enums import MethodType, StatusType
+from backend.common.enums import MethodType
 from backend.common.exception.errors import AuthorizationError, TokenError
 from backend.common.security.jwt import DependsJwtAuth
 from backend.core.conf import settings
@@ -31,12 +31,11 @@ async def rbac_verify(request: Request, _token: str = DependsJwtAuth) -> None:
         return
 
     # 检测用户角色
-    user_roles = request.user.roles
-    if not user_roles or all(status == 0 for status in user_roles):
+    if not request.user.has_enabled_role:
         raise AuthorizationError(msg='用户未分配角色，请联系系统管理员')
 
     # 检测用户所属角色菜单
-    if not any(len(role.menus) > 0 for role in user_roles):
+    if not request.user.has_menu:
         raise AuthorizationError(msg='用户未分配权限，请联系系统管理员')
 
     # 检测后台管理操作权限
@@ -57,13 +56,8 @@ async def rbac_verify(request: Request, _token: str = DependsJwtAuth) -> None:
         if path_auth_perm in settings.RBAC_ROLE_MENU_EXCLUDE:
             return
 
-        # 已分配菜单权限校验
-        allow_perms = []
-        for role in user_roles:
-            for menu in role.menus:
-                if menu.perms and menu.status == StatusType.enable:
-                    allow_perms.extend(menu.perms.split(','))
-        if path_auth_perm not in allow_perms:
+        # 已分配菜单权限校验，权限标识集合在用户缓存时预计算
+        if path_auth_perm not in request.user.perms:
             raise AuthorizationError
 
 # RBAC 授权依赖注入
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from typing import Any
+
+from redis.asyncio.client import Pipeline
+
+from backend.common.log import log
+from backend.common.security.principal import Principal, encode_principal
+from backend.core.conf import settings
+from backend.database.redis import redis_client
+from backend.utils.cache import TTLCache
+from backend.utils.singleflight import SingleFlight
+
+
+class UserCache:
+    """
+    认证用户二级缓存
+
+    一级：进程内 LRU 缓存，以 (user_id, session_uuid) 为键，保存已校验的 token 与 Principal
+    二级：Redis 缓存，以 user_id 为键，保存 Principal 编码数据
+
+    用户数据或会话变更时，通过 Redis 发布订阅通知所有 worker 清理一级缓存，
+    一级缓存的过期时间应保持较短，用于兜底订阅消息丢失的情况
+
+    二级缓存未命中时，同一进程内的并发加载通过 loader 合并，跨 worker 通过 Redis 锁合并
+
+    写入二级缓存时同时登记反向索引（角色/部门 -> 用户，菜单/数据规则 -> 角色），
+    角色、菜单、数据规则或部门变更时，据此精确失效受影响用户的缓存；
+    失效时递增受影响用户的代数并设置短期失效标记，仅丢弃与失效相关的进行中加载
+    """
+
+    def __init__(self):
+        self.local: TTLCache[tuple[int, str], tuple[str, Principal]] = TTLCache(
+            maxsize=settings.JWT_USER_LOCAL_CACHE_MAXSIZE,
+            ttl=settings.JWT_USER_LOCAL_CACHE_EXPIRE_SECONDS,
+        )
+        self.loader: SingleFlight[int, Principal] = SingleFlight()
+        self.local_hit_count = 0
+        self.local_miss_count = 0
+        self.redis_hit_count = 0
+        self.redis_miss_count = 0
+        self.lock_wait_count = 0
+        self.lock_wait_hit_count = 0
+        self._listener: asyncio.Task | None = None
+
+    def get_local(self, user_id: int, session_uuid: str, token: str) -> Principal | None:
+        """
+        获取进程内缓存用户
+
+        :param user_id:
+        :param session_uuid:
+        :param token:
+        :return:
+        """
+        item = self.local.get((user_id, session_uuid))
+        if item is None or item[0] != token:
+            self.local_miss_count += 1
+            return None
+        self.local_hit_count += 1
+        return item[1]
+
+    def set_local(self, user_id: int, session_uuid: str, token: str, user: Principal) -> None:
+        """
+        设置进程内缓存用户
+
+        :param user_id:
+        :param session_uuid:
+        :param token:
+        :param user:
+        :return:
+        """
+        self.local.set((user_id, session_uuid), (token, user))
+
+    def evict_local(self, user_id: int, session_uuid: str | None = None) -> None:
+        """
+        清理进程内缓存
+
+        :param user_id:
+        :param session_uuid: 为空时清理用户所有会话
+        :return:
+        """
+        if session_uuid:
+            self.local.pop((user_id, session_uuid))
+        else:
+            self.local.pop_where(lambda key: key[0] == user_id)
+            # 进行中的加载可能读取到变更前的数据，之后的请求重新加载
+            self.loader.forget(user_id)
+
+    @staticmethod
+    def _index_key(kind: str, pk: int | str) -> str:
+        return f'{settings.JWT_USER_INDEX_REDIS_PREFIX}:{kind}:{pk}'
+
+    @staticmethod
+    def _marker_key(index_key: str) -> str:
+        suffix = index_key[len(settings.JWT_USER_INDEX_REDIS_PREFIX) :]
+        return f'{settings.JWT_USER_INVALIDATE_MARKER_REDIS_PREFIX}{suffix}'
+
+    @staticmethod
+    def generation_key(user_id: int) -> str:
+        return f'{settings.JWT_USER_GENERATION_REDIS_PREFIX}:{user_id}'
+
+    async def store(self, user: Principal, generation: str, started: float) -> bool:
+        """
+        写入 Redis 缓存并登记反向索引
+
+        :param user:
+        :param generation: 加载用户前读取的用户代数
+        :param started: 开始加载的时间，time.monotonic()
+        :return: 加载期间用户或其依赖的角色、菜单、数据规则、部门已失效时不写入，返回 False
+        """
+        # 加载期间设置的失效标记可能已过期，无法确认加载的数据仍然有效
+        if time.monotonic() - started >= settings.JWT_USER_INVALIDATE_MARKER_EXPIRE_SECONDS:
+            log.warning(f'用户 {user.id} 加载耗时超出失效标记保留时间，不写入缓存')
+            return False
+        expire_seconds = settings.JWT_USER_REDIS_EXPIRE_SECONDS
+        # 先登记索引再写入缓存，避免出现已缓存但未登记索引的用户
+        async with redis_client.pipeline(transaction=False) as pipe:
+            index_keys = []
+            if user.dept_id:
+                index_keys.append((self._index_key('dept', user.dept_id), user.id))
+            for role in user.roles:
+                index_keys.append((self._index_key('role', role.id), user.id))
+                index_keys.extend((self._index_key('menu', menu.id), role.id) for menu in role.menus if menu)
+                index_keys.extend((self._index_key('rule', rule.id), role.id) for rule in role.rules if rule)
+            for key, member in index_keys:
+                pipe.sadd(key, member)
+                pipe.expire(key, expire_seconds)
+            await pipe.execute()
+        # 失效时尚未登记索引的加载无法通过用户代数发现，依赖的失效标记存在时同样不写入
+        markers = [self._marker_key(key) for key in dict.fromkeys(key for key, _ in index_keys)]
+        return await redis_client.setex_if_generation(
+            self.generation_key(user.id),
+            generation,
+            f'{settings.JWT_USER_REDIS_PREFIX}:{user.id}',
+            expire_seconds,
+            encode_principal(user),
+            markers,
+        )
+
+    async def invalidate(
+        self, *user_ids: int, index_keys: list[str] | None = None, pipe: Pipeline | None = None
+    ) -> None:
+        """
+        用户数据失效，批量删除 Redis 缓存并通知所有 worker
+
+        递增受影响用户的代数，并为删除的反向索引设置失效标记，失效前开始的加载不会写回缓存
+
+        :param user_ids:
+        :param index_keys: 同时删除的反向索引，受影响用户重新加载时将重新登记
+        :param pipe: 事务管道，传入时仅排队命令，由调用方提交
+        :return:
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids and not index_keys:
+            return
+        if pipe is None:
+            async with redis_client.transaction() as pipe:
+                return await self.invalidate(*user_ids, index_keys=index_keys, pipe=pipe)
+        keys = [f'{settings.JWT_USER_REDIS_PREFIX}:{user_id}' for user_id in user_ids]
+        batch_size = settings.JWT_USER_INVALIDATE_BATCH_SIZE
+        marker_expire_seconds = settings.JWT_USER_INVALIDATE_MARKER_EXPIRE_SECONDS
+        for user_id in user_ids:
+            # 代数保留时间不短于缓存，过期后读取为 0 时不会接受失效前开始的加载
+            pipe.incr(self.generation_key(user_id))
+            pipe.expire(self.generation_key(user_id), settings.JWT_USER_REDIS_EXPIRE_SECONDS)
+        for i in range(0, len(keys), batch_size):
+            pipe.unlink(*keys[i : i + batch_size])
+        if index_keys:
+            pipe.unlink(*index_keys)
+            for key in index_keys:
+                pipe.set(self._marker_key(key), 1, ex=marker_expire_seconds)
+        for i in range(0, len(user_ids), batch_size):
+            await self.publish(*[str(user_id) for user_id in user_ids[i : i + batch_size]], pipe=pipe)
+
+    async def _invalidate_index(self, kind: str, pks: tuple[int, ...]) -> tuple[list[int], list[str]]:
+        index_keys = [self._index_key(kind, pk) for pk in dict.fromkeys(pks)]
+        if not index_keys:
+            return [], []
+        members = await redis_client.sunion(index_keys)
+        return [int(member) for member in members], index_keys
+
+    async def invalidate_roles(self, *role_ids: int, index_keys: list[str] | None = None) -> None:
+        """
+        角色变更，失效角色下所有已缓存用户
+
+        :param role_ids:
+        :param index_keys: 同时删除的反向索引
+        :return:
+        """
+        user_ids, role_keys = await self._invalidate_index('role', role_ids)
+        await self.invalidate(*user_ids, index_keys=role_keys + (index_keys or []))
+
+    async def invalidate_menus(self, *menu_ids: int) -> None:
+        """
+        菜单变更，失效关联角色下所有已缓存用户
+
+        :param menu_ids:
+        :return:
+        """
+        role_ids, menu_keys = await self._invalidate_index('menu', menu_ids)
+        await self.invalidate_roles(*role_ids, index_keys=menu_keys)
+
+    async def invalidate_rules(self, *rule_ids: int) -> None:
+        """
+        数据规则变更，失效关联角色下所有已缓存用户
+
+        :param rule_ids:
+        :return:
+        """
+        role_ids, rule_keys = await self._invalidate_index('rule', rule_ids)
+        await self.invalidate_roles(*role_ids, index_keys=rule_keys)
+
+    async def invalidate_depts(self, *dept_ids: int) -> None:
+        """
+        部门变更，失效部门下所有已缓存用户
+
+        :param dept_ids:
+        :return:
+        """
+        user_ids, dept_keys = await self._invalidate_index('dept', dept_ids)
+        await self.invalidate(*user_ids, index_keys=dept_keys)
+
+    async def evict_sessions(self, user_id: int, *session_uuids: str, pipe: Pipeline | None = None) -> None:
+        """
+        会话失效，通知所有 worker 清理进程内缓存
+
+        :param user_id:
+        :param session_uuids: 为空时清理用户所有会话
+        :param pipe: 管道，传入时仅排队发布命令，由调用方提交
+        :return:
+        """
+        if session_uuids:
+            await self.publish(*[f'{user_id}:{session_uuid}' for session_uuid in session_uuids], pipe=pipe)
+        else:
+            await self.publish(str(user_id), pipe=pipe)
+
+    async def publish(self, *targets: str, pipe: Pipeline | None = None) -> None:
+        """
+        发布失效消息，消息格式：user_id 或 user_id:session_uuid，多个以逗号分隔
+
+        :param targets:
+        :param pipe: 管道，传入时仅排队发布命令，由调用方提交
+        :return:
+        """
+        for target in targets:
+            self._handle(target)
+        if pipe is not None:
+            pipe.publish(settings.JWT_USER_INVALIDATE_CHANNEL, ','.join(targets))
+            return
+        await redis_client.publish(settings.JWT_USER_INVALIDATE_CHANNEL, ','.join(targets))
+
+    def _handle(self, target: str) -> None:
+        user_id, _, session_uuid = target.partition(':')
+        try:
+            self.evict_local(int(user_id), session_uuid or None)
+        except ValueError:
+            log.warning(f'用户缓存失效消息无效：{target}')
+
+    async def _listen(self) -> None:
+        """订阅失效消息"""
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.JWT_USER_INVALIDATE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    for target in message['data'].split(','):
+                        self._handle(target)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f'用户缓存失效订阅异常：{e}')
+                # 订阅中断期间可能丢失消息，直接清空一级缓存
+                self.local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        """缓存命中与加载合并指标"""
+        return {
+            'local_hit': self.local_hit_count,
+            'local_miss': self.local_miss_count,
+            'local_size': len(self.local),
+            'redis_hit': self.redis_hit_count,
+            'redis_miss': self.redis_miss_count,
+            'loader': self.loader.stats(),
+            'lock_wait': self.lock_wait_count,
+            'lock_wait_hit': self.lock_wait_hit_count,
+        }
+
+    def start(self) -> None:
+        """启动失效消息订阅"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """停止失效消息订阅"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+            log.info(f'用户缓存指标：{self.stats()}')
+        self.local.clear()
+
+
+user_cache: UserCache = UserCache()
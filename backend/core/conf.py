@@ -61,13 +61,44 @@ class Settings(BaseSettings):
     DATABASE_ECHO: bool = False
     DATABASE_SCHEMA: str = 'fba'
     DATABASE_CHARSET: str = 'utf8mb4'
+    DATABASE_POOL_SIZE: int = 10  # 连接池常驻连接数，每个 worker 独立
+    DATABASE_POOL_MAX_OVERFLOW: int = 20  # 连接池允许超出常驻连接数的最大连接数
+    DATABASE_POOL_RECYCLE: int = 3600  # 连接回收时间，应小于数据库的连接超时时间，单位：秒
+    DATABASE_POOL_TIMEOUT: float = 30  # 获取连接的最长等待时间，单位：秒
+    DATABASE_POOL_PRE_PING: bool = True  # 取出连接前检测连接是否可用
+    DATABASE_REPLICA_HOSTS: list[str] = []  # 只读副本地址，格式：host:port，账号密码及库名与主库一致
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = 5  # 副本复制延迟超出此值时查询回退主库，单位：秒
+    DATABASE_REPLICA_CHECK_INTERVAL: float = 10  # 副本健康检查间隔，单位：秒
+    DATABASE_REPLICA_STICKY_SECONDS: int = 5  # 用户写入后查询固定使用主库的时间窗口，单位：秒
+    DATABASE_REPLICA_STICKY_REDIS_PREFIX: str = 'fba:db_sticky'
+    DATABASE_QUERY_STATS: bool = True  # 统计每个请求的 SQL 执行次数及耗时，记录于访问日志及 Server-Timing 响应头
+    DATABASE_SLOW_QUERY_SECONDS: float = 0.5  # 慢查询日志阈值，0 不记录，单位：秒
+    DATABASE_N_PLUS_ONE_THRESHOLD: int = 10  # 单个请求中同一语句执行次数达到此值时记录 N+1 警告，0 不检测
+    DATABASE_QUERY_LOG_MAX_LENGTH: int = 1000  # 慢查询及 N+1 日志中语句的最大长度
 
     # Redis
     REDIS_TIMEOUT: int = 5
+    REDIS_MAX_CONNECTIONS: int = 50  # 连接池最大连接数，每个 worker 独立
+    REDIS_POOL_TIMEOUT: float = 5  # 连接耗尽时获取连接的最长等待时间，单位：秒
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # 空闲连接健康检查间隔，单位：秒
 
     # Socketio
     WS_NO_AUTH_MARKER: str = 'internal'
 
+    # Password
+    PASSWORD_HASH_BCRYPT_ROUNDS: int = 12  # bcrypt 计算轮数，修改后用户登录时自动重新哈希
+    PASSWORD_HASH_MAX_WORKERS: int = 4  # 密码哈希线程池最大线程数
+    PASSWORD_HASH_MAX_PENDING: int = 64  # 密码哈希最大等待任务数，超出时拒绝请求
+
+    # User import / export
+    USER_IMPORT_BATCH_SIZE: int = 500  # 批量导入每批校验及写入的行数
+    USER_IMPORT_MAX_ROWS: int = 50000  # 单次导入的最大行数
+    USER_IMPORT_ERROR_LIMIT: int = 100  # 导入结果中返回的最大错误行数
+    USER_IMPORT_HASH_MAX_WORKERS: int = 4  # 导入密码哈希线程数，独立于登录使用的线程池
+    # 导入密码哈希最大等待任务数，每次导入按线程数分段提交，可同时进行的导入数约为两者之比
+    USER_IMPORT_HASH_MAX_PENDING: int = 64
+    USER_EXPORT_BATCH_SIZE: int = 1000  # 导出时每次从数据库读取的行数
+
     # Token
     TOKEN_ALGORITHM: str = 'HS256'  # 算法
     TOKEN_EXPIRE_SECONDS: int = 60 * 60 * 24 * 1  # 过期时间，单位：秒
@@ -75,7 +106,14 @@ class Settings(BaseSettings):
     TOKEN_REDIS_PREFIX: str = 'fba:token'
     TOKEN_EXTRA_INFO_REDIS_PREFIX: str = 'fba:token_extra_info'
     TOKEN_ONLINE_REDIS_PREFIX: str = 'fba:token_online'
+    TOKEN_SESSION_REDIS_PREFIX: str = 'fba:token_session'  # 会话登记有序集合，按过期时间排序
+    TOKEN_SESSION_USERNAME_REDIS_PREFIX: str = 'fba:token_session_username'  # 按用户名登记的会话有序集合
     TOKEN_REFRESH_REDIS_PREFIX: str = 'fba:refresh_token'
+    TOKEN_INDEX_REDIS_PREFIX: str = 'fba:token_index'  # 用户 token key 索引有序集合，按过期时间排序
+    TOKEN_REFRESH_INDEX_REDIS_PREFIX: str = 'fba:refresh_token_index'  # 用户 refresh token key 索引有序集合
+    TOKEN_PAYLOAD_CACHE_MAXSIZE: int = 4096  # 已校验 token 声明的进程内缓存容量
+    # 已校验 token 声明的缓存过期时间，不会超过 token 自身过期时间，单位：秒
+    TOKEN_PAYLOAD_CACHE_EXPIRE_SECONDS: int = 300
     TOKEN_REQUEST_PATH_EXCLUDE: list[str] = [  # JWT / RBAC 白名单
         f'{ADMIN_API_PATH}/auth/login',
         f'{STORE_API_PATH}/auth/login',
@@ -84,6 +122,21 @@ class Settings(BaseSettings):
     # JWT
     JWT_USER_REDIS_PREFIX: str = 'fba:user'
     JWT_USER_REDIS_EXPIRE_SECONDS: int = 60 * 60 * 24 * 7
+    JWT_USER_LOCAL_CACHE_MAXSIZE: int = 1024  # 进程内用户缓存容量
+    JWT_USER_LOCAL_CACHE_EXPIRE_SECONDS: int = 30  # 进程内用户缓存过期时间，单位：秒
+    JWT_USER_INVALIDATE_CHANNEL: str = 'fba:user_invalidate'  # 用户缓存失效发布订阅频道
+    # 用户缓存代数计数前缀，按用户失效时递增，丢弃失效前开始的加载，保留时间与用户缓存一致
+    JWT_USER_GENERATION_REDIS_PREFIX: str = 'fba:user_generation'
+    # 角色、菜单、数据规则、部门的失效标记前缀，标记存在期间依赖其的加载不写回缓存
+    JWT_USER_INVALIDATE_MARKER_REDIS_PREFIX: str = 'fba:user_invalidated'
+    # 失效标记的保留时间，单次用户加载耗时超出时不写回缓存，单位：秒
+    JWT_USER_INVALIDATE_MARKER_EXPIRE_SECONDS: int = 10
+    JWT_USER_INDEX_REDIS_PREFIX: str = 'fba:user_index'  # 用户缓存反向索引：角色/部门 -> 用户，菜单/数据规则 -> 角色
+    JWT_USER_INVALIDATE_BATCH_SIZE: int = 500  # 批量失效时单条 UNLINK 命令的最大 key 数
+    JWT_USER_LOAD_LOCK_REDIS_PREFIX: str = 'fba:user_load_lock'  # 用户缓存加载锁，保证多个 worker 仅一个查询数据库
+    JWT_USER_LOAD_LOCK_EXPIRE_SECONDS: float = 5  # 用户缓存加载锁过期时间，单位：秒
+    JWT_USER_LOAD_WAIT_TIMEOUT: float = 2  # 等待其他 worker 写入用户缓存的最长时间，超时后自行加载，单位：秒
+    JWT_USER_LOAD_WAIT_INTERVAL: float = 0.05  # 等待其他 worker 写入用户缓存的轮询间隔，单位：秒
 
     # RBAC
     RBAC_ROLE_MENU_MODE: bool = True
@@ -134,6 +187,17 @@ class Settings(BaseSettings):
     DATETIME_TIMEZONE: str = 'Asia/Shanghai'
     DATETIME_FORMAT: str = '%Y-%m-%d %H:%M:%S'
 
+    # Pagination
+    PAGINATION_COUNT_TYPE: Literal['exact', 'cached', 'estimated'] = 'exact'  # 默认分页总数统计方式
+    PAGINATION_COUNT_REDIS_PREFIX: str = 'fba:page_count'
+    PAGINATION_COUNT_EXPIRE_SECONDS: int = 30  # 总数缓存过期时间，单位：秒
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD: int = 100000  # 估算总数低于该值时改为精确统计
+
+    # Tree cache
+    TREE_CACHE_REDIS_PREFIX: str = 'fba:tree'
+    TREE_CACHE_LOCAL_MAXSIZE: int = 256  # 进程内缓存最大条目数
+    TREE_CACHE_EXPIRE_SECONDS: int = 60 * 10  # 进程内缓存过期时间，单位：秒
+
     # Request limiter
     REQUEST_LIMITER_REDIS_PREFIX: str = 'fba:limiter'
 
@@ -149,6 +213,8 @@ class Settings(BaseSettings):
     IP_LOCATION_PARSE: Literal['online', 'offline', 'false'] = 'offline'
     IP_LOCATION_REDIS_PREFIX: str = 'fba:ip:location'
     IP_LOCATION_EXPIRE_SECONDS: int = 60 * 60 * 24 * 1  # 过期时间，单位：秒
+    IP_LOCATION_LOCAL_CACHE_MAXSIZE: int = 10000  # 进程内缓存最大条目数
+    IP_LOCATION_LOCAL_CACHE_EXPIRE_SECONDS: int = 60 * 60  # 进程内缓存过期时间，单位：秒
 
     # Opera log
     OPERA_LOG_PATH_EXCLUDE: list[str] = [
@@ -167,6 +233,14 @@ class Settings(BaseSettings):
         'new_password',
         'confirm_password',
     ]
+    OPERA_LOG_ARGS_MAX_SIZE: int = 64 * 1024  # 请求体最大记录字节数，超出时不记录请求体
+    OPERA_LOG_ARGS_EXCLUDE: list[str] = []  # 不记录参数的路由，使用路由路径模板，例如 /api/v1/sys/users/{pk}
+    OPERA_LOG_ARGS_KEY_INCLUDE: dict[str, list[str]] = {}  # 仅记录指定参数的路由，路由路径模板: 参数列表
+    OPERA_LOG_QUEUE_MAXSIZE: int = 10000  # 队列最大长度，队列已满时丢弃日志
+    OPERA_LOG_QUEUE_BATCH_CONSUME_SIZE: int = 100  # 单次批量写入的最大条数
+    OPERA_LOG_QUEUE_TIMEOUT: float = 1  # 批量写入最长等待时间，单位：秒
+    OPERA_LOG_QUEUE_DRAIN_TIMEOUT: float = 10  # 服务关闭时等待队列写入完成的最长时间，单位：秒
+    LOG_EXPORT_BATCH_SIZE: int = 2000  # 操作日志及登录日志导出时每次从服务端游标读取的行数
 
     # Data permission
     DATA_PERMISSION_MODELS: dict[
@@ -180,6 +254,8 @@ class Settings(BaseSettings):
         'created_time',
         'updated_time',
     ]
+    DATA_PERMISSION_CACHE_MAXSIZE: int = 1024  # 已编译数据权限过滤条件的最大缓存数，以角色组合为单位
+    DATA_PERMISSION_CACHE_EXPIRE_SECONDS: int = 3600  # 已编译数据权限过滤条件的缓存过期时间，单位：秒
 
     @model_validator(mode='before')
     @classmethod
@@ -12,10 +12,13 @@ from starlette.middleware.authentication import AuthenticationMiddleware
 from asgi_correlation_id import CorrelationIdMiddleware
 from backend.common.exception.exception_handler import register_exception
 from backend.common.log import set_customize_logfile, setup_logging
+from backend.common.security.jwt import password_executor, password_import_executor
+from backend.common.security.user_cache import user_cache
 from backend.core.conf import settings
 from backend.core.path_conf import STATIC_DIR
 from backend.database.db import create_table
 from backend.database.redis import redis_client
+from backend.database.replica import replica_router
 from backend.middleware.jwt_auth_middleware import JwtAuthMiddleware
 from backend.middleware.opera_log_middleware import OperaLogMiddleware
 from backend.middleware.state_middleware import StateMiddleware
@@ -23,6 +26,7 @@ from backend.plugin.tools import plugin_router_inject
 from backend.utils.demo_site import demo_site
 from backend.utils.health_check import ensure_unique_route_names, http_limit_callback
 from backend.utils.openapi import simplify_operation_ids
+from backend.utils.request_parse import load_ip2region_xdb
 from backend.utils.serializers import MsgSpecJSONResponse
 
 
@@ -43,9 +47,27 @@ async def register_init(app: FastAPI):
         prefix=settings.REQUEST_LIMITER_REDIS_PREFIX,
         http_callback=http_limit_callback,
     )
+    # 订阅用户缓存失效消息
+    user_cache.start()
+    # 启动只读副本健康检查
+    replica_router.start()
+    # 启动操作日志消费者
+    OperaLogMiddleware.start_consumer()
+    # 预加载 ip2region xdb 文件
+    if settings.IP_LOCATION_PARSE == 'offline':
+        load_ip2region_xdb()
 
     yield
 
+    # 写入剩余操作日志
+    await OperaLogMiddleware.stop_consumer()
+    # 取消用户缓存失效订阅
+    await user_cache.stop()
+    # 停止只读副本健康检查
+    await replica_router.stop()
+    # 关闭密码哈希线程池
+    password_executor.shutdown()
+    password_import_executor.shutdown()
     # 关闭 Redis 连接
     await redis_client.close()
     # 关闭限流器
@@ -215,6 +237,9 @@ def register_router(app: FastAPI, router: object):
     ensure_unique_route_names(app)
     simplify_operation_ids(app)
 
+    # 操作日志参数记录策略
+    OperaLogMiddleware.compile_args_policies(app)
+
 
 @lru_cache()
 def inject_plugin_routers():
@@ -5,26 +5,31 @@ from uuid import uuid4
 
 from fastapi import Depends
 from sqlalchemy import URL
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from backend.common.log import log
 from backend.common.model import MappedBase
 from backend.core.conf import settings
+from backend.database.pool import InstrumentedQueuePool
+from backend.database.query_stats import register_query_events
+from backend.database.replica import RoutingSession, replica_router
 
 
-def create_database_url(unittest: bool = False) -> URL:
+def create_database_url(unittest: bool = False, host: str | None = None, port: int | None = None) -> URL:
     """
     创建数据库链接
 
     :param unittest: 是否用于单元测试
+    :param host: 数据库地址，默认使用主库地址
+    :param port: 数据库端口，默认使用主库端口
     :return:
     """
     url = URL.create(
         drivername='mysql+asyncmy' if settings.DATABASE_TYPE == 'mysql' else 'postgresql+asyncpg',
         username=settings.DATABASE_USER,
         password=settings.DATABASE_PASSWORD,
-        host=settings.DATABASE_HOST,
-        port=settings.DATABASE_PORT,
+        host=host or settings.DATABASE_HOST,
+        port=port or settings.DATABASE_PORT,
         database=settings.DATABASE_SCHEMA if not unittest else f'{settings.DATABASE_SCHEMA}_test',
     )
     if settings.DATABASE_TYPE == 'mysql':
@@ -32,26 +37,77 @@ def create_database_url(unittest: bool = False) -> URL:
     return url
 
 
+class RoutingSessionMaker(async_sessionmaker):
+    """
+    读写路由 Session 工厂
+
+    直接调用创建的会话按语句类型路由，查询可能由只读副本执行；``begin()`` 及 ``primary()``
+    创建的会话固定使用主库
+    """
+
+    def primary(self, **kwargs) -> AsyncSession:
+        """创建固定使用主库的会话"""
+        return self(info={'primary': True}, **kwargs)
+
+    def begin(self):
+        """创建固定使用主库的事务会话"""
+        return self.primary()._maker_context_manager()
+
+
+def create_db_engine(url: str | URL) -> AsyncEngine:
+    """创建数据库引擎"""
+    engine = create_async_engine(
+        url,
+        echo=settings.DATABASE_ECHO,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_POOL_MAX_OVERFLOW,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    )
+    register_query_events(engine)
+    return engine
+
+
 def create_engine_and_session(url: str | URL):
     """创建数据库引擎和 Session"""
     try:
         # 数据库引擎
-        engine = create_async_engine(url, echo=settings.DATABASE_ECHO, future=True, pool_pre_ping=True)
+        engine = create_db_engine(url)
         # log.success('数据库连接成功')
     except Exception as e:
         log.error('❌ 数据库链接失败 {}', e)
         sys.exit()
     else:
-        db_session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        db_session = RoutingSessionMaker(
+            bind=engine, autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession
+        )
         return engine, db_session
 
 
+def create_replica_engines() -> list[AsyncEngine]:
+    """创建只读副本数据库引擎"""
+    engines = []
+    for replica in settings.DATABASE_REPLICA_HOSTS:
+        host, _, port = replica.partition(':')
+        engines.append(create_db_engine(create_database_url(host=host, port=int(port) if port else None)))
+    return engines
+
+
 async def get_db():
     """session 生成器"""
     async with async_db_session() as session:
         yield session
 
 
+async def get_read_db():
+    """只读 session 生成器"""
+    async with async_db_read_session() as session:
+        yield session
+
+
 async def create_table():
     """创建数据库表"""
     async with async_engine.begin() as coon:
@@ -65,5 +121,11 @@ def uuid4_str() -> str:
 
 SQLALCHEMY_DATABASE_URL = create_database_url()
 async_engine, async_db_session = create_engine_and_session(SQLALCHEMY_DATABASE_URL)
+# 只读 Session，所有查询（包括文本 SQL）优先由只读副本执行，未配置副本时使用主库
+async_db_read_session = RoutingSessionMaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession, info={'read': True}
+)
+replica_router.configure(create_replica_engines())
 # Session Annotated
 CurrentSession = Annotated[AsyncSession, Depends(get_db)]
+CurrentReadSession = Annotated[AsyncSession, Depends(get_read_db)]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import bisect
+import time
+
+from typing import Any
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class WaitHistogram:
+    """
+    连接获取等待时间直方图
+
+    指标仅统计当前进程
+    """
+
+    # 桶上限，单位：毫秒
+    BUCKETS: tuple[float, ...] = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """
+        记录一次等待
+
+        :param seconds: 等待时间，单位：秒
+        :return:
+        """
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.BUCKETS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def snapshot(self) -> dict[str, Any]:
+        """直方图快照"""
+        buckets = {f'<={bucket}ms': count for bucket, count in zip(self.BUCKETS, self.counts)}
+        buckets[f'>{self.BUCKETS[-1]}ms'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0,
+            'max_ms': round(self.max_ms, 3),
+            'buckets': buckets,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """记录连接获取等待时间的 SQLAlchemy 异步连接池"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+        self.timeout_count = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeout_count += 1
+            raise
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - start)
+
+
+class InstrumentedRedisPool(BlockingConnectionPool):
+    """记录连接获取等待时间的 Redis 阻塞连接池，连接耗尽时等待而不是直接报错"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+        self.timeout_count = 0
+
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except ConnectionError:
+            self.timeout_count += 1
+            raise
+        finally:
+            self.wait_histogram.observe(time.perf_counter() - start)
+
+
+def get_db_pool_stats(engine: AsyncEngine) -> dict[str, Any]:
+    """
+    获取数据库连接池指标
+
+    :param engine:
+    :return:
+    """
+    pool = engine.sync_engine.pool
+    stats = {'status': pool.status()}
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout_count=pool.timeout_count,
+            wait=pool.wait_histogram.snapshot(),
+        )
+    return stats
+
+
+def get_redis_pool_stats(connection_pool: Any) -> dict[str, Any]:
+    """
+    获取 Redis 连接池指标
+
+    :param connection_pool:
+    :return:
+    """
+    stats = {
+        'max_connections': connection_pool.max_connections,
+        'in_use': len(getattr(connection_pool, '_in_use_connections', ())),
+        'available': len(getattr(connection_pool, '_available_connections', ())),
+    }
+    if isinstance(connection_pool, InstrumentedRedisPool):
+        stats.update(timeout_count=connection_pool.timeout_count, wait=connection_pool.wait_histogram.snapshot())
+    return stats
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import re
+import time
+
+from collections import Counter
+from contextvars import ContextVar, Token
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from backend.common.log import log
+from backend.core.conf import settings
+
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?|%\(\w+\)s|\$\d+)(?:\s*,\s*(?:%s|\?|%\(\w+\)s|\$\d+))*\s*\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(statement: str) -> str:
+    """
+    语句指纹，替换字面量并合并 IN 列表，参数不同的同一语句得到相同指纹
+
+    :param statement:
+    :return:
+    """
+    statement = _LITERAL_RE.sub('?', statement)
+    statement = _IN_LIST_RE.sub('(...)', statement)
+    return _SPACE_RE.sub(' ', statement).strip()
+
+
+class QueryStats:
+    """单个请求的 SQL 执行统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.fingerprints: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        """
+        记录一次执行
+
+        :param statement:
+        :param seconds: 执行时间，单位：秒
+        :return:
+        """
+        self.count += 1
+        self.total_seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_seconds * 1000, 3)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        获取执行次数达到阈值的语句，疑似 N+1 查询
+
+        :param threshold:
+        :return:
+        """
+        if threshold <= 0:
+            return []
+        return [(statement, count) for statement, count in self.fingerprints.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头"""
+        return f'db;dur={self.total_ms};desc="{self.count} queries"'
+
+
+# 当前请求的 SQL 统计，未开始统计时为 None
+_query_stats: ContextVar[QueryStats | None] = ContextVar('query_stats', default=None)
+
+
+def start_query_stats() -> tuple[QueryStats, Token]:
+    """开始统计当前请求的 SQL 执行"""
+    stats = QueryStats()
+    return stats, _query_stats.set(stats)
+
+
+def stop_query_stats(stats: QueryStats, token: Token) -> None:
+    """
+    结束统计，记录疑似 N+1 查询
+
+    :param stats:
+    :param token:
+    :return:
+    """
+    _query_stats.reset(token)
+    for statement, count in stats.repeated(settings.DATABASE_N_PLUS_ONE_THRESHOLD):
+        log.warning(f'疑似 N+1 查询，同一语句执行 {count} 次：{statement[: settings.DATABASE_QUERY_LOG_MAX_LENGTH]}')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if 0 < settings.DATABASE_SLOW_QUERY_SECONDS <= elapsed:
+        log.warning(
+            f'慢查询 {round(elapsed * 1000, 3)}ms | {conn.engine.url.host} | '
+            f'{_SPACE_RE.sub(" ", statement)[: settings.DATABASE_QUERY_LOG_MAX_LENGTH]}'
+        )
+
+
+def _handle_error(context) -> None:
+    # 执行失败时不会触发 after_cursor_execute，丢弃开始时间
+    start_times = context.connection.info.get('query_start_time') if context.connection is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def register_query_events(engine: AsyncEngine) -> None:
+    """
+    注册 SQL 执行统计事件
+
+    :param engine:
+    :return:
+    """
+    event.listen(engine.sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine.sync_engine, 'handle_error', _handle_error)
@@ -1,24 +1,79 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import sys
+import time
+
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
 
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 from redis.exceptions import AuthenticationError, TimeoutError
 
 from backend.common.log import log
 from backend.core.conf import settings
+from backend.database.pool import InstrumentedRedisPool
+
+# 写入 key 并登记到索引有序集合（分值为过期时间戳），同时清理索引中已过期的成员
+# KEYS[1]: key KEYS[2..n]: 索引有序集合
+# ARGV[1]: 过期时间（秒） ARGV[2]: value ARGV[3]: 当前时间戳 ARGV[4..n+2]: 各索引中登记的成员
+_SETEX_INDEXED_LUA = """
+local expire_at = tonumber(ARGV[3]) + tonumber(ARGV[1])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[1])
+for i = 2, #KEYS do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', ARGV[3])
+    redis.call('ZADD', KEYS[i], expire_at, ARGV[i + 2])
+    if redis.call('TTL', KEYS[i]) < tonumber(ARGV[1]) then
+        redis.call('EXPIRE', KEYS[i], ARGV[1])
+    end
+end
+return 1
+"""
+
+# 仅当锁仍由当前持有者持有时释放
+# KEYS[1]: 锁 key ARGV[1]: 持有者标识
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# 仅当代数计数未变化且失效标记均不存在时写入 key，用于丢弃失效前开始加载的数据
+# KEYS[1]: 代数计数 key KEYS[2]: key KEYS[3..n]: 失效标记 key
+# ARGV[1]: 加载前读取的代数 ARGV[2]: 过期时间（秒） ARGV[3]: value
+_SETEX_IF_GENERATION_LUA = """
+if (redis.call('GET', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+for i = 3, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        return 0
+    end
+end
+redis.call('SET', KEYS[2], ARGV[3], 'EX', ARGV[2])
+return 1
+"""
 
 
 class RedisCli(Redis):
     def __init__(self):
         super(RedisCli, self).__init__(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            password=settings.REDIS_PASSWORD,
-            db=settings.REDIS_DATABASE,
-            socket_timeout=settings.REDIS_TIMEOUT,
-            decode_responses=True,  # 转码 utf-8
+            connection_pool=InstrumentedRedisPool(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                db=settings.REDIS_DATABASE,
+                socket_timeout=settings.REDIS_TIMEOUT,
+                decode_responses=True,  # 转码 utf-8
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            )
         )
+        self._setex_indexed = self.register_script(_SETEX_INDEXED_LUA)
+        self._release_lock = self.register_script(_RELEASE_LOCK_LUA)
+        self._setex_if_generation = self.register_script(_SETEX_IF_GENERATION_LUA)
 
     async def open(self):
         """
@@ -38,6 +93,17 @@ class RedisCli(Redis):
             log.error('❌ 数据库 redis 连接异常 {}', e)
             sys.exit()
 
+    @asynccontextmanager
+    async def transaction(self) -> AsyncGenerator[Pipeline, None]:
+        """
+        事务管道，排队的命令在退出时以 MULTI/EXEC 一次往返提交，发生异常时丢弃
+
+        :return:
+        """
+        async with self.pipeline(transaction=True) as pipe:
+            yield pipe
+            await pipe.execute()
+
     async def delete_prefix(self, prefix: str, exclude: str | list = None):
         """
         删除指定前缀的所有key
@@ -59,6 +125,92 @@ class RedisCli(Redis):
         if keys:
             await self.delete(*keys)
 
+    async def setex_indexed(
+        self, name: str, expire_seconds: int, value: str, indexes: dict[str, str], *, pipe: Pipeline | None = None
+    ) -> None:
+        """
+        设置带过期时间的 key，并原子地登记到索引有序集合
+
+        :param name:
+        :param expire_seconds: 过期时间，单位：秒
+        :param value:
+        :param indexes: 索引有序集合 key 与登记的成员
+        :param pipe: 管道，传入时仅排队命令，由调用方提交
+        :return:
+        """
+        keys = [name, *indexes]
+        args = [expire_seconds, value, time.time(), *indexes.values()]
+        if pipe is not None:
+            # 管道中直接发送脚本，避免 EVALSHA 预加载脚本带来的额外往返
+            pipe.eval(_SETEX_INDEXED_LUA, len(keys), *keys, *args)
+            return
+        await self._setex_indexed(keys=keys, args=args)
+
+    async def delete_indexed(
+        self, index: str, exclude: str | list = None, *, pipe: Pipeline | None = None
+    ) -> list[str]:
+        """
+        删除索引有序集合中登记的所有 key，复杂度仅与索引大小相关
+
+        先读取索引成员，再在事务中删除，读取之后登记的 key 不受影响
+
+        :param index: 索引有序集合 key
+        :param exclude:
+        :param pipe: 事务管道，传入时仅排队删除命令，由调用方提交
+        :return: 删除的 key
+        """
+        if isinstance(exclude, str):
+            exclude = [exclude]
+        members = [member for member in await self.zrange(index, 0, -1) if member not in (exclude or [])]
+        if not members:
+            return []
+        if pipe is not None:
+            pipe.delete(*members)
+            pipe.zrem(index, *members)
+            return members
+        async with self.transaction() as pipe:
+            pipe.delete(*members)
+            pipe.zrem(index, *members)
+        return members
+
+    async def acquire_lock(self, name: str, token: str, expire_seconds: float) -> bool:
+        """
+        获取短期互斥锁，不阻塞等待
+
+        :param name: 锁 key
+        :param token: 持有者标识
+        :param expire_seconds: 锁过期时间，单位：秒
+        :return:
+        """
+        return bool(await self.set(name, token, nx=True, px=int(expire_seconds * 1000)))
+
+    async def release_lock(self, name: str, token: str) -> bool:
+        """
+        释放互斥锁，锁已过期或被其他持有者获取时不做处理
+
+        :param name: 锁 key
+        :param token: 持有者标识
+        :return:
+        """
+        return bool(await self._release_lock(keys=[name], args=[token]))
+
+    async def setex_if_generation(
+        self, generation_key: str, generation: str, name: str, time: int, value: str, markers: list[str] | None = None
+    ) -> bool:
+        """
+        代数计数未变化且失效标记均不存在时设置带过期时间的 key
+
+        :param generation_key: 代数计数 key
+        :param generation: 加载数据前读取的代数，计数不存在时为 0
+        :param name:
+        :param time: 过期时间，单位：秒
+        :param value:
+        :param markers: 失效标记 key
+        :return:
+        """
+        keys = [generation_key, name, *(markers or [])]
+        return bool(await self._setex_if_generation(keys=keys, args=[generation, time, value]))
+
 
 # 创建 redis 客户端单例
 redis_client: RedisCli = RedisCli()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import itertools
+
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Select, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.util import await_only
+
+from backend.common.log import log
+from backend.core.conf import settings
+from backend.database.redis import redis_client
+from backend.utils.cache import TTLCache
+
+# 当前请求的认证用户 ID，用于写后读一致性
+_route_user: ContextVar[int | None] = ContextVar('db_route_user', default=None)
+# 当前请求是否处于写后读窗口内，None 表示尚未检查
+_route_primary: ContextVar[bool | None] = ContextVar('db_route_primary', default=None)
+
+
+class ReplicaRouter:
+    """
+    只读副本路由
+
+    非事务会话中的查询语句路由至健康的只读副本，轮询选取；写入、加锁查询、事务会话以及
+    用户写入后的短时间窗口内（跨 worker 通过 Redis 共享）的查询使用主库；
+    副本不可用或延迟超出阈值时回退主库
+    """
+
+    def __init__(self):
+        self.replicas: list[AsyncEngine] = []
+        self.healthy: list[bool] = []
+        self.lag: list[float | None] = []
+        self._cursor = itertools.count()
+        self._sticky: TTLCache[int, bool] = TTLCache(maxsize=10000, ttl=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        self._checker: asyncio.Task | None = None
+        self.replica_count = 0
+        self.primary_count = 0
+        self.fallback_count = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def configure(self, replicas: list[AsyncEngine]) -> None:
+        """
+        设置只读副本，副本在首次健康检查前视为可用
+
+        :param replicas:
+        :return:
+        """
+        self.replicas = replicas
+        self.healthy = [True] * len(replicas)
+        self.lag = [None] * len(replicas)
+
+    def choose(self) -> AsyncEngine | None:
+        """轮询选取健康的只读副本，全部不可用时返回 None"""
+        for _ in range(len(self.replicas)):
+            index = next(self._cursor) % len(self.replicas)
+            if self.healthy[index]:
+                return self.replicas[index]
+        return None
+
+    def get_bind(self, session: Session, clause: Any) -> Any:
+        """
+        为会话中的语句选取连接，返回 None 时使用主库
+
+        :param session:
+        :param clause:
+        :return:
+        """
+        if not self.replicas:
+            return None
+        if isinstance(clause, UpdateBase):
+            # 会话已写入，之后的查询均使用主库，提交后标记用户写后读窗口
+            session.info['wrote'] = True
+            return None
+        if session.info.get('primary') or session.info.get('wrote'):
+            return None
+        if not session.info.get('read') and not isinstance(clause, Select):
+            return None
+        if isinstance(clause, Select) and clause._for_update_arg is not None:
+            return None
+        if self.is_sticky():
+            self.primary_count += 1
+            return None
+        engine = self.choose()
+        if engine is None:
+            self.fallback_count += 1
+            return None
+        self.replica_count += 1
+        return engine.sync_engine
+
+    def is_sticky(self) -> bool:
+        """
+        当前请求是否处于写后读窗口内
+
+        本 worker 未记录时，于首次路由至副本前检查 Redis 并在请求内缓存结果；
+        须在 AsyncSession 的 greenlet 上下文中调用
+
+        :return:
+        """
+        user_id = _route_user.get()
+        if user_id is None:
+            return False
+        if user_id in self._sticky:
+            return True
+        sticky = _route_primary.get()
+        if sticky is None:
+            try:
+                sticky = bool(await_only(redis_client.exists(self._sticky_key(user_id))))
+            except Exception as e:
+                # 无法确认时使用主库，保证写后读一致性
+                log.warning(f'用户 {user_id} 写后读窗口检查失败：{e}')
+                sticky = True
+            _route_primary.set(sticky)
+        return sticky
+
+    @staticmethod
+    def route_user(user_id: int) -> None:
+        """
+        设置当前请求的用户，写后读窗口在首次路由至副本时检查
+
+        :param user_id:
+        :return:
+        """
+        _route_user.set(user_id)
+        _route_primary.set(None)
+
+    def mark_write(self) -> None:
+        """
+        标记当前用户已写入，写后读窗口内的查询使用主库
+
+        在提交事务的 greenlet 上下文中等待 Redis 写入完成，写入失败仅记录日志，
+        此时其他 worker 在窗口内可能读取到副本数据
+
+        :return:
+        """
+        user_id = _route_user.get()
+        if not self.replicas or user_id is None:
+            return
+        self._sticky.set(user_id, True)
+        _route_primary.set(True)
+        try:
+            await_only(redis_client.setex(self._sticky_key(user_id), settings.DATABASE_REPLICA_STICKY_SECONDS, 1))
+        except Exception as e:
+            log.warning(f'用户 {user_id} 写后读窗口标记失败：{e}')
+
+    @staticmethod
+    def _sticky_key(user_id: int) -> str:
+        return f'{settings.DATABASE_REPLICA_STICKY_REDIS_PREFIX}:{user_id}'
+
+    @staticmethod
+    async def get_lag(engine: AsyncEngine) -> float | None:
+        """
+        获取副本复制延迟，单位：秒，非副本或无法获取时返回 None
+
+        :param engine:
+        :return:
+        """
+        async with engine.connect() as conn:
+            if settings.DATABASE_TYPE == 'mysql':
+                try:
+                    result = await conn.execute(text('SHOW REPLICA STATUS'))
+                except Exception:
+                    # MySQL 8.0.22 之前的版本
+                    result = await conn.execute(text('SHOW SLAVE STATUS'))
+                row = result.mappings().first()
+                if row is None:
+                    return None
+                lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            else:
+                lag = await conn.scalar(
+                    text(
+                        'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+                    )
+                )
+        return float(lag) if lag is not None else None
+
+    async def check(self) -> None:
+        """检查所有副本，连接失败、复制中断或延迟超出阈值的副本标记为不可用"""
+        for index, engine in enumerate(self.replicas):
+            try:
+                lag = await self.get_lag(engine)
+            except Exception as e:
+                healthy, lag = False, None
+                log.warning(f'只读副本 {engine.url.host}:{engine.url.port} 检查失败：{e}')
+            else:
+                healthy = lag is not None and lag <= settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+            if healthy != self.healthy[index]:
+                state = '恢复可用' if healthy else '不可用'
+                log.info(f'只读副本 {engine.url.host}:{engine.url.port} {state}，延迟：{lag}')
+            self.healthy[index] = healthy
+            self.lag[index] = lag
+
+    async def _check_loop(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.DATABASE_REPLICA_CHECK_INTERVAL)
+
+    def start(self) -> None:
+        """启动副本健康检查，重复调用无副作用"""
+        if self.replicas and self._checker is None:
+            self._checker = asyncio.create_task(self._check_loop())
+
+    async def stop(self) -> None:
+        """停止副本健康检查并关闭副本连接"""
+        if self._checker is None:
+            return
+        self._checker.cancel()
+        try:
+            await self._checker
+        except asyncio.CancelledError:
+            pass
+        self._checker = None
+        log.info(f'只读副本路由指标：{self.stats()}')
+        for engine in self.replicas:
+            await engine.dispose()
+
+    def stats(self) -> dict[str, Any]:
+        """路由指标"""
+        return {
+            'replicas': [
+                {'host': f'{engine.url.host}:{engine.url.port}', 'healthy': healthy, 'lag': lag}
+                for engine, healthy, lag in zip(self.replicas, self.healthy, self.lag)
+            ],
+            'replica_reads': self.replica_count,
+            'sticky_primary_reads': self.primary_count,
+            'fallback_primary_reads': self.fallback_count,
+        }
+
+
+class RoutingSession(Session):
+    """按语句类型在主库与只读副本间路由的 Session"""
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        return replica_router.get_bind(self, clause) or super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _mark_session_wrote(session: Session, flush_context: Any, instances: Any) -> None:
+    # 会话存在待写入的变更，刷新及之后的语句均使用主库
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _mark_write_after_commit(session: Session) -> None:
+    if session.info.pop('wrote', False):
+        replica_router.mark_write()
+
+
+replica_router: ReplicaRouter = ReplicaRouter()
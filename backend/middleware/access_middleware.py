@@ -1,21 +1,48 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from backend.common.log import log
+from backend.core.conf import settings
+from backend.database.query_stats import start_query_stats, stop_query_stats
 from backend.utils.timezone import timezone
 
 
-class AccessMiddleware(BaseHTTPMiddleware):
+class AccessMiddleware:
     """请求日志中间件"""
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+        query_stats, token = start_query_stats() if settings.DATABASE_QUERY_STATS else (None, None)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if query_stats is not None:
+                    # 仅包含响应开始前执行的 SQL
+                    MutableHeaders(scope=message).append('Server-Timing', query_stats.server_timing())
+            await send(message)
+
+        request = Request(scope)
         start_time = timezone.now()
-        response = await call_next(request)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if query_stats is not None:
+                stop_query_stats(query_stats, token)
         end_time = timezone.now()
+        db_info = f' | {query_stats.count} queries {query_stats.total_ms}ms' if query_stats is not None else ''
         log.info(
-            f'{request.client.host: <15} | {request.method: <8} | {response.status_code: <6} | '
-            f'{request.url.path} | {round((end_time - start_time).total_seconds(), 3) * 1000.0}ms'
+            f'{request.client.host: <15} | {request.method: <8} | {status_code!s: <6} | '
+            f'{request.url.path} | {round((end_time - start_time).total_seconds(), 3) * 1000.0}ms{db_info}'
         )
-        return response
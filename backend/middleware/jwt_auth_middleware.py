@@ -4,15 +4,15 @@ from typing import Any
 
 from fastapi import Request, Response
 from fastapi.security.utils import get_authorization_scheme_param
-from jose import jwt
 from starlette.authentication import AuthCredentials, AuthenticationBackend, AuthenticationError
 from starlette.requests import HTTPConnection
 
-from backend.app.admin.schema.user import CurrentUserIns
 from backend.common.exception.errors import TokenError
 from backend.common.log import log
-from backend.common.security.jwt import jwt_authentication
+from backend.common.security.jwt import jwt_authentication, jwt_decode
+from backend.common.security.principal import Principal
 from backend.core.conf import settings
+from backend.database.replica import replica_router
 from backend.utils.serializers import MsgSpecJSONResponse
 
 
@@ -33,7 +33,7 @@ class JwtAuthMiddleware(AuthenticationBackend):
         """覆盖内部认证错误处理"""
         return MsgSpecJSONResponse(content={'code': exc.code, 'msg': exc.msg, 'data': None}, status_code=exc.code)
 
-    async def authenticate(self, request: Request) -> tuple[AuthCredentials, CurrentUserIns] | None:
+    async def authenticate(self, request: Request) -> tuple[AuthCredentials, Principal] | None:
         token = request.headers.get('Authorization')
         if not token:
             return
@@ -46,11 +46,13 @@ class JwtAuthMiddleware(AuthenticationBackend):
             return
 
         try:
-            payload = jwt.decode(token, settings.TOKEN_SECRET_KEY, algorithms=[settings.TOKEN_ALGORITHM])
+            payload = jwt_decode(token)
+            # 已校验的声明附加到请求，后续依赖及接口无需再次解码
+            request.state.token_payload = payload
             token_user_type = ''
-            if payload['user_type'] == '00':
+            if payload.user_type == '00':
                 token_user_type = 'admin'
-            elif payload['user_type'] == '20':
+            elif payload.user_type == '20':
                 token_user_type = 'store'
 
             # 获取请求中的端标识，这里假设从请求头中获取
@@ -58,7 +60,9 @@ class JwtAuthMiddleware(AuthenticationBackend):
             if request_platform_type != token_user_type:
                 raise _AuthenticationError(code=403, msg='当前用户无权访问')
 
-            user = await jwt_authentication(token)
+            user = await jwt_authentication(token, payload)
+            # 用户写入后的短时间内查询使用主库
+            replica_router.route_user(user.id)
         except TokenError as exc:
             raise _AuthenticationError(code=exc.code, msg=exc.detail, headers=exc.headers)
         except Exception as e:
@@ -1,52 +1,83 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from asyncio import create_task
+import asyncio
+import json
 
-from asgiref.sync import sync_to_async
-from fastapi import Response
-from starlette.datastructures import UploadFile
-from starlette.middleware.base import BaseHTTPMiddleware
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI, params
+from fastapi.dependencies.utils import get_flat_dependant
+from fastapi.routing import APIRoute
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import Headers
 from starlette.requests import Request
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from backend.app.admin.schema.opera_log import CreateOperaLogParam
 from backend.app.admin.service.opera_log_service import opera_log_service
-from backend.common.dataclasses import RequestCallNext
-from backend.common.enums import OperaLogCipherType, StatusType
+from backend.common.dataclasses import OperaLogArgsPolicy, RequestCallNext
+from backend.common.enums import StatusType
 from backend.common.log import log
+from backend.common.queue import batch_dequeue
 from backend.core.conf import settings
-from backend.utils.encrypt import AESCipher, ItsDCipher, Md5Cipher
+from backend.utils.desensitize import opera_log_desensitizer
 from backend.utils.timezone import timezone
 from backend.utils.trace_id import get_request_trace_id
 
 
-class OperaLogMiddleware(BaseHTTPMiddleware):
+class OperaLogMiddleware:
     """操作日志中间件"""
 
-    async def dispatch(self, request: Request, call_next) -> Response:
+    # 操作日志队列，由后台任务批量写入数据库
+    opera_log_queue: asyncio.Queue[CreateOperaLogParam] = asyncio.Queue(maxsize=settings.OPERA_LOG_QUEUE_MAXSIZE)
+    _consumer_task: asyncio.Task | None = None
+
+    # 队列指标
+    written_count: int = 0
+    dropped_count: int = 0
+    failed_count: int = 0
+
+    # 路由参数记录策略，启动时根据路由表生成
+    args_policies: dict[int, OperaLogArgsPolicy] = {}
+    default_args_policy = OperaLogArgsPolicy(enabled=True, capture_body=False)
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
         # 排除记录白名单
-        path = request.url.path
+        path = scope['path']
         if path in settings.OPERA_LOG_PATH_EXCLUDE or not path.startswith(f'{settings.ADMIN_API_PATH}'):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         # 请求解析
+        request = Request(scope, receive)
         try:
             # 此信息依赖于 jwt 中间件
             username = request.user.username
         except AttributeError:
             username = None
         method = request.method
-        args = await self.get_request_args(request)
-        args = await self.desensitization(args)
+        # 请求体由下游应用读取时按路由策略复制，不提前缓冲
+        body = _RequestBodyCapture(scope, receive)
 
         # 执行请求
         start_time = timezone.now()
-        request_next = await self.execute_request(request, call_next)
+        request_next = await self.execute_request(request, body, send)
         end_time = timezone.now()
         cost_time = round((end_time - start_time).total_seconds() * 1000.0, 3)
 
         # 此信息只能在请求后获取
-        _route = request.scope.get('route')
+        _route = scope.get('route')
         summary = getattr(_route, 'summary', None) or ''
+        args = self.get_request_args(request, body, self.get_args_policy(_route))
+        args = opera_log_desensitizer.desensitize(args)
 
         # 日志创建
         opera_log_in = CreateOperaLogParam(
@@ -70,24 +101,21 @@ class OperaLogMiddleware(BaseHTTPMiddleware):
             cost_time=cost_time,
             opera_time=start_time,
         )
-        create_task(opera_log_service.create(obj_in=opera_log_in))  # noqa: ignore
+        self.enqueue(opera_log_in)
 
         # 错误抛出
         err = request_next.err
         if err:
             raise err from None
 
-        return request_next.response
-
-    async def execute_request(self, request: Request, call_next) -> RequestCallNext:
+    async def execute_request(self, request: Request, receive: Receive, send: Send) -> RequestCallNext:
         """执行请求"""
         code = 200
         msg = 'Success'
         status = StatusType.enable.value
         err = None
-        response = None
         try:
-            response = await call_next(request)
+            await self.app(request.scope, receive, send)
             code, msg = self.request_exception_handler(request, code, msg)
         except Exception as e:
             log.error(f'请求异常: {e}')
@@ -97,7 +125,118 @@ class OperaLogMiddleware(BaseHTTPMiddleware):
             status = StatusType.disable
             err = e
 
-        return RequestCallNext(code=str(code), msg=msg, status=status, err=err, response=response)
+        return RequestCallNext(code=str(code), msg=msg, status=status, err=err)
+
+    @classmethod
+    def enqueue(cls, opera_log_in: CreateOperaLogParam) -> None:
+        """
+        操作日志入队，队列已满时丢弃，避免阻塞请求
+
+        :param opera_log_in:
+        :return:
+        """
+        try:
+            cls.opera_log_queue.put_nowait(opera_log_in)
+        except asyncio.QueueFull:
+            cls.dropped_count += 1
+            if cls.dropped_count % 1000 == 1:
+                log.warning(f'操作日志队列已满，累计丢弃 {cls.dropped_count} 条')
+
+    @classmethod
+    async def consumer(cls) -> None:
+        """操作日志消费者，批量写入数据库"""
+        while True:
+            opera_logs = await batch_dequeue(
+                cls.opera_log_queue,
+                max_items=settings.OPERA_LOG_QUEUE_BATCH_CONSUME_SIZE,
+                timeout=settings.OPERA_LOG_QUEUE_TIMEOUT,
+            )
+            try:
+                await opera_log_service.bulk_create(obj_in=opera_logs)
+                cls.written_count += len(opera_logs)
+            except Exception as e:
+                cls.failed_count += len(opera_logs)
+                log.error(f'操作日志批量写入失败，丢弃 {len(opera_logs)} 条，错误信息：{e}')
+            finally:
+                for _ in opera_logs:
+                    cls.opera_log_queue.task_done()
+
+    @classmethod
+    def start_consumer(cls) -> None:
+        """启动操作日志消费者"""
+        if cls._consumer_task is None or cls._consumer_task.done():
+            cls._consumer_task = asyncio.create_task(cls.consumer())
+
+    @classmethod
+    async def stop_consumer(cls) -> None:
+        """等待队列中的操作日志写入完成后停止消费者"""
+        if cls._consumer_task is None:
+            return
+        try:
+            await asyncio.wait_for(cls.opera_log_queue.join(), settings.OPERA_LOG_QUEUE_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning(f'操作日志队列未能及时写入完成，剩余 {cls.opera_log_queue.qsize()} 条')
+        cls._consumer_task.cancel()
+        try:
+            await cls._consumer_task
+        except asyncio.CancelledError:
+            pass
+        cls._consumer_task = None
+        log.info(f'操作日志队列指标：{cls.stats()}')
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        """
+        操作日志队列指标
+
+        :return:
+        """
+        return {
+            'queued': cls.opera_log_queue.qsize(),
+            'written': cls.written_count,
+            'dropped': cls.dropped_count,
+            'failed': cls.failed_count,
+        }
+
+    @classmethod
+    def compile_args_policies(cls, app: FastAPI) -> None:
+        """
+        根据路由表生成参数记录策略
+
+        :param app: FastAPI 应用实例
+        :return:
+        """
+        exclude = set(settings.OPERA_LOG_ARGS_EXCLUDE)
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            if route.path in exclude:
+                policy = OperaLogArgsPolicy(enabled=False, capture_body=False)
+            else:
+                # 文件上传接口不记录请求体，multipart 请求体原样传递，不做解析
+                body_params = get_flat_dependant(route.dependant).body_params
+                has_file = any(isinstance(field.field_info, params.File) for field in body_params)
+                has_form = any(isinstance(field.field_info, params.Form) for field in body_params)
+                include_keys = settings.OPERA_LOG_ARGS_KEY_INCLUDE.get(route.path)
+                policy = OperaLogArgsPolicy(
+                    enabled=True,
+                    capture_body=not has_file,
+                    capture_form=has_form and not has_file,
+                    include_keys=frozenset(include_keys) if include_keys is not None else None,
+                )
+            cls.args_policies[id(route)] = policy
+
+    @classmethod
+    def get_args_policy(cls, route: BaseRoute | None) -> OperaLogArgsPolicy:
+        """
+        获取路由参数记录策略
+
+        :param route:
+        :return:
+        """
+        if route is None:
+            return cls.default_args_policy
+        return cls.args_policies.get(id(route), cls.default_args_policy)
 
     @staticmethod
     def request_exception_handler(request: Request, code: int, msg: str) -> tuple[str, str]:
@@ -121,61 +260,150 @@ class OperaLogMiddleware(BaseHTTPMiddleware):
         return code, msg
 
     @staticmethod
-    async def get_request_args(request: Request) -> dict:
-        """获取请求参数"""
+    def get_request_args(request: Request, body: '_RequestBodyCapture', policy: OperaLogArgsPolicy) -> dict:
+        """
+        获取请求参数
+
+        :param request:
+        :param body: 已复制的请求体
+        :param policy: 路由参数记录策略
+        :return:
+        """
+        if not policy.enabled:
+            return {}
         args = dict(request.query_params)
         args.update(request.path_params)
-        # Tip: .body() 必须在 .form() 之前获取
-        # https://github.com/encode/starlette/discussions/1933
-        body_data = await request.body()
-        form_data = await request.form()
-        if len(form_data) > 0:
-            args.update({k: v.filename if isinstance(v, UploadFile) else v for k, v in form_data.items()})
-        else:
-            if body_data:
-                content_type = request.headers.get('Content-Type', '').split(';')[0].strip().lower()
-                if content_type == 'application/json':
-                    json_data = await request.json()
-                    if isinstance(json_data, bytes):
-                        json_data = json_data.decode('utf-8')
-                    if isinstance(json_data, dict):
-                        args.update(json_data)
-                    else:
-                        # 注意：非字典数据默认使用 body 作为键
-                        args.update({'body': json_data})
+        if body.form is not None:
+            args.update(body.form.fields)
+            if body.form.truncated:
+                args.update({'body': f'表单字段超过 {settings.OPERA_LOG_ARGS_MAX_SIZE} 字节，部分未记录'})
+        elif body.truncated:
+            args.update({'body': f'请求体超过 {settings.OPERA_LOG_ARGS_MAX_SIZE} 字节，未记录'})
+        elif body.data:
+            content_type = request.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type == 'application/json':
+                try:
+                    json_data = json.loads(body.data)
+                except ValueError:
+                    json_data = str(bytes(body.data))
+                if isinstance(json_data, dict):
+                    args.update(json_data)
                 else:
-                    args.update({'body': str(body_data)})
+                    # 注意：非字典数据默认使用 body 作为键
+                    args.update({'body': json_data})
+            elif content_type == 'application/x-www-form-urlencoded':
+                args.update(parse_qsl(body.data.decode('latin-1'), keep_blank_values=True))
+            elif content_type != 'multipart/form-data':
+                args.update({'body': str(bytes(body.data))})
+        if policy.include_keys is not None:
+            args = {k: v for k, v in args.items() if k in policy.include_keys}
         return args
 
-    @staticmethod
-    @sync_to_async
-    def desensitization(args: dict) -> dict | None:
-        """
-        脱敏处理
 
-        :param args:
-        :return:
-        """
-        if not args:
-            args = None
-        else:
-            match settings.OPERA_LOG_ENCRYPT_TYPE:
-                case OperaLogCipherType.aes:
-                    for key in args.keys():
-                        if key in settings.OPERA_LOG_ENCRYPT_KEY_INCLUDE:
-                            args[key] = (AESCipher(settings.OPERA_LOG_ENCRYPT_SECRET_KEY).encrypt(args[key])).hex()
-                case OperaLogCipherType.md5:
-                    for key in args.keys():
-                        if key in settings.OPERA_LOG_ENCRYPT_KEY_INCLUDE:
-                            args[key] = Md5Cipher.encrypt(args[key])
-                case OperaLogCipherType.itsdangerous:
-                    for key in args.keys():
-                        if key in settings.OPERA_LOG_ENCRYPT_KEY_INCLUDE:
-                            args[key] = ItsDCipher(settings.OPERA_LOG_ENCRYPT_SECRET_KEY).encrypt(args[key])
-                case OperaLogCipherType.plan:
-                    pass
-                case _:
-                    for key in args.keys():
-                        if key in settings.OPERA_LOG_ENCRYPT_KEY_INCLUDE:
-                            args[key] = '******'
-        return args
+class _RequestBodyCapture:
+    """
+    请求体复制
+
+    在下游应用读取请求体时，按路由参数记录策略复制不超过最大字节数的内容，请求体不会被提前缓冲或解析；
+    multipart 表单仅在路由策略要求记录表单字段时流式解析，其余 multipart 请求体原样传递
+    """
+
+    def __init__(self, scope: Scope, receive: Receive) -> None:
+        self.scope = scope
+        self.receive = receive
+        self.data = bytearray()
+        self.form: _MultipartFormCapture | None = None
+        self.truncated = False
+        self._enabled: bool | None = None
+
+    async def __call__(self) -> Message:
+        message = await self.receive()
+        if message['type'] != 'http.request':
+            return message
+        if self._enabled is None:
+            # 下游应用读取请求体时，路由已匹配完成
+            policy = OperaLogMiddleware.get_args_policy(self.scope.get('route'))
+            content_type, options = parse_options_header(Headers(scope=self.scope).get('Content-Type', ''))
+            multipart = content_type == b'multipart/form-data'
+            if multipart and policy.enabled and policy.capture_form and b'boundary' in options:
+                self.form = _MultipartFormCapture(options[b'boundary'])
+            self._enabled = policy.capture_body and not multipart
+        chunk = message.get('body', b'')
+        if self.form is not None:
+            self.form.write(chunk)
+        elif self._enabled and not self.truncated:
+            if len(self.data) + len(chunk) > settings.OPERA_LOG_ARGS_MAX_SIZE:
+                self.truncated = True
+                self.data.clear()
+            else:
+                self.data.extend(chunk)
+        return message
+
+
+class _MultipartFormCapture:
+    """multipart 表单流式解析，记录字段值与上传文件名，字段值总字节数超出上限时不再记录"""
+
+    def __init__(self, boundary: bytes) -> None:
+        self.fields: dict[str, str] = {}
+        self.truncated = False
+        self._size = 0
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._name: str | None = None
+        self._filename: str | None = None
+        self._value = bytearray()
+        self._failed = False
+        self._parser = MultipartParser(
+            boundary,
+            {
+                'on_part_begin': self._on_part_begin,
+                'on_header_field': lambda data, start, end: self._header_field.extend(data[start:end]),
+                'on_header_value': lambda data, start, end: self._header_value.extend(data[start:end]),
+                'on_header_end': self._on_header_end,
+                'on_part_data': self._on_part_data,
+                'on_part_end': self._on_part_end,
+            },
+        )
+
+    def write(self, chunk: bytes) -> None:
+        # 超出上限后不再记录，之后的数据不再解析
+        if self._failed or self.truncated or not chunk:
+            return
+        try:
+            self._parser.write(chunk)
+        except Exception:
+            # 表单格式错误由下游应用处理，此处仅停止记录
+            self._failed = True
+
+    def _on_part_begin(self) -> None:
+        self._name = None
+        self._filename = None
+        self._value.clear()
+
+    def _on_header_end(self) -> None:
+        if self._header_field.lower() == b'content-disposition':
+            _, options = parse_options_header(bytes(self._header_value))
+            self._name = options.get(b'name', b'').decode('latin-1')
+            filename = options.get(b'filename')
+            self._filename = filename.decode('latin-1') if filename is not None else None
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        # 上传文件仅记录文件名
+        if self._filename is not None or self.truncated:
+            return
+        self._size += end - start
+        if self._size > settings.OPERA_LOG_ARGS_MAX_SIZE:
+            self.truncated = True
+            self._value.clear()
+            return
+        self._value.extend(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if not self._name:
+            return
+        if self._filename is not None:
+            self.fields[self._name] = self._filename
+        elif not self.truncated:
+            self.fields[self._name] = self._value.decode('utf-8', errors='replace')
@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from backend.utils.request_parse import parse_ip_info, parse_user_agent_info
 
 
-class StateMiddleware(BaseHTTPMiddleware):
+class StateMiddleware:
     """请求 state 中间件"""
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
         ip_info = await parse_ip_info(request)
         ua_info = parse_user_agent_info(request)
 
@@ -23,6 +31,4 @@ class StateMiddleware(BaseHTTPMiddleware):
         request.state.browser = ua_info.browser
         request.state.device = ua_info.device
 
-        response = await call_next(request)
-
-        return response
+        await self.app(scope, receive, send)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ruff: noqa: I001
+import time
+
+from anyio import run
+from fastapi import Request, Response
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from backend.common.log import log
+from backend.middleware.access_middleware import AccessMiddleware
+from backend.middleware.state_middleware import StateMiddleware
+from backend.utils.request_parse import parse_ip_info, parse_user_agent_info
+from backend.utils.timezone import timezone
+
+
+class LegacyStateMiddleware(BaseHTTPMiddleware):
+    """改写前的请求 state 中间件"""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        ip_info = await parse_ip_info(request)
+        ua_info = parse_user_agent_info(request)
+        request.state.ip = ip_info.ip
+        request.state.country = ip_info.country
+        request.state.region = ip_info.region
+        request.state.city = ip_info.city
+        request.state.user_agent = ua_info.user_agent
+        request.state.os = ua_info.os
+        request.state.browser = ua_info.browser
+        request.state.device = ua_info.device
+        return await call_next(request)
+
+
+class LegacyAccessMiddleware(BaseHTTPMiddleware):
+    """改写前的请求日志中间件"""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        start_time = timezone.now()
+        response = await call_next(request)
+        end_time = timezone.now()
+        log.info(
+            f'{request.client.host: <15} | {request.method: <8} | {response.status_code: <6} | '
+            f'{request.url.path} | {round((end_time - start_time).total_seconds(), 3) * 1000.0}ms'
+        )
+        return response
+
+
+async def endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse('ok')
+
+
+def build_app(state_middleware: type, access_middleware: type) -> Starlette:
+    """
+    构造测试应用，中间件注册顺序与 register_middleware 一致
+
+    :param state_middleware:
+    :param access_middleware:
+    :return:
+    """
+    return Starlette(
+        routes=[Route('/ping', endpoint)],
+        middleware=[Middleware(access_middleware), Middleware(state_middleware)],
+    )
+
+
+async def call(app: Starlette) -> None:
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': '/ping',
+        'raw_path': b'/ping',
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'testserver'), (b'user-agent', b'Mozilla/5.0 (Windows NT 10.0; Win64; x64)')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+    messages = [{'type': 'http.disconnect'}, {'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive() -> dict:
+        return messages.pop() if len(messages) > 1 else messages[0]
+
+    async def send(message: dict) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def bench_app(app: Starlette, number: int) -> float:
+    """
+    直接调用 ASGI 应用，不经过服务器，返回单次请求耗时，单位：微秒
+
+    :param app:
+    :param number:
+    :return:
+    """
+    for _ in range(100):
+        await call(app)
+    start = time.perf_counter()
+    for _ in range(number):
+        await call(app)
+    return (time.perf_counter() - start) / number * 1_000_000
+
+
+async def bench(number: int = 5000) -> None:
+    # 屏蔽请求日志输出，仅保留日志格式化开销
+    log.remove()
+    legacy = await bench_app(build_app(LegacyStateMiddleware, LegacyAccessMiddleware), number)
+    asgi = await bench_app(build_app(StateMiddleware, AccessMiddleware), number)
+    print(f'请求数：{number}，中间件：StateMiddleware + AccessMiddleware')
+    print(f'BaseHTTPMiddleware：{legacy:.1f} us/请求')
+    print(f'纯 ASGI：{asgi:.1f} us/请求')
+
+
+if __name__ == '__main__':
+    run(bench)  # type: ignore
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ruff: noqa: I001
+import timeit
+
+from datetime import datetime
+
+from pydantic_core import from_json
+
+from backend.app.admin.schema.user import CurrentUserIns
+from backend.common.security.principal import Principal, decode_principal, encode_principal
+
+
+def build_user(role_count: int, menu_count: int) -> CurrentUserIns:
+    """
+    构造测试用户
+
+    :param role_count: 角色数
+    :param menu_count: 每个角色的菜单数
+    :return:
+    """
+    now = datetime.now()
+    roles = []
+    for r in range(role_count):
+        menus = [
+            {
+                'id': r * menu_count + m,
+                'title': f'菜单 {m}',
+                'name': f'menu_{m}',
+                'parent_id': None,
+                'sort': m,
+                'path': f'/menu/{m}',
+                'menu_type': 1,
+                'component': f'/views/menu/{m}.vue',
+                'perms': f'sys:menu{m}:add,sys:menu{m}:edit,sys:menu{m}:del',
+                'status': 1,
+                'created_time': now,
+            }
+            for m in range(menu_count)
+        ]
+        roles.append({'id': r, 'name': f'role_{r}', 'status': 1, 'created_time': now, 'menus': menus, 'rules': []})
+    return CurrentUserIns(
+        id=1,
+        uuid='uuid',
+        username='admin',
+        nickname='admin',
+        phone='13800000000',
+        user_type='0',
+        is_superuser=False,
+        is_staff=True,
+        is_multi_login=False,
+        join_time=now,
+        roles=roles,
+    )
+
+
+def bench(role_count: int = 10, menu_count: int = 200, number: int = 50) -> None:
+    user = build_user(role_count, menu_count)
+    pydantic_blob = user.model_dump_json()
+    principal_blob = encode_principal(Principal.from_user(user))
+
+    pydantic_time = timeit.timeit(
+        lambda: CurrentUserIns.model_validate(from_json(pydantic_blob, allow_partial=True)), number=number
+    )
+    principal_time = timeit.timeit(lambda: decode_principal(principal_blob), number=number)
+
+    print(f'用户：{role_count} 个角色 × {menu_count} 个菜单')
+    print(f'Pydantic JSON：{len(pydantic_blob)} 字节，解码 {pydantic_time / number * 1000:.3f} ms')
+    print(f'Principal：{len(principal_blob)} 字节，解码 {principal_time / number * 1000:.3f} ms')
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ruff: noqa: I001
+import json
+import time
+
+from anyio import run
+
+from backend.common.security.jwt import jwt_decode
+from backend.core.conf import settings
+from backend.database.redis import redis_client
+
+# 登记索引成员，索引过期时间短于成员时延长，与运行时的 setex_indexed 一致，兼容 Redis 7.0 之前的版本
+# KEYS[1]: 索引 key ARGV[1]: 成员 ARGV[2]: 成员过期时间戳 ARGV[3]: 当前时间戳
+_ZADD_INDEX_LUA = """
+local expire_at = tonumber(ARGV[2])
+redis.call('ZADD', KEYS[1], expire_at, ARGV[1])
+if redis.call('TTL', KEYS[1]) < expire_at - tonumber(ARGV[3]) then
+    redis.call('EXPIREAT', KEYS[1], math.ceil(expire_at))
+end
+return 1
+"""
+zadd_index = redis_client.register_script(_ZADD_INDEX_LUA)
+
+
+async def backfill(key_prefix: str, index_prefix: str) -> int:
+    """
+    扫描已存在的 token key，并登记到用户 token 索引有序集合，分值为 key 的过期时间戳
+
+    :param key_prefix: token key 前缀
+    :param index_prefix: 索引有序集合前缀
+    :return:
+    """
+    # 旧版本索引为集合类型，先删除后重建
+    async for index in redis_client.scan_iter(match=f'{index_prefix}:*', count=1000):
+        if await redis_client.type(index) != 'zset':
+            await redis_client.delete(index)
+    count = 0
+    async for key in redis_client.scan_iter(match=f'{key_prefix}:*', count=1000):
+        ttl = await redis_client.ttl(key)
+        if ttl <= 0:
+            continue
+        user_id = key[len(key_prefix) + 1 :].split(':', 1)[0]
+        index = f'{index_prefix}:{user_id}'
+        now = time.time()
+        await zadd_index(keys=[index], args=[key, now + ttl, now])
+        count += 1
+    return count
+
+
+async def backfill_sessions() -> int:
+    """
+    登记已存在的会话（含用户名会话索引），并将 token 声明写入附加信息
+
+    :return:
+    """
+    count = 0
+    async for key in redis_client.scan_iter(match=f'{settings.TOKEN_REDIS_PREFIX}:*', count=1000):
+        token = await redis_client.get(key)
+        if not token:
+            continue
+        try:
+            payload = jwt_decode(token)
+        except Exception:
+            continue
+        extra_key = f'{settings.TOKEN_EXTRA_INFO_REDIS_PREFIX}:{payload.session_uuid}'
+        extra_info = json.loads(await redis_client.get(extra_key) or '{}')
+        extra_info.update(id=payload.id, session_uuid=payload.session_uuid, expire_time=payload.expire_time)
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.set(extra_key, json.dumps(extra_info, ensure_ascii=False), exat=payload.expire_time)
+            if extra_info.get('login_type') != 'swagger':
+                member = f'{payload.id}:{payload.session_uuid}'
+                pipe.zadd(settings.TOKEN_SESSION_REDIS_PREFIX, {member: payload.expire_time})
+                if username := extra_info.get('username'):
+                    index = f'{settings.TOKEN_SESSION_USERNAME_REDIS_PREFIX}:{username}'
+                    await zadd_index(keys=[index], args=[member, payload.expire_time, time.time()], client=pipe)
+            await pipe.execute()
+        count += 1
+    return count
+
+
+async def init() -> None:
+    print('Backfilling token index')
+    await redis_client.open()
+    access_count = await backfill(settings.TOKEN_REDIS_PREFIX, settings.TOKEN_INDEX_REDIS_PREFIX)
+    refresh_count = await backfill(settings.TOKEN_REFRESH_REDIS_PREFIX, settings.TOKEN_REFRESH_INDEX_REDIS_PREFIX)
+    session_count = await backfill_sessions()
+    await redis_client.aclose()
+    print(
+        f'Token index backfilled: {access_count} access tokens, {refresh_count} refresh tokens, '
+        f'{session_count} sessions'
+    )
+
+
+if __name__ == '__main__':
+    run(init)  # type: ignore
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from collections import defaultdict
 from typing import Any, Sequence
 
 from backend.common.enums import BuildTreeType
@@ -15,48 +16,47 @@ def get_tree_nodes(row: Sequence[RowData]) -> list[dict[str, Any]]:
 
 def traversal_to_tree(nodes: list[dict[str, Any]]) -> list[dict[str, Any]]:
     """
-    通过遍历算法构造树形结构
+    通过遍历算法构造树形结构，时间复杂度 O(n)
 
     :param nodes:
     :return:
     """
     tree = []
+    # 以 id 去重，保持原有顺序
     node_dict = {node['id']: node for node in nodes}
 
-    for node in nodes:
+    for node in node_dict.values():
         parent_id = node['parent_id']
-        if parent_id is None:
+        parent_node = node_dict.get(parent_id) if parent_id is not None else None
+        if parent_node is None:
             tree.append(node)
         else:
-            parent_node = node_dict.get(parent_id)
-            if parent_node is not None:
-                if 'children' not in parent_node:
-                    parent_node['children'] = []
-                if node not in parent_node['children']:
-                    parent_node['children'].append(node)
-            else:
-                if node not in tree:
-                    tree.append(node)
+            parent_node.setdefault('children', []).append(node)
 
     return tree
 
 
 def recursive_to_tree(nodes: list[dict[str, Any]], *, parent_id: int | None = None) -> list[dict[str, Any]]:
     """
-    通过递归算法构造树形结构（性能影响较大）
+    通过递归算法构造树形结构，先按父级分组，时间复杂度 O(n)
 
     :param nodes:
     :param parent_id:
     :return:
     """
-    tree = []
+    children_map: dict[int | None, list[dict[str, Any]]] = defaultdict(list)
     for node in nodes:
-        if node['parent_id'] == parent_id:
-            child_node = recursive_to_tree(nodes, parent_id=node['id'])
+        children_map[node['parent_id']].append(node)
+
+    def build(pid: int | None) -> list[dict[str, Any]]:
+        tree = children_map.get(pid, [])
+        for node in tree:
+            child_node = build(node['id'])
             if child_node:
                 node['children'] = child_node
-            tree.append(node)
-    return tree
+        return tree
+
+    return build(parent_id)
 
 
 def get_tree_data(
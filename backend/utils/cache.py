@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class TTLCache(Generic[K, V]):
+    """
+    带过期时间的 LRU 进程内缓存
+
+    仅在事件循环线程内使用，未做线程安全处理
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        :param maxsize: 最大缓存条目数
+        :param ttl: 默认过期时间，单位：秒
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: K) -> V | None:
+        """
+        获取缓存，过期条目将被移除
+
+        :param key:
+        :return:
+        """
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expire_at, value = item
+        if expire_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        设置缓存，超出容量时淘汰最久未使用的条目
+
+        :param key:
+        :param value:
+        :param ttl: 过期时间，单位：秒，默认使用实例过期时间
+        :return:
+        """
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        """
+        移除缓存
+
+        :param key:
+        :return:
+        """
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def pop_where(self, predicate: Callable[[K], bool]) -> int:
+        """
+        移除所有键满足条件的缓存
+
+        :param predicate: 键过滤函数
+        :return:
+        """
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._data.clear()
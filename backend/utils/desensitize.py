@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any, Callable, Iterable
+
+from backend.common.enums import OperaLogCipherType
+from backend.core.conf import settings
+from backend.utils.encrypt import AESCipher, ItsDCipher, Md5Cipher
+
+
+class Desensitizer:
+    """
+    参数脱敏器
+
+    初始化时确定敏感键集合与加密方法，处理参数时不再重复判断加密类型或创建加密实例
+    """
+
+    def __init__(self, cipher_type: int, keys: Iterable[str], secret_key: str):
+        """
+        :param cipher_type: 加密类型
+        :param keys: 需要脱敏的参数键
+        :param secret_key: 加密密钥
+        """
+        self.keys = frozenset(keys)
+        self._encrypt = self._build_encrypt(cipher_type, secret_key)
+
+    @staticmethod
+    def _build_encrypt(cipher_type: int, secret_key: str) -> Callable[[Any], Any] | None:
+        """
+        获取加密方法
+
+        :param cipher_type: 加密类型
+        :param secret_key: 加密密钥
+        :return: 不加密时返回 None
+        """
+        match cipher_type:
+            case OperaLogCipherType.aes:
+                aes_cipher = AESCipher(secret_key)
+                return lambda value: aes_cipher.encrypt(value).hex()
+            case OperaLogCipherType.md5:
+                return Md5Cipher.encrypt
+            case OperaLogCipherType.itsdangerous:
+                return ItsDCipher(secret_key).encrypt
+            case OperaLogCipherType.plan:
+                return None
+            case _:
+                return lambda value: '******'
+
+    def desensitize(self, args: dict | None) -> dict | None:
+        """
+        脱敏处理，原地替换敏感键的值，支持嵌套的 dict 与 list
+
+        :param args:
+        :return:
+        """
+        if not args:
+            return None
+        if self._encrypt is not None and self.keys:
+            self._walk(args)
+        return args
+
+    def _walk(self, data: Any) -> None:
+        if isinstance(data, dict):
+            for key, value in data.items():
+                if key in self.keys:
+                    data[key] = self._encrypt(value)
+                elif isinstance(value, (dict, list)):
+                    self._walk(value)
+        elif isinstance(data, list):
+            for value in data:
+                if isinstance(value, (dict, list)):
+                    self._walk(value)
+
+
+opera_log_desensitizer: Desensitizer = Desensitizer(
+    cipher_type=settings.OPERA_LOG_ENCRYPT_TYPE,
+    keys=settings.OPERA_LOG_ENCRYPT_KEY_INCLUDE,
+    secret_key=settings.OPERA_LOG_ENCRYPT_SECRET_KEY,
+)
@@ -78,6 +78,7 @@ class ItsDCipher:
         :param key: 密钥，16/24/32 bytes 或 16 进制字符串
         """
         self.key = key if isinstance(key, bytes) else bytes.fromhex(key)
+        self.serializer = URLSafeSerializer(self.key)
 
     def encrypt(self, plaintext: Any) -> str:
         """
@@ -86,9 +87,8 @@ class ItsDCipher:
         :param plaintext: 加密前的明文
         :return:
         """
-        serializer = URLSafeSerializer(self.key)
         try:
-            ciphertext = serializer.dumps(plaintext)
+            ciphertext = self.serializer.dumps(plaintext)
         except Exception as e:
             log.error(f'ItsDangerous encrypt failed: {e}')
             ciphertext = Md5Cipher.encrypt(plaintext)
@@ -101,9 +101,8 @@ class ItsDCipher:
         :param ciphertext: 解密前的密文
         :return:
         """
-        serializer = URLSafeSerializer(self.key)
         try:
-            plaintext = serializer.loads(ciphertext)
+            plaintext = self.serializer.loads(ciphertext)
         except Exception as e:
             log.error(f'ItsDangerous decrypt failed: {e}')
             plaintext = ciphertext
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from backend.common.exception import errors
+from backend.common.log import log
+
+T = TypeVar('T')
+
+
+class BoundedExecutor:
+    """
+    有界线程池
+
+    用于执行会阻塞事件循环的 CPU 密集型调用，等待中的任务数超出上限时直接拒绝，
+    避免请求高峰时任务无限堆积；线程池在首次使用时创建，关闭后可再次使用
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        """
+        :param name: 线程名前缀
+        :param max_workers: 最大线程数
+        :param max_pending: 最大等待中（含执行中）任务数
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self.pending = 0
+        self.completed_count = 0
+        self.rejected_count = 0
+        self.total_seconds = 0.0
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在线程池中执行调用
+
+        :param func:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if self.pending >= self.max_pending:
+            self.rejected_count += 1
+            raise errors.HTTPError(code=503, msg='服务繁忙，请稍后重试')
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed_count += 1
+            self.total_seconds += time.perf_counter() - start
+
+    def stats(self) -> dict[str, Any]:
+        """线程池指标"""
+        return {
+            'pending': self.pending,
+            'completed': self.completed_count,
+            'rejected': self.rejected_count,
+            'avg_ms': round(self.total_seconds / self.completed_count * 1000, 2) if self.completed_count else 0,
+        }
+
+    def shutdown(self) -> None:
+        """关闭线程池，等待执行中的任务完成"""
+        if self._executor is not None:
+            log.info(f'{self.name} 线程池指标：{self.stats()}')
+            self._executor.shutdown(wait=True)
+            self._executor = None
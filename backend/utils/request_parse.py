@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import mmap
+
 import httpx
 
-from asgiref.sync import sync_to_async
 from fastapi import Request
 from user_agents import parse
 from XdbSearchIP.xdbSearcher import XdbSearcher
@@ -12,6 +13,18 @@ from backend.common.log import log
 from backend.core.conf import settings
 from backend.core.path_conf import IP2REGION_XDB
 from backend.database.redis import redis_client
+from backend.utils.cache import TTLCache
+
+# ip2region xdb 文件内容，进程内只加载一次
+_xdb_searcher: XdbSearcher | None = None
+# 是否已尝试加载 xdb 文件，加载失败后不再重试，避免每个请求重复打开文件并记录错误
+_xdb_loaded: bool = False
+
+# ip 属地进程内缓存，位于 Redis 缓存之前
+_ip_location_cache: TTLCache[str, IpInfo] = TTLCache(
+    maxsize=settings.IP_LOCATION_LOCAL_CACHE_MAXSIZE,
+    ttl=settings.IP_LOCATION_LOCAL_CACHE_EXPIRE_SECONDS,
+)
 
 
 def get_request_ip(request: Request) -> str:
@@ -51,7 +64,24 @@ async def get_location_online(ip: str, user_agent: str) -> dict | None:
             return None
 
 
-@sync_to_async
+def load_ip2region_xdb() -> XdbSearcher | None:
+    """
+    加载 ip2region xdb 文件，通过 mmap 只读映射，多个 worker 共享同一份页缓存；仅加载一次，失败时返回 None
+
+    :return:
+    """
+    global _xdb_searcher, _xdb_loaded
+    if not _xdb_loaded:
+        _xdb_loaded = True
+        try:
+            with open(IP2REGION_XDB, 'rb') as f:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _xdb_searcher = XdbSearcher(contentBuff=content)
+        except Exception as e:
+            log.error(f'加载 ip2region xdb 文件失败，错误信息：{e}')
+    return _xdb_searcher
+
+
 def get_location_offline(ip: str) -> dict | None:
     """
     离线获取 ip 地址属地，无法保证准确率，100%可用
@@ -59,11 +89,11 @@ def get_location_offline(ip: str) -> dict | None:
     :param ip:
     :return:
     """
+    searcher = load_ip2region_xdb()
+    if searcher is None:
+        return None
     try:
-        cb = XdbSearcher.loadContentFromFile(dbfile=IP2REGION_XDB)
-        searcher = XdbSearcher(contentBuff=cb)
         data = searcher.search(ip)
-        searcher.close()
         data = data.split('|')
         return {
             'country': data[0] if data[0] != '0' else None,
@@ -78,14 +108,19 @@ def get_location_offline(ip: str) -> dict | None:
 async def parse_ip_info(request: Request) -> IpInfo:
     country, region, city = None, None, None
     ip = get_request_ip(request)
+    ip_info = _ip_location_cache.get(ip)
+    if ip_info:
+        return ip_info
     location = await redis_client.get(f'{settings.IP_LOCATION_REDIS_PREFIX}:{ip}')
     if location:
         country, region, city = location.split(' ')
-        return IpInfo(ip=ip, country=country, region=region, city=city)
+        ip_info = IpInfo(ip=ip, country=country, region=region, city=city)
+        _ip_location_cache.set(ip, ip_info)
+        return ip_info
     if settings.IP_LOCATION_PARSE == 'online':
         location_info = await get_location_online(ip, request.headers.get('User-Agent'))
     elif settings.IP_LOCATION_PARSE == 'offline':
-        location_info = await get_location_offline(ip)
+        location_info = get_location_offline(ip)
     else:
         location_info = None
     if location_info:
@@ -97,7 +132,10 @@ async def parse_ip_info(request: Request) -> IpInfo:
             f'{country} {region} {city}',
             ex=settings.IP_LOCATION_EXPIRE_SECONDS,
         )
-    return IpInfo(ip=ip, country=country, region=region, city=city)
+    ip_info = IpInfo(ip=ip, country=country, region=region, city=city)
+    if location_info:
+        _ip_location_cache.set(ip, ip_info)
+    return ip_info
 
 
 def parse_user_agent_info(request: Request) -> UserAgentInfo:
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    进程内请求合并
+
+    同一键的并发调用只执行一次，其余调用等待并共享结果（包括异常），
+    加载在独立任务中执行，单个调用方取消不会影响其他等待者
+
+    仅在事件循环线程内使用，未做线程安全处理
+    """
+
+    def __init__(self):
+        self._calls: dict[K, asyncio.Task[V]] = {}
+        self.executed_count = 0
+        self.coalesced_count = 0
+
+    async def do(self, key: K, func: Callable[[], Awaitable[V]]) -> V:
+        """
+        执行调用，已有同键调用进行中时等待其结果
+
+        :param key:
+        :param func: 无参异步函数
+        :return:
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executed_count += 1
+        else:
+            self.coalesced_count += 1
+        return await asyncio.shield(task)
+
+    def forget(self, key: K) -> None:
+        """
+        丢弃进行中的调用，之后的调用将重新执行，已在等待的调用不受影响
+
+        :param key:
+        :return:
+        """
+        self._calls.pop(key, None)
+
+    def _done(self, key: K, task: asyncio.Task[V]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 所有等待者均已取消时，避免出现异常未读取的警告
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """合并指标"""
+        return {
+            'executed': self.executed_count,
+            'coalesced': self.coalesced_count,
+            'inflight': len(self._calls),
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import codecs
+import csv
+import io
+import tempfile
+
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Iterator, Sequence
+
+from backend.common.exception import errors
+
+SUPPORTED_FORMATS = ('csv', 'xlsx')
+
+# 导出时单次输出的字节数
+_CHUNK_SIZE = 64 * 1024
+
+
+def get_file_format(filename: str | None) -> str:
+    """
+    通过文件名获取表格格式
+
+    :param filename:
+    :return:
+    """
+    fmt = (filename or '').rsplit('.', 1)[-1].lower()
+    check_file_format(fmt)
+    return fmt
+
+
+def check_file_format(fmt: str) -> None:
+    """
+    检查表格格式是否受支持
+
+    :param fmt:
+    :return:
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise errors.RequestError(msg=f'仅支持 {", ".join(SUPPORTED_FORMATS)} 文件')
+    if fmt == 'xlsx':
+        _import_openpyxl()
+
+
+def _import_openpyxl():
+    # openpyxl 为可选依赖，仅处理 xlsx 文件时需要
+    try:
+        import openpyxl
+    except ImportError:
+        raise errors.ServerError(msg='未安装 openpyxl，不支持 xlsx 文件')
+    return openpyxl
+
+
+def _cell_str(value: Any) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def iter_rows(file: BinaryIO, fmt: str) -> Iterator[dict[str, str | None]]:
+    """
+    逐行读取表格，首行为表头，单元格统一转换为字符串
+
+    :param file: 二进制文件对象
+    :param fmt: 表格格式
+    :return:
+    """
+    if fmt == 'csv':
+        reader = csv.reader(codecs.getreader('utf-8-sig')(file))
+    else:
+        workbook = _import_openpyxl().load_workbook(file, read_only=True, data_only=True)
+        reader = workbook.active.iter_rows(values_only=True)
+    headers = None
+    for row in reader:
+        row = [_cell_str(value) for value in row]
+        if headers is None:
+            headers = [header or '' for header in row]
+            continue
+        if not any(row):
+            continue
+        yield dict(zip(headers, row))
+
+
+async def stream_csv(headers: Sequence[str], rows: AsyncIterable[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """
+    流式生成 CSV，带 BOM 以便 Excel 正确识别编码，缓冲区超出块大小时输出
+
+    :param headers: 表头
+    :param rows: 异步行迭代器
+    :return:
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write(codecs.BOM_UTF8.decode())
+    writer.writerow(headers)
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= _CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def stream_xlsx(headers: Sequence[str], rows: AsyncIterable[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """
+    生成 xlsx，行数据以只写模式写入临时文件，完成后分块输出
+
+    :param headers: 表头
+    :param rows: 异步行迭代器
+    :return:
+    """
+    workbook = _import_openpyxl().Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(headers))
+    async for row in rows:
+        sheet.append(list(row))
+    with tempfile.TemporaryFile() as file:
+        await asyncio.to_thread(workbook.save, file)
+        file.seek(0)
+        while chunk := file.read(_CHUNK_SIZE):
+            yield chunk
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import zlib
+
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Literal
+
+import msgspec
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from backend.core.conf import settings
+from backend.database.db import async_db_read_session
+from backend.utils.spreadsheet import stream_csv
+from backend.utils.timezone import timezone
+
+ExportFormat = Literal['csv', 'ndjson']
+
+_MEDIA_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# 单次输出的字节数
+_CHUNK_SIZE = 64 * 1024
+_encoder = msgspec.json.Encoder()
+
+
+async def iter_select_rows(stmt: Select) -> AsyncIterator[dict[str, Any]]:
+    """
+    通过服务端游标逐批读取查询结果，内存占用与结果总行数无关
+
+    :param stmt: 仅包含列的查询语句
+    :return:
+    """
+    async with async_db_read_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.LOG_EXPORT_BATCH_SIZE))
+        async for row in result.mappings():
+            yield dict(row)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return timezone.t_str(value)
+    if isinstance(value, (dict, list)):
+        return _encoder.encode(value).decode()
+    return value
+
+
+async def _csv_rows(columns: list[str], rows: AsyncIterable[dict[str, Any]]) -> AsyncIterator[list[Any]]:
+    async for row in rows:
+        yield [_csv_value(row[column]) for column in columns]
+
+
+async def stream_ndjson(rows: AsyncIterable[dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    流式生成 NDJSON，每行一个 JSON 对象
+
+    :param rows:
+    :return:
+    """
+    buffer = bytearray()
+    async for row in rows:
+        buffer += _encoder.encode(row)
+        buffer += b'\n'
+        if len(buffer) >= _CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    yield bytes(buffer)
+
+
+async def stream_gzip(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    流式 gzip 压缩
+
+    :param chunks:
+    :return:
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(
+    stmt: Select, columns: list[str], filename: str, fmt: ExportFormat, compress: bool = False
+) -> StreamingResponse:
+    """
+    流式导出查询结果
+
+    :param stmt: 仅包含列的查询语句
+    :param columns: 导出列，CSV 表头
+    :param filename: 文件名，不含扩展名
+    :param fmt: 导出格式
+    :param compress: 是否 gzip 压缩
+    :return:
+    """
+    rows = iter_select_rows(stmt)
+    stream = stream_csv(columns, _csv_rows(columns, rows)) if fmt == 'csv' else stream_ndjson(rows)
+    filename = f'{filename}.{fmt}'
+    media_type = _MEDIA_TYPES[fmt]
+    if compress:
+        stream = stream_gzip(stream)
+        filename = f'{filename}.gz'
+        media_type = 'application/gzip'
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any, Awaitable, Callable, Hashable
+
+from backend.core.conf import settings
+from backend.database.redis import redis_client
+from backend.utils.cache import TTLCache
+
+
+class TreeCache:
+    """
+    树形结构进程内缓存
+
+    缓存键包含 Redis 中的版本号，数据写入后递增版本号，所有 worker 的旧版本缓存随即失效
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: 缓存名称
+        """
+        self.version_key = f'{settings.TREE_CACHE_REDIS_PREFIX}:{name}:version'
+        self.local: TTLCache[tuple[int, Hashable], list[dict[str, Any]]] = TTLCache(
+            maxsize=settings.TREE_CACHE_LOCAL_MAXSIZE,
+            ttl=settings.TREE_CACHE_EXPIRE_SECONDS,
+        )
+
+    async def get_or_build(
+        self, key: Hashable, build: Callable[[], Awaitable[list[dict[str, Any]]]]
+    ) -> list[dict[str, Any]]:
+        """
+        获取缓存的树形结构，未命中时构建并缓存
+
+        :param key: 查询条件
+        :param build: 构建树形结构的异步函数
+        :return:
+        """
+        version = int(await redis_client.get(self.version_key) or 0)
+        cache_key = (version, key)
+        tree = self.local.get(cache_key)
+        if tree is None:
+            tree = await build()
+            self.local.set(cache_key, tree)
+        return tree
+
+    async def invalidate(self) -> None:
+        """递增版本号，使所有 worker 的缓存失效"""
+        await redis_client.incr(self.version_key)
+        self.local.clear()
+
+
+menu_tree_cache: TreeCache = TreeCache('menu')
+dept_tree_cache: TreeCache = TreeCache('dept')